@@ -26,11 +26,36 @@
 
 from __future__ import unicode_literals
 
+import io
 import os
+import re
 import sys
+import copy
+import json
+import math
+import time
 import stat
-from collections import OrderedDict
-from argparse import Namespace, ArgumentParser  # pylint: disable=W0611  # noqa: F401
+import glob
+import errno
+import string
+import heapq
+import random
+import base64
+import hashlib
+import socket
+import select
+import signal
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+from collections import OrderedDict, namedtuple
+from xml.parsers.expat import ExpatError
+from argparse import (  # pylint: disable=W0611  # noqa: F401
+    Namespace,
+    ArgumentParser,
+    ArgumentTypeError,
+)
 
 
 try:
@@ -38,10 +63,78 @@ try:
 except ImportError:
     import xmlrpclib  # type: ignore
 
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins  # type: ignore
+
+try:
+    from _string import formatter_field_name_split as _formatter_field_name_split
+except ImportError:  # python 2
+
+    def _formatter_field_name_split(field):
+        """
+        Split format field name into name and accessors.
+
+        :param field: format field
+        :type field: str
+        :return: field name and attribute flags with attribute names or item keys
+        :rtype: Tuple[str, Iterator[Tuple[bool, Union[str, int]]]]
+        """
+
+        return field._formatter_field_name_split()
+
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None  # type: ignore
+
+try:
+    import configparser
+except ImportError:
+    import ConfigParser as configparser  # type: ignore
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # type: ignore
+
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
+try:
+    from http.client import HTTPConnection
+    from socketserver import ThreadingMixIn
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    from httplib import HTTPConnection  # type: ignore
+    from SocketServer import ThreadingMixIn  # type: ignore
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler  # type: ignore
+
 
 __all__ = [
     "main",
     "CheckSupervisord",
+    "CheckSupervisordError",
+    "CheckResult",
+    "StatePolicy",
+    "OutputFormatter",
+    "CircuitBreaker",
+    "LatencyHistogram",
+    "Profiler",
+    "Exporter",
+    "ExporterDaemon",
+    "Cluster",
+    "Hedge",
+    "Resolver",
+    "DualStackTransport",
+    "Fleet",
+    "UnixStreamTransport",
+    "Recorder",
+    "ReplayTransport",
 ]
 
 
@@ -49,450 +142,6667 @@ __all__ = [
 VERSION = (2, 2, 1)
 __version__ = ".".join(map(str, VERSION))
 
+# used to calculate interpreter startup time
+IMPORTED_AT = monotonic()
 
-class CheckSupervisord(object):
+
+class NullPhase(object):
     """
-    Check supervisord programs status Nagios plugin.
+    Do nothing profiler phase used when profiling disabled.
+    """
+
+    def __enter__(self):
+        """
+        Enter phase.
+
+        :return: phase
+        :rtype: NullPhase
+        """
+
+        return self
+
+    def __exit__(self, *args):
+        """
+        Exit phase.
+
+        :param args: exception info
+        :type args: Any
+        :return: do not suppress exceptions
+        :rtype: bool
+        """
+
+        return False
+
+
+class Phase(object):
+    """
+    Profiler phase timed with monotonic clock.
+    """
+
+    def __init__(self, profiler, name):
+        """
+        Init phase.
+
+        :param profiler: profiler to add timing to
+        :type profiler: Profiler
+        :param name: phase name
+        :type name: str
+        """
+
+        self.profiler = profiler
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        """
+        Enter phase.
+
+        :return: phase
+        :rtype: Phase
+        """
+
+        self.started = monotonic()
+
+        return self
+
+    def __exit__(self, *args):
+        """
+        Exit phase.
+
+        :param args: exception info
+        :type args: Any
+        :return: do not suppress exceptions
+        :rtype: bool
+        """
+
+        self.profiler.add(name=self.name, duration=monotonic() - self.started)
+
+        return False
+
+
+class ParserProxy(object):
+    """
+    XML-RPC response parser proxy timing response unmarshalling.
+    """
+
+    def __init__(self, parser, profiler):
+        """
+        Init parser proxy.
+
+        :param parser: XML-RPC response parser
+        :type parser: ExpatParser
+        :param profiler: profiler to add timing to
+        :type profiler: Profiler
+        """
+
+        self.parser = parser
+        self.profiler = profiler
+
+    def feed(self, data):
+        """
+        Feed response data to parser.
+
+        :param data: response data chunk
+        :type data: bytes
+        """
+
+        with self.profiler.phase(name=Profiler.PHASE_UNMARSHAL):
+            self.parser.feed(data)
+
+    def close(self):
+        """
+        Finish response parsing.
+        """
+
+        with self.profiler.phase(name=Profiler.PHASE_UNMARSHAL):
+            self.parser.close()
+
+
+class Profiler(object):
+    """
+    Check phases timings profiler.
     """
 
-    OUTPUT_TEMPLATES = {
-        "critical": {"text": "problem with '{name}': ({status})", "priority": 1},
-        "warning": {
-            "text": "something curiously with '{name}': ({status})",
-            "priority": 2,
-        },
-        "unknown": {"text": "'{name}' not found in server response", "priority": 3},
-        "ok": {"text": "'{name}': OK", "priority": 4},
-    }
-    STATUS_CRITICAL, STATUS_WARNING, STATUS_UNKNOWN, STATUS_OK = [
-        "critical",
-        "warning",
-        "unknown",
-        "ok",
-    ]
-    EXIT_CODES = {
-        STATUS_OK: 0,
-        STATUS_WARNING: 1,
-        STATUS_CRITICAL: 2,
-        STATUS_UNKNOWN: 3,
-    }
     (
-        STATE_STOPPED,
-        STATE_RUNNING,
-        STATE_STARTING,
-        STATE_BACKOFF,
-        STATE_STOPPING,
-        STATE_EXITED,
-        STATE_FATAL,
-        STATE_UNKNOWN,
+        PHASE_STARTUP,
+        PHASE_OPTIONS,
+        PHASE_CONNECTION,
+        PHASE_RPC,
+        PHASE_UNMARSHAL,
+        PHASE_RESOURCES,
+        PHASE_STATUS,
+        PHASE_OUTPUT,
+        PHASE_CHECK,
     ) = (
-        "STOPPED",
-        "RUNNING",
-        "STARTING",
-        "BACKOFF",
-        "STOPPING",
-        "EXITED",
-        "FATAL",
-        "UNKNOWN",
+        "startup",
+        "options",
+        "connection",
+        "rpc",
+        "unmarshal",
+        "resources",
+        "status",
+        "output",
+        "check",
     )
-    STATE_TO_TEMPLATE = {
-        STATE_STOPPED: STATUS_OK,
-        STATE_RUNNING: STATUS_OK,
-        STATE_STARTING: STATUS_WARNING,
-        STATE_BACKOFF: STATUS_WARNING,
-        STATE_STOPPING: STATUS_WARNING,
-        STATE_EXITED: STATUS_WARNING,
-        STATE_FATAL: STATUS_CRITICAL,
-        STATE_UNKNOWN: STATUS_UNKNOWN,
-    }
-    URI_TPL_HTTP, URI_TPL_HTTP_AUTH, URI_TPL_SOCKET = "http", "http-auth", "socket"
-    URI_TEMPLATES = {
-        URI_TPL_HTTP: "http://{server}:{port}",
-        URI_TPL_HTTP_AUTH: "http://{username}:{password}@{server}:{port}",
-        URI_TPL_SOCKET: "unix://{server}",
-    }
-    (
-        PRIORITY_CRITICAL,
-        PRIORITY_WARNING,
-        PRIORITY_UNKNOWN,
-        PRIORITY_OK,
-    ) = range(1, 5)
-    PRIORITY_TO_STATUS = {
-        PRIORITY_CRITICAL: STATUS_CRITICAL,
-        PRIORITY_WARNING: STATUS_WARNING,
-        PRIORITY_UNKNOWN: STATUS_UNKNOWN,
-        PRIORITY_OK: STATUS_OK,
+    NULL_PHASE = NullPhase()
+    CPROFILE_LIMIT = 25
+
+    def __init__(self, enabled=False, output="", cprofile=False):
+        """
+        Init profiler.
+
+        :param enabled: is profiling enabled
+        :type enabled: bool
+        :param output: profile file path or empty for stderr
+        :type output: str
+        :param cprofile: wrap check in cProfile
+        :type cprofile: bool
+        """
+
+        self.enabled = enabled or cprofile
+        self.output = output
+        self.timings = OrderedDict()
+        self.profile = None
+        if cprofile:
+            # imported only if enabled to not slow down usual checks startup
+            import cProfile
+
+            self.profile = cProfile.Profile()
+
+    def phase(self, name):
+        """
+        Create phase context manager.
+
+        :param name: phase name
+        :type name: str
+        :return: phase context manager
+        :rtype: Union[Phase, NullPhase]
+        """
+
+        return Phase(profiler=self, name=name) if self.enabled else self.NULL_PHASE  # type: ignore  # noqa: E501
+
+    def add(self, name, duration):
+        """
+        Add phase timing.
+
+        :param name: phase name
+        :type name: str
+        :param duration: phase duration in seconds
+        :type duration: float
+        """
+
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    def instrument(self, connection):
+        """
+        Instrument connection transport to time response unmarshalling.
+
+        :param connection: connection to supervisord
+        :type connection: ServerProxy
+        :return: connection to supervisord
+        :rtype: ServerProxy
+        """
+
+        if not self.enabled:
+            return connection
+
+        transport = connection("transport")
+        getparser = transport.getparser
+
+        def timed_getparser():
+            """
+            Create timed XML-RPC response parser.
+
+            :return: parser and unmarshaller
+            :rtype: Tuple[ParserProxy, Unmarshaller]
+            """
+
+            parser, unmarshaller = getparser()
+
+            return ParserProxy(parser=parser, profiler=self), unmarshaller  # type: ignore  # noqa: E501
+
+        transport.getparser = timed_getparser
+
+        return connection
+
+    def run(self, func):
+        """
+        Run function under cProfile if enabled.
+
+        :param func: function to run
+        :type func: Callable[[], Any]
+        :return: function result
+        :rtype: Any
+        """
+
+        if self.profile is None:
+            return func()
+
+        self.profile.enable()
+        try:
+            return func()
+        finally:
+            self.profile.disable()
+
+    def _get_startup(self):
+        """
+        Calculate interpreter startup time (from process start to module import).
+
+        :return: interpreter startup time in seconds or None if not available
+        :rtype: Union[float, None]
+        """
+
+        try:
+            with io.open("/proc/self/stat", "rb") as stat_file:
+                stats = stat_file.read()
+            with io.open("/proc/uptime", "rb") as uptime_file:
+                uptime = float(uptime_file.read().split()[0])
+        except EnvironmentError:  # procfs not available
+            return None
+
+        # process start time measured in clock ticks after system boot
+        fields = stats[stats.rfind(b")") + 2 :].split()  # noqa: E203
+        started = float(fields[19]) / os.sysconf(str("SC_CLK_TCK"))
+
+        return max(uptime - (monotonic() - IMPORTED_AT) - started, 0.0)
+
+    def _get_cprofile(self):
+        """
+        Create cProfile top functions by cumulative time report.
+
+        :return: top functions report
+        :rtype: List[Dict[str, Union[str, int, float]]]
+        """
+
+        if self.profile is None:
+            return []
+
+        from pstats import Stats
+
+        stats = Stats(self.profile)
+        report = []
+        for function in sorted(
+            stats.stats.keys(),  # type: ignore
+            key=lambda item: stats.stats[item][3],  # type: ignore
+            reverse=True,
+        )[: self.CPROFILE_LIMIT]:
+            calls, _, total, cumulative, _ = stats.stats[function]  # type: ignore
+            report.append(
+                {
+                    "function": "{0}:{1}({2})".format(*function),
+                    "calls": calls,
+                    "total": total,
+                    "cumulative": cumulative,
+                }
+            )
+
+        return report
+
+    def report(self):
+        """
+        Create profiling report.
+
+        :return: profiling report
+        :rtype: Dict[str, Any]
+        """
+
+        timings = OrderedDict()
+        startup = self._get_startup()  # type: ignore
+        if startup is not None:
+            timings[self.PHASE_STARTUP] = startup
+        timings.update(self.timings)
+        report = OrderedDict([("phases", timings)])
+        if self.profile is not None:
+            report["cprofile"] = self._get_cprofile()  # type: ignore
+
+        return report
+
+    def dump(self):
+        """
+        Write profiling report as JSON to file or stderr.
+        """
+
+        if not self.enabled:
+            return
+
+        report = json.dumps(self.report())  # type: ignore
+        if self.output:
+            with io.open(self.output, "w", encoding="utf-8") as output:
+                output.write("{report}\n".format(report=report))
+        else:
+            sys.stderr.write("{report}\n".format(report=report))
+
+
+class OutputFormatter(object):
+    """
+    Program output template validated once and rendered by built-in formatting.
+    """
+
+    FIELDS = [
+        "name",
+        "status",
+        "group",
+        "statename",
+        "pid",
+        "description",
+        "uptime",
+        "exitstatus",
+        "spawnerr",
+    ]
+    # fields values of programs absent from server response, typed as present ones
+    DEFAULTS = {
+        "name": "",
+        "status": "",
+        "group": "",
+        "statename": "",
+        "pid": 0,
+        "description": "",
+        "uptime": 0,
+        "exitstatus": 0,
+        "spawnerr": "",
     }
-    STATUS_TO_PRIORITY = {
-        STATUS_CRITICAL: PRIORITY_CRITICAL,
-        STATUS_WARNING: PRIORITY_WARNING,
-        STATUS_UNKNOWN: PRIORITY_UNKNOWN,
-        STATUS_OK: PRIORITY_OK,
+    CONVERSIONS = {
+        "s": type(""),  # unicode on python 2
+        "r": repr,
+        "a": getattr(builtins, "ascii", repr),  # python 2 has no ascii
     }
-    HELP_STATUSES = "Possible variants: {statuses}".format(
-        statuses=", ".join(EXIT_CODES.keys())
-    )
 
-    def __init__(self):
+    def __init__(self, template):
         """
-        Get command line args.
+        Parse and validate output template.
+
+        :param template: output template
+        :type template: str
+        :raises CheckSupervisordError: invalid template, unknown field
+            or field format not applicable to field type
         """
 
-        self.options = self._get_options()  # type: ignore
+        self.template = template
+        self.fields = set()
+        try:
+            self._validate(template=template)  # type: ignore
+        except (ValueError, TypeError, IndexError) as error:
+            raise CheckSupervisordError(
+                "Invalid output template: '{template}'. {error}".format(
+                    template=template, error=error
+                )
+            )
+        # C-level formatting of whole template outperforms rendering parsed
+        # template parts in python, mapping avoids copying state on each call
+        self.render = getattr(template, "format_map", None)
 
-    def _get_options(self):
+    def _validate(self, template):
         """
-        Parse commandline options arguments.
+        Validate template fields names, conversions and format specs
+        of fields without attributes or items access, collecting fields.
 
-        :return: parsed command line arguments
-        :rtype: Namespace
+        :param template: output template or nested field format spec
+        :type template: str
+        :raises CheckSupervisordError: unknown field
+        :raises ValueError: invalid template or field format
         """
 
-        parser = ArgumentParser(
-            description="Check supervisord programs status Nagios plugin"
-        )
-        parser.add_argument(
-            "-s",
-            "--server",
-            action="store",
-            dest="server",
-            type=str,
-            default="",
-            metavar="SERVER",
-            help="server name, IP address or unix socket path",
-        )
-        parser.add_argument(
-            "-p",
-            "--port",
-            action="store",
-            type=int,
-            dest="port",
-            default=9001,
-            metavar="PORT",
-            help="port number",
-        )
+        for _, field, spec, conversion in string.Formatter().parse(template):
+            if field is None:
+                continue
+            spec = spec or ""
+            name, accessors = _formatter_field_name_split(field)
+            if name not in self.FIELDS:
+                raise CheckSupervisordError(
+                    "Unknown output template field: '{field}'. Available fields: {fields}".format(  # noqa: E501
+                        field=field, fields=", ".join(self.FIELDS)
+                    )
+                )
+            self.fields.add(name)
+            if conversion is not None and conversion not in self.CONVERSIONS:
+                raise ValueError(
+                    "Unknown conversion specifier {conversion}".format(
+                        conversion=conversion
+                    )
+                )
+            if "{" in spec:
+                self._validate(template=spec)  # type: ignore
+            elif not list(accessors):
+                # field type known, accessed attributes and items types are not
+                value = self.DEFAULTS[name]
+                format(
+                    self.CONVERSIONS[conversion](value) if conversion else value, spec
+                )
+
+    def __call__(self, state):
+        """
+        Render program state.
+
+        :param state: program state fields
+        :type state: Dict[str, Any]
+        :return: program output
+        :rtype: str
+        """
+
+        if self.render is None:  # python 2
+
+            return self.template.format(**state)
+
+        return self.render(state)
+
+
+class StatePolicy(object):
+    """
+    Immutable programs states to statuses policy table.
+    """
+
+    __slots__ = ("default", "groups", "programs", "unknown", "cache")
+
+    def __init__(self, default, groups=None, programs=None, unknown="unknown"):
+        """
+        Compile policy table.
+
+        :param default: states to statuses mapping
+        :type default: Dict[str, str]
+        :param groups: per-group states to statuses overrides
+        :type groups: Union[Dict[str, Dict[str, str]], None]
+        :param programs: per-program (name or group:name) states to statuses overrides
+        :type programs: Union[Dict[str, Dict[str, str]], None]
+        :param unknown: status for states missing in policy table
+        :type unknown: str
+        """
+
+        setter = super(StatePolicy, self).__setattr__
+        setter("default", dict(default))
+        setter(
+            "groups",
+            {
+                group: dict(default, **overrides)
+                for group, overrides in (groups or {}).items()
+            },
+        )
+        setter(
+            "programs",
+            {
+                program: dict(default, **overrides)
+                for program, overrides in (programs or {}).items()
+            },
+        )
+        setter("unknown", unknown)
+        # resolved statuses memo, not a part of policy
+        setter("cache", {})
+
+    def __setattr__(self, name, value):
+        """
+        Deny policy table modification.
+
+        :param name: attribute name
+        :type name: str
+        :param value: attribute value
+        :type value: Any
+        :raises AttributeError: policy table is immutable
+        """
+
+        raise AttributeError("StatePolicy is immutable")
+
+    def _resolve(self, group, name, state):
+        """
+        Resolve program state status.
+
+        :param group: program group
+        :type group: str
+        :param name: program name
+        :type name: str
+        :param state: program state
+        :type state: str
+        :return: program state status
+        :rtype: str
+        """
+
+        table = (
+            self.programs.get("{group}:{name}".format(group=group, name=name))  # type: ignore  # noqa: E501
+            or self.programs.get(name)  # type: ignore  # noqa: W503
+            or self.groups.get(group)  # type: ignore  # noqa: W503
+            or self.default  # type: ignore  # noqa: W503
+        )
+        status = self.cache[(group, name, state)] = table.get(state, self.unknown)  # type: ignore  # noqa: E501
+
+        return status
+
+    def resolve(self, info):
+        """
+        Get program state status.
+
+        :param info: supervisord program info
+        :type info: Dict[str, Union[str, int]]
+        :return: program state status
+        :rtype: str
+        """
+
+        # single dict lookup for already seen programs states
+        try:
+            return self.cache[(info["group"], info["name"], info["statename"])]  # type: ignore  # noqa: E501
+        except KeyError:
+            return self._resolve(  # type: ignore
+                group=info["group"], name=info["name"], state=info["statename"]
+            )
+
+
+class CircuitBreaker(object):
+    """
+    Server circuit breaker: fail fast after consecutive failures
+    until cool-down period ends, then let one probe request through.
+    """
+
+    def __init__(self, failures, cooldown, state=None):
+        """
+        Init circuit breaker.
+
+        :param failures: consecutive failures count to open circuit after
+        :type failures: int
+        :param cooldown: open circuit cool-down period in seconds
+        :type cooldown: float
+        :param state: saved circuit breaker state
+        :type state: Union[Dict[str, Union[int, float]], None]
+        """
+
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = dict(
+            {"failures": 0, "opened": 0.0, "probing": 0.0}, **(state or {})
+        )
+        self.lock = threading.Lock()
+
+    def allow(self, now):
+        """
+        Check is request allowed.
+
+        :param now: current timestamp
+        :type now: float
+        :return: is request allowed
+        :rtype: bool
+        """
+
+        # closed circuit
+        if self.state["failures"] < self.failures:
+            return True
+        # open circuit
+        if now - self.state["opened"] < self.cooldown:
+            return False
+        # half-open circuit with probe request in flight (or lost)
+        if now - self.state["probing"] < self.cooldown:
+            return False
+
+        self.state["probing"] = now
+
+        return True
+
+    def retry_in(self, now):
+        """
+        Get seconds count to next probe request.
+
+        :param now: current timestamp
+        :type now: float
+        :return: seconds count to next probe request
+        :rtype: float
+        """
+
+        return max(
+            self.state["opened"] + self.cooldown - now,
+            self.state["probing"] + self.cooldown - now,
+            0.0,
+        )
+
+    def success(self):
+        """
+        Close circuit after successful request.
+        """
+
+        self.state.update({"failures": 0, "opened": 0.0, "probing": 0.0})
+
+    def failure(self, now):
+        """
+        Count failed request opening circuit if needed.
+
+        :param now: current timestamp
+        :type now: float
+        """
+
+        self.state["failures"] += 1
+        if self.state["failures"] >= self.failures:
+            self.state.update({"opened": now, "probing": 0.0})
+
+
+class LatencyHistogram(object):
+    """
+    Constant space log-linear latency histogram: power of two milliseconds
+    ranges split into linear sub-buckets, old samples halved away.
+    """
+
+    SUB_BUCKETS = 8
+    MAX_EXPONENT = 16
+    MAX_COUNT = 1024
+
+    def __init__(self, state=None):
+        """
+        Init latency histogram.
+
+        :param state: saved histogram state
+        :type state: Union[Dict[str, List[int]], None]
+        """
+
+        size = (self.MAX_EXPONENT + 2) * self.SUB_BUCKETS
+        # ignore state saved with another buckets layout
+        self.state = (
+            state
+            if state and len(state.get("counts", [])) == size
+            else {"counts": [0] * size}
+        )
+        self.lock = threading.Lock()
+
+    def _get_bucket(self, milliseconds):
+        """
+        Get latency bucket.
+
+        :param milliseconds: latency in milliseconds
+        :type milliseconds: float
+        :return: bucket index
+        :rtype: int
+        """
+
+        if milliseconds < 1:
+            return int(milliseconds * self.SUB_BUCKETS)
+
+        _, exponent = math.frexp(milliseconds)
+        exponent = min(exponent - 1, self.MAX_EXPONENT)
+        sub = int((milliseconds / 2.0**exponent - 1) * self.SUB_BUCKETS)
+
+        return (exponent + 1) * self.SUB_BUCKETS + min(sub, self.SUB_BUCKETS - 1)
+
+    def _get_bound(self, bucket):
+        """
+        Get latency bucket upper bound.
+
+        :param bucket: bucket index
+        :type bucket: int
+        :return: bucket upper bound in milliseconds
+        :rtype: float
+        """
+
+        exponent, sub = divmod(bucket, self.SUB_BUCKETS)
+        if not exponent:
+            return (sub + 1) / float(self.SUB_BUCKETS)
+
+        return 2.0 ** (exponent - 1) * (1 + (sub + 1) / float(self.SUB_BUCKETS))
+
+    def record(self, seconds):
+        """
+        Record latency sample.
+
+        :param seconds: latency in seconds
+        :type seconds: float
+        """
+
+        counts = self.state["counts"]
+        counts[self._get_bucket(milliseconds=seconds * 1000.0)] += 1  # type: ignore
+        # favor recent samples keeping counts bounded
+        if sum(counts) >= self.MAX_COUNT:
+            self.state["counts"] = [count // 2 for count in counts]
+
+    def percentile(self, percent):
+        """
+        Get latency percentile.
+
+        :param percent: percentile
+        :type percent: float
+        :return: latency percentile upper bound in seconds or None if no samples
+        :rtype: Union[float, None]
+        """
+
+        counts = self.state["counts"]
+        rank, seen = sum(counts) * percent / 100.0, 0
+        for bucket, count in enumerate(counts):
+            seen += count
+            if count and seen >= rank:
+                return self._get_bound(bucket=bucket) / 1000.0  # type: ignore
+
+        return None
+
+
+class UnixStreamHTTPConnection(HTTPConnection):
+    """
+    HTTP connection over unix domain socket.
+    """
+
+    def __init__(self, path, timeout=None):
+        """
+        Init connection.
+
+        :param path: unix socket path
+        :type path: str
+        :param timeout: socket timeout in seconds
+        :type timeout: Union[float, None]
+        """
+
+        HTTPConnection.__init__(self, "localhost")
+        self.socket_path = path
+        self.socket_timeout = timeout
+
+    def connect(self):
+        """
+        Connect to unix socket.
+        """
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # keep default timeout (fleet timeout in worker processes) if not set
+            if self.socket_timeout is not None:
+                sock.settimeout(self.socket_timeout)
+            sock.connect(self.socket_path)
+        except Exception:
+            sock.close()
+
+            raise
+
+        self.sock = sock
+
+
+class UnixStreamTransport(xmlrpclib.Transport):
+    """
+    Lightweight XML-RPC over HTTP over unix domain socket transport.
+    """
+
+    def __init__(self, path, username="", password="", timeout=None):
+        """
+        Init transport.
+
+        :param path: unix socket path
+        :type path: str
+        :param username: supervisord user
+        :type username: str
+        :param password: supervisord user password
+        :type password: str
+        :param timeout: socket timeout in seconds
+        :type timeout: Union[float, None]
+        """
+
+        xmlrpclib.Transport.__init__(self)
+        self.socket_path = path
+        self.timeout = timeout
+        self.authorization = (
+            "Basic {credentials}".format(
+                credentials=base64.b64encode(
+                    "{username}:{password}".format(
+                        username=username, password=password
+                    ).encode("utf-8")
+                ).decode("ascii")
+            )
+            if username
+            else ""
+        )
+
+    def get_host(self, host):
+        """
+        Get host and authorization headers.
+
+        :param host: host from URI
+        :type host: str
+        :return: host, extra headers and x509 info
+        :rtype: Tuple[str, List[Tuple[str, str]], Dict[str, str]]
+        """
+
+        headers = [("Authorization", self.authorization)] if self.authorization else []
+
+        return host, headers, {}
+
+    def make_connection(self, host):
+        """
+        Create or reuse unix socket HTTP connection.
+
+        :param host: host from URI
+        :type host: str
+        :return: unix socket HTTP connection
+        :rtype: UnixStreamHTTPConnection
+        """
+
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+
+        # python 3 sends authorization headers collected here
+        host, self._extra_headers, _ = self.get_host(host=host)  # type: ignore
+        self._connection = (
+            host,
+            UnixStreamHTTPConnection(path=self.socket_path, timeout=self.timeout),  # type: ignore  # noqa: E501
+        )
+
+        return self._connection[1]
+
+
+class Resolver(object):
+    """
+    Server addresses resolver caching results for long-lived modes.
+    """
+
+    def __init__(self, ttl):
+        """
+        Init resolver.
+
+        :param ttl: resolved addresses time to live in seconds or 0 to disable cache
+        :type ttl: float
+        """
+
+        self.ttl = ttl
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def _interleave(self, infos):
+        """
+        Interleave address families starting with first resolved one.
+
+        :param infos: resolved addresses info
+        :type infos: List[Tuple[int, int, int, str, Tuple[Any, ...]]]
+        :return: address families and addresses
+        :rtype: List[Tuple[int, Tuple[Any, ...]]]
+        """
+
+        families = OrderedDict()  # type: ignore
+        for family, _, _, _, address in infos:
+            families.setdefault(family, []).append((family, address))
+
+        addresses = []
+        while any(families.values()):
+            for family in families.values():
+                if family:
+                    addresses.append(family.pop(0))
+
+        return addresses
+
+    def resolve(self, host, port):
+        """
+        Resolve server addresses.
+
+        :param host: server name or IP address
+        :type host: str
+        :param port: server port
+        :type port: int
+        :return: address families and addresses
+        :rtype: List[Tuple[int, Tuple[Any, ...]]]
+        """
+
+        now = monotonic()
+        with self.lock:
+            expires, addresses = self.cache.get((host, port), (0.0, None))
+        if addresses is not None and now < expires:
+            return addresses
+
+        addresses = self._interleave(  # type: ignore
+            infos=socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        )
+        if self.ttl:
+            with self.lock:
+                self.cache[(host, port)] = (now + self.ttl, addresses)
+
+        return addresses
+
+
+class DualStackHTTPConnection(HTTPConnection):
+    """
+    HTTP connection racing connection attempts to all server addresses
+    (Happy Eyeballs).
+    """
+
+    ATTEMPT_DELAY = 0.25
+    IN_PROGRESS = [errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN]
+
+    def __init__(self, host, resolver, timeout=None):
+        """
+        Init connection.
+
+        :param host: server host and optional port
+        :type host: str
+        :param resolver: server addresses resolver
+        :type resolver: Resolver
+        :param timeout: connection timeout in seconds or None for default one
+        :type timeout: Union[float, None]
+        """
+
+        if timeout is None:
+            HTTPConnection.__init__(self, host)
+        else:
+            HTTPConnection.__init__(self, host, timeout=timeout)
+        self.resolver = resolver
+
+    def _get_timeout(self):
+        """
+        Get connection timeout.
+
+        :return: connection timeout in seconds or None for no timeout
+        :rtype: Union[float, None]
+        """
+
+        if self.timeout is socket._GLOBAL_DEFAULT_TIMEOUT:  # type: ignore
+            return socket.getdefaulttimeout()
+
+        return self.timeout
+
+    def _attempt(self, family, address):
+        """
+        Start non-blocking connection attempt.
+
+        :param family: address family
+        :type family: int
+        :param address: server address
+        :type address: Tuple[Any, ...]
+        :return: socket and connection error code
+        :rtype: Tuple[socket.socket, int]
+        """
+
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+
+        return sock, sock.connect_ex(address)
+
+    def connect(self):
+        """
+        Connect to first server address accepted connection.
+
+        :raises socket.timeout: connection timed out
+        :raises socket.error: all connection attempts failed
+        """
+
+        timeout = self._get_timeout()  # type: ignore
+        deadline = None if timeout is None else monotonic() + timeout
+        pending = list(self.resolver.resolve(host=self.host, port=self.port))
+        attempts, connected, error = [], None, None  # type: ignore
+        try:
+            while connected is None and (pending or attempts):
+                if pending:
+                    sock, code = self._attempt(*pending.pop(0))  # type: ignore
+                    if code == 0:
+                        connected = sock
+
+                        break
+                    if code not in self.IN_PROGRESS:
+                        sock.close()
+                        error = socket.error(code, os.strerror(code))
+
+                        continue
+                    attempts.append(sock)
+                # wait for attempts before starting next one
+                wait = self.ATTEMPT_DELAY if pending else None
+                if deadline is not None:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        raise socket.timeout("timed out")  # type: ignore
+                    wait = remaining if wait is None else min(wait, remaining)
+                _, writable, failed = select.select([], attempts, attempts, wait)
+                for sock in set(writable + failed):
+                    attempts.remove(sock)
+                    code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if code == 0 and connected is None:
+                        connected = sock
+                    else:
+                        sock.close()
+                        error = socket.error(code, os.strerror(code))
+        finally:
+            # cancel slower attempts
+            for sock in attempts:
+                sock.close()
+
+        if connected is None:
+            raise error or socket.error("No server address available")
+
+        connected.setblocking(True)
+        connected.settimeout(timeout)
+        # as built-in connection does: request headers and body are sent separately,
+        # so reused connections requests would wait for delayed ACK otherwise
+        connected.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = connected
+
+
+class DualStackTransport(xmlrpclib.Transport):
+    """
+    XML-RPC over HTTP transport racing connection attempts to all server addresses.
+    """
+
+    def __init__(self, resolver, timeout=None):
+        """
+        Init transport.
+
+        :param resolver: server addresses resolver
+        :type resolver: Resolver
+        :param timeout: connection timeout in seconds or None for default one
+        :type timeout: Union[float, None]
+        """
+
+        xmlrpclib.Transport.__init__(self)
+        self.resolver = resolver
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        """
+        Create or reuse dual-stack HTTP connection.
+
+        :param host: host from URI
+        :type host: str
+        :return: dual-stack HTTP connection
+        :rtype: DualStackHTTPConnection
+        """
+
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+
+        # python 3 sends authorization headers collected here
+        chost, self._extra_headers, _ = self.get_host_info(host)
+        self._connection = (
+            host,
+            DualStackHTTPConnection(  # type: ignore
+                host=chost, resolver=self.resolver, timeout=self.timeout
+            ),
+        )
+
+        return self._connection[1]
+
+
+class RecordingParser(object):
+    """
+    XML-RPC response parser proxy capturing raw response.
+    """
+
+    def __init__(self, parser, chunks):
+        """
+        Init recording parser.
+
+        :param parser: XML-RPC response parser
+        :type parser: ExpatParser
+        :param chunks: response chunks list to capture to
+        :type chunks: List[bytes]
+        """
+
+        self.parser = parser
+        self.chunks = chunks
+
+    def feed(self, data):
+        """
+        Capture response data chunk and feed it to parser.
+
+        :param data: response data chunk
+        :type data: bytes
+        """
+
+        self.chunks.append(data)
+        self.parser.feed(data)
+
+    def close(self):
+        """
+        Finish response parsing.
+        """
+
+        self.parser.close()
+
+
+class Recorder(object):
+    """
+    XML-RPC exchanges recorder for offline replay and profiling.
+    """
+
+    def __init__(self, path, server):
+        """
+        Init recorder.
+
+        :param path: recording file path
+        :type path: str
+        :param server: recorded server
+        :type server: str
+        """
+
+        self.path = path
+        self.server = server
+        self.lock = threading.Lock()
+
+    def write(self, exchange):
+        """
+        Append exchange to recording.
+
+        :param exchange: recorded exchange
+        :type exchange: Dict[str, Any]
+        """
+
+        # one line per exchange, so concurrent fleet checks may share recording
+        line = "{exchange}\n".format(exchange=json.dumps(exchange, sort_keys=True))
+        with self.lock, io.open(self.path, "a", encoding="utf-8") as destination:
+            destination.write(line)
+
+    def instrument(self, connection):
+        """
+        Instrument connection transport to record requests, responses and timings.
+
+        :param connection: connection to supervisord
+        :type connection: ServerProxy
+        :return: connection to supervisord
+        :rtype: ServerProxy
+        """
+
+        transport = connection("transport")
+        request, getparser = transport.request, transport.getparser
+        chunks = []  # type: ignore
+
+        def recording_getparser():
+            """
+            Create recording XML-RPC response parser.
+
+            :return: parser and unmarshaller
+            :rtype: Tuple[RecordingParser, Unmarshaller]
+            """
+
+            parser, unmarshaller = getparser()
+
+            return RecordingParser(parser=parser, chunks=chunks), unmarshaller  # type: ignore  # noqa: E501
+
+        def recording_request(host, handler, request_body, verbose=False):
+            """
+            Send request recording exchange.
+
+            :param host: target host
+            :type host: str
+            :param handler: target RPC handler
+            :type handler: str
+            :param request_body: XML-RPC request body
+            :type request_body: bytes
+            :param verbose: debugging flag
+            :type verbose: bool
+            :return: parsed response
+            :rtype: Tuple[Any, ...]
+            """
+
+            del chunks[:]
+            timestamp, started, error = time.time(), monotonic(), None
+            try:
+                return request(host, handler, request_body, verbose)
+            except Exception as exception:
+                error = exception
+                raise
+            finally:
+                exchange = {
+                    "server": self.server,
+                    "timestamp": timestamp,
+                    "duration": monotonic() - started,
+                    "request": base64.b64encode(request_body).decode("ascii"),
+                }
+                if chunks:  # faults are responses too
+                    exchange["response"] = base64.b64encode(b"".join(chunks)).decode(
+                        "ascii"
+                    )
+                else:
+                    exchange["error"] = str(error) or error.__class__.__name__
+                self.write(exchange=exchange)  # type: ignore
+
+        transport.getparser = recording_getparser
+        transport.request = recording_request
+
+        return connection
+
+
+class ReplayTransport(xmlrpclib.Transport):
+    """
+    Transport replaying recorded XML-RPC responses with recorded timings.
+    """
+
+    RECORDINGS = {}  # type: ignore
+    LOCK = threading.Lock()
+
+    def __init__(self, path, server, speed):
+        """
+        Init replay transport.
+
+        :param path: recording file path
+        :type path: str
+        :param server: replayed server (all servers replayed if not recorded)
+        :type server: str
+        :param speed: replay speed factor, or 0 to replay without delays
+        :type speed: float
+        """
+
+        xmlrpclib.Transport.__init__(self)
+        recording = self.load(path=path)  # type: ignore
+        self.exchanges = recording.get(server) or [
+            exchange for exchanges in recording.values() for exchange in exchanges
+        ]
+        self.speed = speed
+        self.position = 0
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load recording, loaded once per process.
+
+        :param path: recording file path
+        :type path: str
+        :return: recorded exchanges by server
+        :rtype: Dict[str, List[Dict[str, Any]]]
+        :raises CheckSupervisordError: unreadable or empty recording
+        """
+
+        with cls.LOCK:
+            if path not in cls.RECORDINGS:
+                recording = OrderedDict()  # type: ignore
+                try:
+                    with io.open(path, encoding="utf-8") as source:
+                        for line in source:
+                            exchange = json.loads(line)
+                            # parsed once, replayed requests matched against it
+                            exchange["call"] = cls._parse_request(  # type: ignore
+                                request_body=base64.b64decode(exchange["request"])
+                            )
+                            if "response" in exchange:
+                                exchange["response"] = base64.b64decode(
+                                    exchange["response"]
+                                )
+                            recording.setdefault(exchange["server"], []).append(
+                                exchange
+                            )
+                except (
+                    EnvironmentError,
+                    ValueError,
+                    KeyError,
+                    TypeError,
+                    ExpatError,
+                ) as error:
+                    raise CheckSupervisordError(
+                        "Can't read recording: '{path}'. {error}".format(
+                            path=path, error=error
+                        )
+                    )
+                if not recording:
+                    raise CheckSupervisordError(
+                        "Empty recording: '{path}'".format(path=path)
+                    )
+                cls.RECORDINGS[path] = recording
+
+            return cls.RECORDINGS[path]
+
+    @staticmethod
+    def _parse_request(request_body):
+        """
+        Parse XML-RPC request called method and params.
+
+        :param request_body: XML-RPC request body
+        :type request_body: bytes
+        :return: called method and params
+        :rtype: Tuple[str, Tuple[Any, ...]]
+        """
+
+        params, method = xmlrpclib.loads(request_body)
+
+        return method, params
+
+    def request(self, host, handler, request_body, verbose=False):
+        """
+        Replay next recorded exchange of same method call, starting over
+        when all replayed.
+
+        :param host: target host
+        :type host: str
+        :param handler: target RPC handler
+        :type handler: str
+        :param request_body: XML-RPC request body
+        :type request_body: bytes
+        :param verbose: debugging flag
+        :type verbose: bool
+        :return: parsed response
+        :rtype: Tuple[Any, ...]
+        :raises socket.error: recorded network error
+        :raises ValueError: request not recorded
+        """
+
+        call = self._parse_request(request_body=request_body)  # type: ignore
+        for offset in range(len(self.exchanges)):
+            position = (self.position + offset) % len(self.exchanges)
+            exchange = self.exchanges[position]
+            if exchange["call"] == call:
+                break
+        else:
+            raise ValueError("Request not recorded: '{method}'".format(method=call[0]))
+        self.position = position + 1
+        if self.speed:
+            time.sleep(exchange["duration"] / self.speed)
+        if "response" not in exchange:
+            raise socket.error(exchange["error"])
+
+        parser, unmarshaller = self.getparser()
+        parser.feed(exchange["response"])
+        parser.close()
+
+        return unmarshaller.close()
+
+
+class CheckSupervisord(object):
+    """
+    Check supervisord programs status Nagios plugin.
+    """
+
+    OUTPUT_TEMPLATES = {
+        "critical": {"text": "problem with '{name}': ({status})", "priority": 1},
+        "warning": {
+            "text": "something curiously with '{name}': ({status})",
+            "priority": 2,
+        },
+        "unknown": {"text": "'{name}' not found in server response", "priority": 3},
+        "ok": {"text": "'{name}': OK", "priority": 4},
+    }
+    STATUS_CRITICAL, STATUS_WARNING, STATUS_UNKNOWN, STATUS_OK = [
+        "critical",
+        "warning",
+        "unknown",
+        "ok",
+    ]
+    EXIT_CODES = {
+        STATUS_OK: 0,
+        STATUS_WARNING: 1,
+        STATUS_CRITICAL: 2,
+        STATUS_UNKNOWN: 3,
+    }
+    (
+        STATE_STOPPED,
+        STATE_RUNNING,
+        STATE_STARTING,
+        STATE_BACKOFF,
+        STATE_STOPPING,
+        STATE_EXITED,
+        STATE_FATAL,
+        STATE_UNKNOWN,
+    ) = (
+        "STOPPED",
+        "RUNNING",
+        "STARTING",
+        "BACKOFF",
+        "STOPPING",
+        "EXITED",
+        "FATAL",
+        "UNKNOWN",
+    )
+    STATES = [
+        STATE_STOPPED,
+        STATE_RUNNING,
+        STATE_STARTING,
+        STATE_BACKOFF,
+        STATE_STOPPING,
+        STATE_EXITED,
+        STATE_FATAL,
+        STATE_UNKNOWN,
+    ]
+    STATE_TO_TEMPLATE = {
+        STATE_STOPPED: STATUS_OK,
+        STATE_RUNNING: STATUS_OK,
+        STATE_STARTING: STATUS_WARNING,
+        STATE_BACKOFF: STATUS_WARNING,
+        STATE_STOPPING: STATUS_WARNING,
+        STATE_EXITED: STATUS_WARNING,
+        STATE_FATAL: STATUS_CRITICAL,
+        STATE_UNKNOWN: STATUS_UNKNOWN,
+    }
+    URI_TPL_HTTP, URI_TPL_HTTP_AUTH, URI_TPL_SOCKET = "http", "http-auth", "socket"
+    URI_TEMPLATES = {
+        URI_TPL_HTTP: "http://{server}:{port}",
+        URI_TPL_HTTP_AUTH: "http://{username}:{password}@{server}:{port}",
+        URI_TPL_SOCKET: "unix://{server}",
+    }
+    POLICY_REGEX = re.compile(
+        r"^(?:(?P<target>[^=]+):)?(?P<state>[A-Z]+)=(?P<status>[a-z]+)$"
+    )
+    UNIX_SCHEME = "unix://"
+    UNIX_SOCKET_URI = "http://localhost"
+    (
+        PRIORITY_CRITICAL,
+        PRIORITY_WARNING,
+        PRIORITY_UNKNOWN,
+        PRIORITY_OK,
+    ) = range(1, 5)
+    PRIORITY_TO_STATUS = {
+        PRIORITY_CRITICAL: STATUS_CRITICAL,
+        PRIORITY_WARNING: STATUS_WARNING,
+        PRIORITY_UNKNOWN: STATUS_UNKNOWN,
+        PRIORITY_OK: STATUS_OK,
+    }
+    STATUS_TO_PRIORITY = {
+        STATUS_CRITICAL: PRIORITY_CRITICAL,
+        STATUS_WARNING: PRIORITY_WARNING,
+        STATUS_UNKNOWN: PRIORITY_UNKNOWN,
+        STATUS_OK: PRIORITY_OK,
+    }
+    HELP_STATUSES = "Possible variants: {statuses}".format(
+        statuses=", ".join(EXIT_CODES.keys())
+    )
+    LOCAL_SERVERS = ["localhost", "127.0.0.1", "::1"]
+    RESOURCE_RSS, RESOURCE_CPU_TIME, RESOURCE_FDS, RESOURCE_THREADS = [
+        "rss",
+        "cpu_time",
+        "fds",
+        "threads",
+    ]
+    RESOURCES_UOM = {
+        RESOURCE_RSS: "B",
+        RESOURCE_CPU_TIME: "s",
+        RESOURCE_FDS: "",
+        RESOURCE_THREADS: "",
+    }
+    RESOURCES_THRESHOLDS = OrderedDict(
+        [
+            (RESOURCE_RSS, ("rss_warning", "rss_critical")),
+            (RESOURCE_CPU_TIME, ("cpu_time_warning", "cpu_time_critical")),
+            (RESOURCE_FDS, ("fds_warning", "fds_critical")),
+            (RESOURCE_THREADS, ("threads_warning", "threads_critical")),
+        ]
+    )
+    SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    SIZE_REGEX = re.compile(r"^\s*(\d+)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+
+    LATENCY_PERCENTILES = [50, 95, 99]
+    LOG_STDERR, LOG_STDOUT = "stderr", "stdout"
+    LOG_MIN_BYTES = 4096
+    LOG_METHODS = OrderedDict(
+        [
+            (LOG_STDERR, "supervisor.tailProcessStderrLog"),
+            (LOG_STDOUT, "supervisor.tailProcessStdoutLog"),
+        ]
+    )
+
+    CONFIG_SECTION = "check"
+    CONFIG_EXCLUDED = ["config", "help", "version"]
+
+    JUMP_HASH_MULTIPLIER = 2862933555777941757
+    JUMP_HASH_MASK = 0xFFFFFFFFFFFFFFFF
+    # unix sockets searched for in discovery directories
+    DISCOVERY_PATTERN = "*.sock"
+    # supervisord script or module in process command line
+    DISCOVERY_COMMANDS = [b"supervisord", b"supervisor.supervisord"]
+    # absolute supervisord default config paths, searched in order
+    DISCOVERY_CONFIGS = [b"/etc/supervisord.conf", b"/etc/supervisor/supervisord.conf"]
+    # listening (__SO_ACCEPTCON) unix socket flag in procfs
+    UNIX_SOCKET_LISTENING = 0x10000
+    # procfs rescanned at least that often
+    DISCOVERY_PROC_MAX_AGE = 300.0
+
+    DEFAULTS, PARSER = None, None
+    # parsed config cache format, bumped on incompatible changes
+    CONFIG_CACHE_SCHEMA = 1
+
+    def __init__(self, options=None):
+        """
+        Get command line args.
+
+        :param options: validated options, parsed from command line if not supplied
+        :type options: Union[Namespace, None]
+        """
+
+        started = monotonic()
+        # embedded checks must raise errors instead of exiting
+        self.embedded = options is not None
+        # explicitly given options overriding config file ones on reload
+        self.overrides = dict(vars(options)) if self.embedded else {}
+        self.options = options if self.embedded else self._get_options()  # type: ignore  # noqa: E501
+        self.policy = self._get_policy()  # type: ignore
+        self.formatters = self._get_formatters(options=self.options)  # type: ignore
+        # extra program fields used by output templates
+        self.fields = sorted(
+            set.union(*[formatter.fields for formatter in self.formatters.values()])
+            - {"name", "status"}  # noqa: W503
+        )
+        self.log_matcher = self._get_log_matcher()  # type: ignore
+        # long running exporter keeps circuit breaker state in memory
+        self.breaker = CircuitBreaker(  # type: ignore
+            failures=self.options.breaker_failures,
+            cooldown=self.options.breaker_cooldown,
+        )
+        self.histogram = LatencyHistogram()  # type: ignore
+        self.latency, self.percentiles = None, OrderedDict()
+        # configured programs names of last data fetched
+        self.configured = None
+        # network operations timeout in seconds, default socket timeout if None
+        self.timeout = None
+        # discovered supervisord processes IDs with unknown sockets
+        self.uninspected = []
+        self.resolver = Resolver(ttl=self.options.dns_ttl)  # type: ignore
+        self.recorder = (
+            Recorder(path=self.options.record, server=self.options.server)  # type: ignore  # noqa: E501
+            if self.options.record
+            else None
+        )
+        # replay continues across connections
+        self.replayer = (
+            ReplayTransport(  # type: ignore
+                path=self.options.replay,
+                server=self.options.server,
+                speed=self.options.replay_speed,
+            )
+            if self.options.replay
+            else None
+        )
+        self.profiler = Profiler(  # type: ignore
+            enabled=self.options.profile,
+            output=self.options.profile_output,
+            cprofile=self.options.profile_cprofile,
+        )
+        self.profiler.add(name=Profiler.PHASE_OPTIONS, duration=monotonic() - started)  # type: ignore  # noqa: E501
+
+    @classmethod
+    def from_options(cls, **kwargs):
+        """
+        Create check from keyword options instead of command line arguments.
+
+        :param kwargs: options, same as command line options destinations
+        :type kwargs: Dict[str, Any]
+        :return: configured check
+        :rtype: CheckSupervisord
+        :raises CheckSupervisordError: unknown or invalid options
+        """
+
+        if cls.PARSER is None:
+            # command line parser creation is slow, so parser and defaults cached
+            cls.PARSER = cls.__new__(cls)._get_parser()
+            cls.DEFAULTS = vars(cls.PARSER.parse_args([]))
+        unknown = set(kwargs.keys()) - set(cls.DEFAULTS.keys())
+        if unknown:
+            raise CheckSupervisordError(
+                "Unknown options: {options}".format(options=", ".join(sorted(unknown)))
+            )
+        options = Namespace(**dict(cls.DEFAULTS, **kwargs))
+        if options.config:
+            # keyword options override config file ones
+            options = Namespace(
+                **dict(
+                    cls.DEFAULTS,
+                    **dict(
+                        cls.__new__(cls)._load_config(
+                            options=options, parser=cls.PARSER
+                        ),
+                        **kwargs
+                    )
+                )
+            )
+        cls.__new__(cls)._validate_options(options=options)
+        checker = cls(options=options)
+        checker.overrides = kwargs
+
+        return checker
+
+    def _get_options(self):
+        """
+        Parse commandline options arguments.
+
+        :return: parsed command line arguments
+        :rtype: Namespace
+        """
+
+        parser = self._get_parser()  # type: ignore
+        try:
+            options = self._parse_options(parser=parser)  # type: ignore
+        except CheckSupervisordError as error:
+            parser.error(message=str(error))
+        if options.exporter:
+            # only long running exporter reloads options
+            self.overrides = self._get_overrides(parser=parser)  # type: ignore
+
+        return options
+
+    def _get_overrides(self, parser):
+        """
+        Parse command line options given explicitly (without defaults).
+
+        :param parser: command line arguments parser
+        :type parser: ArgumentParser
+        :return: explicitly given command line options
+        :rtype: Dict[str, Any]
+        """
+
+        # parser does not set defaults for options already present in namespace
+        empty = Namespace(**dict.fromkeys(vars(parser.parse_args([]))))
+
+        return {
+            name: value
+            for name, value in vars(parser.parse_args(namespace=empty)).items()
+            if value is not None
+        }
+
+    def _reload_config(self):
+        """
+        Create checker with the same explicitly given options re-reading
+        config file.
+
+        :return: configured checker
+        :rtype: CheckSupervisord
+        :raises CheckSupervisordError: invalid options
+        """
+
+        return self.__class__.from_options(**self.overrides)  # type: ignore
+
+    def _parse_options(self, parser):
+        """
+        Parse and validate command line and config file options.
+
+        :param parser: command line arguments parser
+        :type parser: ArgumentParser
+        :return: validated options
+        :rtype: Namespace
+        :raises CheckSupervisordError: invalid options
+        """
+
+        options = parser.parse_args()
+        if options.config:
+            # command line options override config file ones
+            parser.set_defaults(**self._load_config(options=options, parser=parser))  # type: ignore  # noqa: E501
+            options = parser.parse_args()
+        self._validate_options(options=options)  # type: ignore
+
+        return options
+
+    def _get_parser(self):
+        """
+        Create command line options arguments parser.
+
+        :return: command line arguments parser
+        :rtype: ArgumentParser
+        """
+
+        parser = ArgumentParser(
+            description="Check supervisord programs status Nagios plugin"
+        )
+        parser.add_argument(
+            "-s",
+            "--server",
+            action="store",
+            dest="server",
+            type=str,
+            default="",
+            metavar="SERVER",
+            help="server name, IP address, unix socket path or unix socket URI (unix:///path/to/supervisord.sock) to use built-in unix socket transport",  # noqa: E501
+        )
+        parser.add_argument(
+            "-p",
+            "--port",
+            action="store",
+            type=int,
+            dest="port",
+            default=9001,
+            metavar="PORT",
+            help="port number",
+        )
+        parser.add_argument(
+            "-P",
+            "--programs",
+            action="store",
+            dest="programs",
+            type=str,
+            default="",
+            metavar="PROGRAMS",
+            help="comma separated programs list, or empty for all programs in supervisord response",  # noqa: E501
+        )
+        parser.add_argument(
+            "--missing-programs",
+            action="store_true",
+            default=False,
+            dest="missing_programs",
+            help="report programs configured in supervisord but absent from its response (reread but not updated or removed ones) if programs list empty",  # noqa: E501
+        )
+        parser.add_argument(
+            "--missing-programs-max-age",
+            action="store",
+            dest="missing_programs_max_age",
+            type=float,
+            default=300.0,
+            metavar="MISSING_PROGRAMS_MAX_AGE",
+            help="seconds count to cache supervisord programs config for (so programs reread but not updated reported after at most that long), invalidated earlier once supervisord restarted or running programs changed",  # noqa: E501
+        )
+        parser.add_argument(
+            "-u",
+            "--username",
+            action="store",
+            dest="username",
+            type=str,
+            default="",
+            metavar="USERNAME",
+            help="supervisord user",
+        )
+        parser.add_argument(
+            "-S",
+            "--password",
+            action="store",
+            dest="password",
+            type=str,
+            default="",
+            metavar="PASSWORD",
+            help="supervisord user password",
+        )
+        parser.add_argument(
+            "--stopped-state-exit-code",
+            action="store",
+            dest="stopped_state_exit_code",
+            type=str,
+            choices=self.EXIT_CODES.keys(),
+            default=self.STATUS_OK,
+            metavar="STOPPED_STATE_EXIT_CODE",
+            help="stopped state exit code. {statuses}".format(
+                statuses=self.HELP_STATUSES
+            ),
+        )
+        parser.add_argument(
+            "--starting-state-exit-code",
+            action="store",
+            dest="starting_state_exit_code",
+            type=str,
+            choices=self.EXIT_CODES.keys(),
+            default=self.STATUS_WARNING,
+            metavar="STARTING_STATE_EXIT_CODE",
+            help="starting state exit code. {statuses}".format(
+                statuses=self.HELP_STATUSES
+            ),
+        )
+        parser.add_argument(
+            "--state-exit-code",
+            action="append",
+            dest="state_exit_codes",
+            type=str,
+            default=None,
+            metavar="STATE=STATUS",
+            help="state exit code, can be supplied multiple times (e.g. BACKOFF=critical). {statuses}".format(  # noqa: E501
+                statuses=self.HELP_STATUSES
+            ),
+        )
+        parser.add_argument(
+            "--group-state-exit-code",
+            action="append",
+            dest="group_state_exit_codes",
+            type=str,
+            default=None,
+            metavar="GROUP:STATE=STATUS",
+            help="programs group state exit code, can be supplied multiple times (e.g. workers:EXITED=ok). {statuses}".format(  # noqa: E501
+                statuses=self.HELP_STATUSES
+            ),
+        )
+        parser.add_argument(
+            "--program-state-exit-code",
+            action="append",
+            dest="program_state_exit_codes",
+            type=str,
+            default=None,
+            metavar="PROGRAM:STATE=STATUS",
+            help="program (name or group:name) state exit code, can be supplied multiple times (e.g. cron:STOPPED=critical). {statuses}".format(  # noqa: E501
+                statuses=self.HELP_STATUSES
+            ),
+        )
+        parser.add_argument(
+            "--network-errors-exit-code",
+            action="store",
+            dest="network_errors_exit_code",
+            type=str,
+            choices=self.EXIT_CODES.keys(),
+            default=self.STATUS_UNKNOWN,
+            metavar="NETWORK_ERRORS_EXIT_CODE",
+            help="network errors exit code. {statuses}".format(
+                statuses=self.HELP_STATUSES
+            ),
+        )
+        parser.add_argument(
+            "--no-programs-defined-exit-code",
+            action="store",
+            dest="no_programs_defined_exit_code",
+            type=str,
+            choices=self.EXIT_CODES.keys(),
+            default=self.STATUS_UNKNOWN,
+            metavar="NO_PROGRAMS_DEFINED_EXIT_CODE",
+            help="no programs defined exit code. {statuses}".format(
+                statuses=self.HELP_STATUSES
+            ),
+        )
+        parser.add_argument(
+            "--proc-stats",
+            action="store_true",
+            default=False,
+            dest="proc_stats",
+            help="report supervised processes resources usage (RSS, CPU time, open files and threads) as performance data, available only for local supervisord server",  # noqa: E501
+        )
+        parser.add_argument(
+            "--proc-root",
+            action="store",
+            dest="proc_root",
+            type=str,
+            default="/proc",
+            metavar="PROC_ROOT",
+            help="procfs mount point",
+        )
+        parser.add_argument(
+            "--latency-stats",
+            action="store_true",
+            default=False,
+            dest="latency_stats",
+            help="keep supervisord response latency histogram and report its percentiles as performance data",  # noqa: E501
+        )
+        parser.add_argument(
+            "--latency-warning",
+            action="store",
+            dest="latency_warning",
+            type=float,
+            default=None,
+            metavar="LATENCY_WARNING",
+            help="supervisord response latency warning threshold (seconds)",
+        )
+        parser.add_argument(
+            "--latency-critical",
+            action="store",
+            dest="latency_critical",
+            type=float,
+            default=None,
+            metavar="LATENCY_CRITICAL",
+            help="supervisord response latency critical threshold (seconds)",
+        )
+        parser.add_argument(
+            "--rss-warning",
+            action="store",
+            dest="rss_warning",
+            type=self._parse_size,
+            default=None,
+            metavar="RSS_WARNING",
+            help="supervised process resident memory size warning threshold (bytes, K, M, G and T suffixes supported)",  # noqa: E501
+        )
+        parser.add_argument(
+            "--rss-critical",
+            action="store",
+            dest="rss_critical",
+            type=self._parse_size,
+            default=None,
+            metavar="RSS_CRITICAL",
+            help="supervised process resident memory size critical threshold (bytes, K, M, G and T suffixes supported)",  # noqa: E501
+        )
+        parser.add_argument(
+            "--cpu-time-warning",
+            action="store",
+            dest="cpu_time_warning",
+            type=float,
+            default=None,
+            metavar="CPU_TIME_WARNING",
+            help="supervised process consumed CPU time warning threshold (seconds)",
+        )
+        parser.add_argument(
+            "--cpu-time-critical",
+            action="store",
+            dest="cpu_time_critical",
+            type=float,
+            default=None,
+            metavar="CPU_TIME_CRITICAL",
+            help="supervised process consumed CPU time critical threshold (seconds)",
+        )
+        parser.add_argument(
+            "--fds-warning",
+            action="store",
+            dest="fds_warning",
+            type=int,
+            default=None,
+            metavar="FDS_WARNING",
+            help="supervised process open file descriptors count warning threshold",
+        )
+        parser.add_argument(
+            "--fds-critical",
+            action="store",
+            dest="fds_critical",
+            type=int,
+            default=None,
+            metavar="FDS_CRITICAL",
+            help="supervised process open file descriptors count critical threshold",
+        )
+        parser.add_argument(
+            "--threads-warning",
+            action="store",
+            dest="threads_warning",
+            type=int,
+            default=None,
+            metavar="THREADS_WARNING",
+            help="supervised process threads count warning threshold",
+        )
+        parser.add_argument(
+            "--threads-critical",
+            action="store",
+            dest="threads_critical",
+            type=int,
+            default=None,
+            metavar="THREADS_CRITICAL",
+            help="supervised process threads count critical threshold",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            default=False,
+            dest="profile",
+            help="report check phases timings as JSON",
+        )
+        parser.add_argument(
+            "--profile-output",
+            action="store",
+            dest="profile_output",
+            type=str,
+            default="",
+            metavar="PROFILE_OUTPUT",
+            help="check phases timings report file path, or empty for stderr",
+        )
+        parser.add_argument(
+            "--profile-cprofile",
+            action="store_true",
+            default=False,
+            dest="profile_cprofile",
+            help="run check under cProfile and add top functions to phases timings report (implies --profile)",  # noqa: E501
+        )
+        parser.add_argument(
+            "--record",
+            action="store",
+            dest="record",
+            type=str,
+            default="",
+            metavar="RECORD",
+            help="append supervisord XML-RPC requests, responses and timings to this file for offline replay",  # noqa: E501
+        )
+        parser.add_argument(
+            "--replay",
+            action="store",
+            dest="replay",
+            type=str,
+            default="",
+            metavar="REPLAY",
+            help="replay supervisord responses recorded with --record instead of connecting to server",  # noqa: E501
+        )
+        parser.add_argument(
+            "--replay-speed",
+            action="store",
+            dest="replay_speed",
+            type=float,
+            default=1.0,
+            metavar="REPLAY_SPEED",
+            help="recorded response times speed up factor, or 0 to replay without delays",  # noqa: E501
+        )
+        parser.add_argument(
+            "--output-template",
+            action="append",
+            dest="output_templates",
+            type=str,
+            default=None,
+            metavar="STATUS=TEMPLATE",
+            help='program output template by status, can be supplied multiple times (e.g. "critical={{name}} (pid {{pid}}) is {{status}}"). Available fields: {fields}'.format(  # noqa: E501
+                fields=", ".join(OutputFormatter.FIELDS)
+            ),
+        )
+        parser.add_argument(
+            "--summary",
+            action="store_true",
+            default=False,
+            dest="summary",
+            help="output programs counts by status and first non-OK programs only instead of all programs statuses",  # noqa: E501
+        )
+        parser.add_argument(
+            "--summary-limit",
+            action="store",
+            dest="summary_limit",
+            type=int,
+            default=10,
+            metavar="SUMMARY_LIMIT",
+            help="non-OK programs count to output in summary",
+        )
+        parser.add_argument(
+            "--output-limit",
+            action="store",
+            dest="output_limit",
+            type=int,
+            default=0,
+            metavar="OUTPUT_LIMIT",
+            help="output size limit in bytes, or 0 for unlimited",
+        )
+        parser.add_argument(
+            "--exporter",
+            action="store_true",
+            default=False,
+            dest="exporter",
+            help="run as Prometheus exporter serving supervisord programs states on /metrics",  # noqa: E501
+        )
+        parser.add_argument(
+            "--exporter-address",
+            action="store",
+            dest="exporter_address",
+            type=str,
+            default="",
+            metavar="EXPORTER_ADDRESS",
+            help="Prometheus exporter listen address, or empty for all interfaces",
+        )
+        parser.add_argument(
+            "--exporter-port",
+            action="store",
+            dest="exporter_port",
+            type=int,
+            default=9876,
+            metavar="EXPORTER_PORT",
+            help="Prometheus exporter listen port",
+        )
+        parser.add_argument(
+            "--exporter-interval",
+            action="store",
+            dest="exporter_interval",
+            type=float,
+            default=15.0,
+            metavar="EXPORTER_INTERVAL",
+            help="minimal interval between supervisord requests in seconds, scrapes in between served from cache",  # noqa: E501
+        )
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            default=False,
+            dest="schedule",
+            help="request exporter servers in background by adaptive schedule instead of on scrapes",  # noqa: E501
+        )
+        parser.add_argument(
+            "--schedule-interval",
+            action="append",
+            dest="schedule_intervals",
+            type=str,
+            default=None,
+            metavar="[SERVER=]SCHEDULE_INTERVAL",
+            help="scheduled requests interval in seconds used after changes and problems (exporter interval by default), globally or per server, can be supplied multiple times",  # noqa: E501
+        )
+        parser.add_argument(
+            "--schedule-backoff",
+            action="store",
+            dest="schedule_backoff",
+            type=float,
+            default=2.0,
+            metavar="SCHEDULE_BACKOFF",
+            help="scheduled requests interval multiplier after each unchanged OK result",  # noqa: E501
+        )
+        parser.add_argument(
+            "--schedule-max-interval",
+            action="store",
+            dest="schedule_max_interval",
+            type=float,
+            default=300.0,
+            metavar="SCHEDULE_MAX_INTERVAL",
+            help="scheduled requests interval limit in seconds for stable servers",
+        )
+        parser.add_argument(
+            "--schedule-jitter",
+            action="store",
+            dest="schedule_jitter",
+            type=float,
+            default=0.1,
+            metavar="SCHEDULE_JITTER",
+            help="scheduled requests intervals random spread fraction",
+        )
+        parser.add_argument(
+            "--schedule-concurrency",
+            action="store",
+            dest="schedule_concurrency",
+            type=int,
+            default=16,
+            metavar="SCHEDULE_CONCURRENCY",
+            help="scheduled in-flight requests count limit",
+        )
+        parser.add_argument(
+            "--schedule-host-concurrency",
+            action="store",
+            dest="schedule_host_concurrency",
+            type=int,
+            default=2,
+            metavar="SCHEDULE_HOST_CONCURRENCY",
+            help="scheduled in-flight requests count limit per host (unix sockets share local one)",  # noqa: E501
+        )
+        parser.add_argument(
+            "--log-critical-pattern",
+            action="append",
+            dest="log_critical_patterns",
+            type=str,
+            default=None,
+            metavar="LOG_CRITICAL_PATTERN",
+            help="programs new log lines regular expression to return critical status for, can be supplied multiple times",  # noqa: E501
+        )
+        parser.add_argument(
+            "--log-warning-pattern",
+            action="append",
+            dest="log_warning_patterns",
+            type=str,
+            default=None,
+            metavar="LOG_WARNING_PATTERN",
+            help="programs new log lines regular expression to return warning status for, can be supplied multiple times",  # noqa: E501
+        )
+        parser.add_argument(
+            "--log-stream",
+            action="append",
+            dest="log_streams",
+            type=str,
+            default=None,
+            choices=list(self.LOG_METHODS.keys()),
+            help="programs log to scan, can be supplied multiple times (stderr by default)",  # noqa: E501
+        )
+        parser.add_argument(
+            "--log-max-bytes",
+            action="store",
+            dest="log_max_bytes",
+            type=self._parse_size,
+            default=64 * 1024,
+            metavar="LOG_MAX_BYTES",
+            help="program log new bytes count limit to scan per check (bytes, K, M, G and T suffixes supported)",  # noqa: E501
+        )
+        parser.add_argument(
+            "--hedge-servers",
+            action="store",
+            dest="hedge_servers",
+            type=str,
+            default="",
+            metavar="HEDGE_SERVERS",
+            help="comma-separated redundant endpoints of the same supervisord (SERVER[:PORT] or unix socket) to race with server one by one",  # noqa: E501
+        )
+        parser.add_argument(
+            "--hedge-delay",
+            action="store",
+            dest="hedge_delay",
+            type=float,
+            default=0.1,
+            metavar="HEDGE_DELAY",
+            help="seconds count to wait for reply before firing hedged request to next endpoint",  # noqa: E501
+        )
+        parser.add_argument(
+            "--hedge-percentile",
+            action="store",
+            dest="hedge_percentile",
+            type=float,
+            default=0.0,
+            metavar="HEDGE_PERCENTILE",
+            help="server latency percentile to wait for reply before firing hedged request, or 0 to use fixed delay",  # noqa: E501
+        )
+        parser.add_argument(
+            "--dns-ttl",
+            action="store",
+            dest="dns_ttl",
+            type=float,
+            default=60.0,
+            metavar="DNS_TTL",
+            help="seconds count to cache resolved server addresses for in long-lived modes, or 0 to disable",  # noqa: E501
+        )
+        parser.add_argument(
+            "--cluster-servers",
+            action="store",
+            dest="cluster_servers",
+            type=str,
+            default="",
+            metavar="CLUSTER_SERVERS",
+            help="comma-separated cluster servers list (SERVER[:PORT] or unix socket), enables cluster-level check",  # noqa: E501
+        )
+        parser.add_argument(
+            "--quorum",
+            action="store",
+            dest="quorum",
+            type=int,
+            default=0,
+            metavar="QUORUM",
+            help="cluster servers count must run programs, or 0 for majority",
+        )
+        parser.add_argument(
+            "--quorum-exit-code",
+            action="store",
+            dest="quorum_exit_code",
+            type=str,
+            choices=self.EXIT_CODES.keys(),
+            default=self.STATUS_CRITICAL,
+            metavar="QUORUM_EXIT_CODE",
+            help="cluster quorum lost exit code",
+        )
+        parser.add_argument(
+            "--cluster-timeout",
+            action="store",
+            dest="cluster_timeout",
+            type=float,
+            default=10.0,
+            metavar="CLUSTER_TIMEOUT",
+            help="cluster servers responses waiting timeout in seconds",
+        )
+        parser.add_argument(
+            "--fleet-servers",
+            action="store",
+            dest="fleet_servers",
+            type=str,
+            default="",
+            metavar="FLEET_SERVERS",
+            help="comma-separated fleet servers list (SERVER[:PORT] or unix socket), enables fleet check",  # noqa: E501
+        )
+        parser.add_argument(
+            "--fleet-file",
+            action="store",
+            dest="fleet_file",
+            type=str,
+            default="",
+            metavar="FLEET_FILE",
+            help="fleet servers file path (one SERVER[:PORT] or unix socket per line), enables fleet check",  # noqa: E501
+        )
+        parser.add_argument(
+            "--discover-sockets",
+            action="append",
+            dest="discover_sockets",
+            type=str,
+            metavar="DISCOVER_SOCKETS",
+            help="discover supervisord unix sockets matching glob pattern or inside directory as fleet servers (may be repeated), enables fleet check",  # noqa: E501
+        )
+        parser.add_argument(
+            "--discover-proc",
+            action="store_true",
+            default=False,
+            dest="discover_proc",
+            help="discover running supervisord processes unix sockets in procfs as fleet servers, enables fleet check",  # noqa: E501
+        )
+        parser.add_argument(
+            "--fleet-workers",
+            action="store",
+            dest="fleet_workers",
+            type=int,
+            default=0,
+            metavar="FLEET_WORKERS",
+            help="fleet check worker processes count, or 0 for CPU count",
+        )
+        parser.add_argument(
+            "--fleet-concurrency",
+            action="store",
+            dest="fleet_concurrency",
+            type=int,
+            default=32,
+            metavar="FLEET_CONCURRENCY",
+            help="fleet check (per worker process) and exporter scrape concurrent requests count",  # noqa: E501
+        )
+        parser.add_argument(
+            "--fleet-timeout",
+            action="store",
+            dest="fleet_timeout",
+            type=float,
+            default=10.0,
+            metavar="FLEET_TIMEOUT",
+            help="fleet servers network operations timeout in seconds",
+        )
+        parser.add_argument(
+            "--breaker-failures",
+            action="store",
+            dest="breaker_failures",
+            type=int,
+            default=0,
+            metavar="BREAKER_FAILURES",
+            help="consecutive server communication failures count to fail fast after, or 0 to disable",  # noqa: E501
+        )
+        parser.add_argument(
+            "--breaker-cooldown",
+            action="store",
+            dest="breaker_cooldown",
+            type=float,
+            default=60.0,
+            metavar="BREAKER_COOLDOWN",
+            help="seconds count to fail fast for before next probe request",
+        )
+        parser.add_argument(
+            "--node-id",
+            action="store",
+            dest="node_id",
+            type=int,
+            default=0,
+            metavar="NODE_ID",
+            help="this monitoring node number (from 0) to check only its own fleet servers share",  # noqa: E501
+        )
         parser.add_argument(
-            "-P",
-            "--programs",
+            "--node-count",
             action="store",
-            dest="programs",
+            dest="node_count",
+            type=int,
+            default=1,
+            metavar="NODE_COUNT",
+            help="monitoring nodes count sharing fleet servers",
+        )
+        parser.add_argument(
+            "--state-dir",
+            action="store",
+            dest="state_dir",
+            type=str,
+            default=os.path.join(
+                tempfile.gettempdir(),
+                # per user, so other users can not take shared directory over
+                "nagios-check-supervisord-{uid}".format(uid=os.getuid())
+                if hasattr(os, "getuid")
+                else "nagios-check-supervisord",
+            ),
+            metavar="STATE_DIR",
+            help="directory to keep state between checks in, must be private to plugin user",  # noqa: E501
+        )
+        parser.add_argument(
+            "-c",
+            "--config",
+            action="store",
+            dest="config",
             type=str,
             default="",
-            metavar="PROGRAMS",
-            help="comma separated programs list, or empty for all programs in supervisord response",  # noqa: E501
+            metavar="CONFIG",
+            help="INI config file with options in [check] section, named as long command line options without leading dashes",  # noqa: E501
+        )
+        parser.add_argument(
+            "--stale-max-age",
+            action="store",
+            dest="stale_max_age",
+            type=float,
+            default=0.0,
+            metavar="STALE_MAX_AGE",
+            help="return last good result younger than this seconds count immediately and refresh it in background, or 0 to disable",  # noqa: E501
+        )
+        parser.add_argument(
+            "--stale-warning-age",
+            action="store",
+            dest="stale_warning_age",
+            type=float,
+            default=0.0,
+            metavar="STALE_WARNING_AGE",
+            help="return at least warning status for stale results older than this seconds count, or 0 to disable",  # noqa: E501
+        )
+        parser.add_argument(
+            "-q",
+            "--quiet",
+            action="store_true",
+            default=False,
+            dest="quiet",
+            help="be quiet",
+        )
+        parser.add_argument(
+            "-v",
+            "--version",
+            action="version",
+            version="{version}".format(version=__version__),
+        )
+
+        return parser
+
+    def _validate_options(self, options):
+        """
+        Validate and normalize options.
+
+        :param options: options
+        :type options: Namespace
+        :raises CheckSupervisordError: invalid options
+        """
+
+        # check mandatory command line options supplied
+        if not any(
+            [
+                options.server,
+                options.cluster_servers,
+                options.fleet_servers,
+                options.fleet_file,
+                options.discover_sockets,
+                options.discover_proc,
+            ]
+        ):
+            raise CheckSupervisordError("Required server address option missing")
+        if options.username and not options.password:
+            raise CheckSupervisordError("Required supervisord user password missing")
+        for name, value in vars(options).items():
+            if name.endswith("_exit_code") and value not in self.EXIT_CODES:
+                raise CheckSupervisordError(
+                    "Invalid {name} option value: '{value}'. {statuses}".format(
+                        name=name, value=value, statuses=self.HELP_STATUSES
+                    )
+                )
+        self._parse_policy(values=options.state_exit_codes, target=False)  # type: ignore  # noqa: E501
+        self._parse_policy(values=options.group_state_exit_codes, target=True)  # type: ignore  # noqa: E501
+        self._parse_policy(values=options.program_state_exit_codes, target=True)  # type: ignore  # noqa: E501
+        self._get_formatters(options=options)  # type: ignore
+        # enable processes resources sampling if any threshold supplied
+        if any(
+            getattr(options, threshold) is not None
+            for thresholds in self.RESOURCES_THRESHOLDS.values()
+            for threshold in thresholds
+        ):
+            options.proc_stats = True
+        # enable latency histogram if any threshold or hedge percentile supplied
+        if (
+            options.latency_warning is not None
+            or options.latency_critical is not None  # noqa: W503
+            or options.hedge_percentile  # noqa: W503
+        ):
+            options.latency_stats = True
+        if not 0 <= options.hedge_percentile <= 100:
+            raise CheckSupervisordError(
+                "Invalid hedge percentile option value: '{value}'. Must be between 0 and 100".format(  # noqa: E501
+                    value=options.hedge_percentile
+                )
+            )
+        fleet = self._is_fleet(options=options)  # type: ignore
+        if (options.log_critical_patterns or options.log_warning_patterns) and (
+            options.exporter
+            or options.hedge_servers  # noqa: W503
+            or options.cluster_servers  # noqa: W503
+            or fleet  # noqa: W503
+        ):
+            raise CheckSupervisordError(
+                "Log scanning can't be combined with exporter mode, hedged requests, cluster and fleet checks"  # noqa: E501
+            )
+        for pattern in (options.log_critical_patterns or []) + (
+            options.log_warning_patterns or []
+        ):
+            try:
+                re.compile(pattern)
+            except re.error as error:
+                raise CheckSupervisordError(
+                    "Invalid log pattern: '{pattern}'. {error}".format(
+                        pattern=pattern, error=error
+                    )
+                )
+        if (options.cluster_servers or fleet) and (
+            (options.cluster_servers and options.exporter)
+            or options.proc_stats  # noqa: W503
+            or (options.cluster_servers and fleet)  # noqa: W503
+        ):
+            raise CheckSupervisordError(
+                "Cluster and fleet checks can't be combined with each other and processes resources sampling, cluster checks with exporter mode"  # noqa: E501
+            )
+        if options.hedge_servers:
+            if (
+                options.cluster_servers
+                or fleet  # noqa: W503
+                or options.exporter  # noqa: W503
+                or options.missing_programs  # noqa: W503
+            ):
+                raise CheckSupervisordError(
+                    "Hedged requests can't be combined with cluster and fleet checks, exporter mode and missing programs detection"  # noqa: E501
+                )
+            self._parse_servers(value=options.hedge_servers, port=options.port)  # type: ignore  # noqa: E501
+        if options.hedge_delay < 0 or options.dns_ttl < 0:
+            raise CheckSupervisordError(
+                "Invalid hedge delay or DNS TTL option value. Must be non-negative"
+            )
+        if options.cluster_servers:
+            servers = self._parse_servers(  # type: ignore
+                value=options.cluster_servers, port=options.port
+            )
+            if not 0 <= options.quorum <= len(servers):
+                raise CheckSupervisordError(
+                    "Invalid quorum option value: '{quorum}'. Must be between 0 and cluster servers count ({count})".format(  # noqa: E501
+                        quorum=options.quorum, count=len(servers)
+                    )
+                )
+        if fleet:
+            if options.fleet_servers or options.fleet_file:
+                # discovery deferred to check
+                self._get_fleet_servers(options=options, discover=False)  # type: ignore
+            if options.fleet_workers < 0 or options.fleet_concurrency < 1:
+                raise CheckSupervisordError(
+                    "Invalid fleet workers or concurrency option value"
+                )
+        if options.schedule:
+            if not options.exporter:
+                raise CheckSupervisordError(
+                    "Adaptive schedule available only in exporter mode"
+                )
+            self._parse_intervals(values=options.schedule_intervals)  # type: ignore
+            if (
+                options.schedule_backoff < 1
+                or not 0 <= options.schedule_jitter < 1  # noqa: W503
+                or options.schedule_concurrency < 1  # noqa: W503
+                or options.schedule_host_concurrency < 1  # noqa: W503
+            ):
+                raise CheckSupervisordError(
+                    "Invalid schedule backoff, jitter or concurrency option value"
+                )
+        if options.record and options.replay:
+            raise CheckSupervisordError("Recording can't be combined with replay")
+        if options.replay:
+            if options.replay_speed < 0:
+                raise CheckSupervisordError(
+                    "Invalid replay speed option value. Must be non-negative"
+                )
+            ReplayTransport.load(path=options.replay)  # type: ignore
+        if options.breaker_failures < 0 or options.breaker_cooldown < 0:
+            raise CheckSupervisordError("Invalid circuit breaker option value")
+        if options.stale_max_age < 0 or options.stale_warning_age < 0:
+            raise CheckSupervisordError("Invalid stale result age option value")
+        if (
+            options.stale_max_age and options.stale_warning_age >= options.stale_max_age
+        ):  # noqa: E501
+            raise CheckSupervisordError(
+                "Invalid stale warning age option value. Must be less than stale max age"  # noqa: E501
+            )
+        if not 0 <= options.node_id < options.node_count:
+            raise CheckSupervisordError(
+                "Invalid node ID option value: '{node}'. Must be between 0 and nodes count ({count}) - 1".format(  # noqa: E501
+                    node=options.node_id, count=options.node_count
+                )
+            )
+        if options.proc_stats and not self._is_local_server(server=options.server):  # type: ignore  # noqa: E501
+            raise CheckSupervisordError(
+                "Processes resources sampling available only for local supervisord server"  # noqa: E501
+            )
+
+    def _load_config(self, options, parser):
+        """
+        Load config file options, cached in state directory until file changes.
+
+        :param options: options with config file path and state directory
+        :type options: Namespace
+        :param parser: command line arguments parser
+        :type parser: ArgumentParser
+        :return: config file options values
+        :rtype: Dict[str, Any]
+        :raises CheckSupervisordError: unreadable or invalid config file
+        """
+
+        path = os.path.abspath(options.config)
+        try:
+            info = os.stat(path)
+        except EnvironmentError as error:
+            raise CheckSupervisordError(
+                "Invalid config file: '{path}'. {error}".format(path=path, error=error)
+            )
+        # cache is stale once config file changed or written by another version
+        stamp = [
+            path,
+            info.st_mtime,
+            info.st_size,
+            __version__,
+            self.CONFIG_CACHE_SCHEMA,
+        ]
+        # state helpers read state directory from options
+        self.options = options
+        name = self._get_state_name(kind="config", key={"config": path})  # type: ignore
+        cache = self._read_state(name=name)  # type: ignore
+        if (
+            isinstance(cache, dict)
+            and cache.get("stamp") == stamp  # noqa: W503
+            and isinstance(cache.get("values"), dict)  # noqa: W503
+        ):
+
+            return cache["values"]
+
+        values = self._parse_config(path=path, parser=parser)  # type: ignore
+        try:
+            self._write_state(name=name, state={"stamp": stamp, "values": values})  # type: ignore  # noqa: E501
+        except EnvironmentError:  # nosec: B110
+            # unusable state directory only disables cache
+            pass
+
+        return values
+
+    def _parse_config(self, path, parser):
+        """
+        Parse and convert config file options.
+
+        :param path: config file path
+        :type path: str
+        :param parser: command line arguments parser
+        :type parser: ArgumentParser
+        :return: config file options values
+        :rtype: Dict[str, Any]
+        :raises CheckSupervisordError: unreadable or invalid config file
+        """
+
+        # no interpolation, passwords may contain "%"
+        config = configparser.RawConfigParser()
+        try:
+            with io.open(path, encoding="utf-8") as source:
+                if hasattr(config, "read_file"):
+                    config.read_file(source)
+                else:
+                    config.readfp(source)  # python 2
+        except (EnvironmentError, configparser.Error) as error:
+            raise CheckSupervisordError(
+                "Invalid config file: '{path}'. {error}".format(path=path, error=error)
+            )
+        unknown = set(config.sections()) - {self.CONFIG_SECTION}
+        if unknown:
+            raise CheckSupervisordError(
+                "Unknown config sections: {sections}".format(
+                    sections=", ".join(sorted(unknown))
+                )
+            )
+        if not config.has_section(self.CONFIG_SECTION):
+
+            return {}
+
+        actions = {
+            option[2:]: action
+            for action in parser._actions  # pylint: disable=W0212
+            for option in action.option_strings
+            if option.startswith("--") and action.dest not in self.CONFIG_EXCLUDED
+        }
+        append = parser._registry_get("action", "append")  # pylint: disable=W0212
+        values = {}
+        for key, value in config.items(self.CONFIG_SECTION):
+            action = actions.get(key)
+            if action is None:
+                raise CheckSupervisordError(
+                    "Unknown config option: '{key}'".format(key=key)
+                )
+            try:
+                if action.nargs == 0:  # flags
+                    values[action.dest] = (
+                        action.const
+                        if config.getboolean(self.CONFIG_SECTION, key)
+                        else action.default
+                    )
+                elif isinstance(action, append):  # one value per line
+                    values[action.dest] = [
+                        self._convert_config_value(action=action, value=line.strip())  # type: ignore  # noqa: E501
+                        for line in value.splitlines()
+                        if line.strip()
+                    ]
+                else:
+                    values[action.dest] = self._convert_config_value(  # type: ignore
+                        action=action, value=value.strip()
+                    )
+            except (ValueError, TypeError, ArgumentTypeError) as error:
+                raise CheckSupervisordError(
+                    "Invalid config option value: '{key} = {value}'. {error}".format(
+                        key=key, value=value, error=error
+                    )
+                )
+
+        return values
+
+    def _convert_config_value(self, action, value):
+        """
+        Convert config file option value same way as command line one.
+
+        :param action: command line argument action
+        :type action: Action
+        :param value: config file option value
+        :type value: str
+        :return: converted value
+        :rtype: Any
+        :raises ValueError: value not in argument choices
+        """
+
+        if action.type is not None:
+            value = action.type(value)
+        if action.choices is not None and value not in action.choices:
+            raise ValueError(
+                "invalid choice: '{value}' (choose from {choices})".format(
+                    value=value, choices=", ".join(action.choices)
+                )
+            )
+
+        return value
+
+    def _parse_policy(self, values, target):
+        """
+        Parse states exit codes policy overrides.
+
+        :param values: overrides in "[TARGET:]STATE=STATUS" format
+        :type values: Union[List[str], None]
+        :param target: is overrides target (program or group) required
+        :type target: bool
+        :return: states exit codes overrides by target (empty for global)
+        :rtype: Dict[str, Dict[str, str]]
+        :raises CheckSupervisordError: invalid policy override
+        """
+
+        policy = OrderedDict()  # type: ignore
+
+        for value in values or []:
+            match = self.POLICY_REGEX.match(value.strip())
+            if (
+                not match
+                or bool(match.group("target")) != target  # noqa: W503
+                or match.group("state") not in self.STATES  # noqa: W503
+                or match.group("status") not in self.EXIT_CODES  # noqa: W503
+            ):
+                raise CheckSupervisordError(
+                    "Invalid state exit code: '{value}'. Expected format: '{expected}', possible states: {states}. {statuses}".format(  # noqa: E501
+                        value=value,
+                        expected="TARGET:STATE=STATUS" if target else "STATE=STATUS",
+                        states=", ".join(self.STATES),
+                        statuses=self.HELP_STATUSES,
+                    )
+                )
+            policy.setdefault(match.group("target") or "", {})[
+                match.group("state")
+            ] = match.group("status")
+
+        return policy
+
+    def _parse_intervals(self, values):
+        """
+        Parse scheduled requests intervals.
+
+        :param values: intervals in "[SERVER=]SECONDS" format
+        :type values: Union[List[str], None]
+        :return: intervals by server (empty for global)
+        :rtype: Dict[str, float]
+        :raises CheckSupervisordError: invalid interval
+        """
+
+        intervals = OrderedDict()
+
+        for value in values or []:
+            # unix sockets paths may contain "="
+            server, _, seconds = value.strip().rpartition("=")
+            try:
+                interval = float(seconds)
+            except ValueError:
+                interval = 0.0
+            if interval <= 0:
+                raise CheckSupervisordError(
+                    "Invalid schedule interval: '{value}'. Expected format: '[SERVER=]SECONDS', seconds count must be positive".format(  # noqa: E501
+                        value=value
+                    )
+                )
+            intervals[server] = interval
+
+        return intervals
+
+    def _get_policy(self):
+        """
+        Compile programs states exit codes policy table.
+
+        :return: programs states exit codes policy table
+        :rtype: StatePolicy
+        """
+
+        default = dict(self.STATE_TO_TEMPLATE)
+        # update stopped and starting states values from options
+        default.update(
+            {
+                self.STATE_STOPPED: self.options.stopped_state_exit_code,
+                self.STATE_STARTING: self.options.starting_state_exit_code,
+            }
+        )
+        default.update(
+            self._parse_policy(values=self.options.state_exit_codes, target=False).get(  # type: ignore  # noqa: E501
+                "", {}
+            )
+        )
+
+        return StatePolicy(  # type: ignore
+            default=default,
+            groups=self._parse_policy(  # type: ignore
+                values=self.options.group_state_exit_codes, target=True
+            ),
+            programs=self._parse_policy(  # type: ignore
+                values=self.options.program_state_exit_codes, target=True
+            ),
+            unknown=self.STATUS_UNKNOWN,
+        )
+
+    def _get_log_matcher(self):
+        """
+        Compile all log patterns into single regular expression
+        telling matched status by group name.
+
+        :return: log matcher or None if log scanning disabled
+        :rtype: Union[Pattern, None]
+        """
+
+        alternatives = [
+            "(?P<{status}>{patterns})".format(
+                status=status,
+                patterns="|".join(
+                    ["(?:{pattern})".format(pattern=pattern) for pattern in patterns]
+                ),
+            )
+            for status, patterns in [
+                (self.STATUS_CRITICAL, self.options.log_critical_patterns),
+                (self.STATUS_WARNING, self.options.log_warning_patterns),
+            ]
+            if patterns
+        ]
+        if not alternatives:
+            return None
+
+        return re.compile("|".join(alternatives), re.MULTILINE)
+
+    def _get_formatters(self, options):
+        """
+        Compile programs output templates by status.
+
+        :param options: options
+        :type options: Namespace
+        :return: programs output formatters by status
+        :rtype: Dict[str, OutputFormatter]
+        :raises CheckSupervisordError: invalid output template
+        """
+
+        templates = {
+            status: template["text"]
+            for status, template in self.OUTPUT_TEMPLATES.items()
+        }
+        for value in options.output_templates or []:
+            status, separator, template = value.partition("=")
+            if not separator or status not in templates:
+                raise CheckSupervisordError(
+                    "Invalid output template: '{value}'. Expected format: 'STATUS=TEMPLATE'. {statuses}".format(  # noqa: E501
+                        value=value, statuses=self.HELP_STATUSES
+                    )
+                )
+            templates[status] = template
+
+        return {
+            status: OutputFormatter(template=template)  # type: ignore
+            for status, template in templates.items()
+        }
+
+    def _get_fields(self, info):
+        """
+        Get extra program fields used by output templates.
+
+        :param info: supervisord program info
+        :type info: Dict[str, Any]
+        :return: program fields
+        :rtype: Dict[str, Any]
+        """
+
+        fields = {}
+        for field in self.fields:
+            if field == "uptime":
+                fields[field] = (
+                    max(info["now"] - info["start"], 0)
+                    if info.get("statename") == self.STATE_RUNNING
+                    and "now" in info  # noqa: W503
+                    else 0
+                )
+            else:
+                fields[field] = info.get(field, OutputFormatter.DEFAULTS[field])
+
+        return fields
+
+    def _format(self, state):
+        """
+        Render program state with output template.
+
+        :param state: program state
+        :type state: Dict[str, Any]
+        :return: program output
+        :rtype: str
+        """
+
+        return self.formatters[state["template"]](state=state)
+
+    def _parse_servers(self, value, port):
+        """
+        Parse comma-separated servers list.
+
+        :param value: comma-separated servers list
+        :type value: str
+        :param port: default server port
+        :type port: int
+        :return: servers addresses and ports by server
+        :rtype: Dict[str, Tuple[str, int]]
+        :raises CheckSupervisordError: invalid server
+        """
+
+        servers = OrderedDict()
+
+        for item in value.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            if item.startswith("["):  # IPv6 literal with optional port
+                server, bracket, server_port = item[1:].partition("]")
+                if not bracket or server_port[:1] not in ["", ":"]:
+                    server = ""
+                server_port = server_port[1:] or str(port)
+            elif self._is_local_server(server=item) or item.count(":") != 1:  # type: ignore  # noqa: E501
+                # unix socket, server without port or IPv6 literal
+                servers[item] = (item, port)
+                continue
+            else:
+                server, server_port = item.rsplit(":", 1)
+            if not server or not server_port.isdigit():
+                raise CheckSupervisordError(
+                    "Invalid server: '{item}'. Expected format: 'SERVER[:PORT]' or unix socket".format(  # noqa: E501
+                        item=item
+                    )
+                )
+            servers[item] = (server, int(server_port))
+
+        if not servers:
+            raise CheckSupervisordError("Required servers missing")
+
+        return servers
+
+    def _is_fleet(self, options):
+        """
+        Check is fleet check enabled by servers list, file or discovery.
+
+        :param options: options
+        :type options: Namespace
+        :return: is fleet check enabled
+        :rtype: bool
+        """
+
+        return bool(
+            options.fleet_servers
+            or options.fleet_file  # noqa: W503
+            or options.discover_sockets  # noqa: W503
+            or options.discover_proc  # noqa: W503
+        )
+
+    def _get_fleet_servers(self, options, discover=True):
+        """
+        Get fleet servers from option, servers file and discovered ones.
+
+        :param options: options
+        :type options: Namespace
+        :param discover: discover local supervisord instances
+        :type discover: bool
+        :return: servers addresses and ports by server (empty if nothing discovered)
+        :rtype: Dict[str, Tuple[str, int]]
+        :raises CheckSupervisordError: invalid server or servers file
+        """
+
+        value = options.fleet_servers
+        if options.fleet_file:
+            try:
+                with io.open(options.fleet_file, encoding="utf-8") as source:
+                    # one server per line, comments allowed
+                    value = ",".join(
+                        [value]
+                        + [  # noqa: W503
+                            line.split("#", 1)[0].strip() for line in source
+                        ]
+                    )
+            except EnvironmentError as error:
+                raise CheckSupervisordError(
+                    "Can't read fleet servers file: {error}".format(error=error)
+                )
+        if discover and (options.discover_sockets or options.discover_proc):
+            servers = self._discover_servers()  # type: ignore
+            if not servers and not value.strip(", "):
+                # reported by fleet check
+
+                return OrderedDict()
+            value = ",".join([value] + servers)
+
+        return self._parse_servers(value=value, port=options.port)  # type: ignore
+
+    def _is_socket(self, path):
+        """
+        Check is path unix socket.
+
+        :param path: path
+        :type path: str
+        :return: is path unix socket
+        :rtype: bool
+        """
+
+        try:
+
+            return stat.S_ISSOCK(os.stat(path).st_mode)
+        except OSError:
+
+            return False
+
+    def _get_pattern_directories(self, pattern):
+        """
+        Get directories new glob pattern matches could appear in.
+
+        :param pattern: glob pattern
+        :type pattern: str
+        :return: directories
+        :rtype: List[str]
+        """
+
+        directory = os.path.dirname(pattern)
+        if not glob.has_magic(directory):
+
+            return [directory]
+
+        # matched directories and the ones new matches could appear in
+        return glob.glob(directory) + self._get_pattern_directories(  # type: ignore
+            pattern=directory
+        )
+
+    def _get_mtimes(self, directories):
+        """
+        Get directories modification times.
+
+        :param directories: directories
+        :type directories: Iterable[str]
+        :return: modification times (or None for missing directory) by directory
+        :rtype: Dict[str, Union[float, None]]
+        """
+
+        mtimes = {}
+        for directory in directories:
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime
+            except OSError:
+                mtimes[directory] = None  # type: ignore
+
+        return mtimes
+
+    def _scan_proc(self):
+        """
+        Find unix sockets listened by running supervisord processes in procfs.
+
+        :return: unix sockets paths, supervisord processes IDs
+            and IDs of ones with unknown sockets
+        :rtype: Tuple[List[str], List[str], List[str]]
+        """
+
+        root = self.options.proc_root
+        listening = {}
+        try:
+            with io.open(
+                os.path.join(root, "net", "unix"), encoding="utf-8", errors="replace"
+            ) as source:
+                next(source)  # header
+                for line in source:
+                    # Num RefCount Protocol Flags Type St Inode Path
+                    fields = line.rstrip("\n").split(None, 7)
+                    # unbound and abstract sockets skipped
+                    if len(fields) < 8 or not fields[7].startswith("/"):
+                        continue
+                    if int(fields[3], 16) & self.UNIX_SOCKET_LISTENING:
+                        inode = "socket:[{inode}]".format(inode=fields[6])
+                        listening[inode] = fields[7]
+        except (EnvironmentError, StopIteration, ValueError):
+
+            return [], [], []
+
+        paths, pids, uninspected = set(), [], []
+        for pid in os.listdir(root):
+            if not pid.isdigit():
+                continue
+            try:
+                with io.open(os.path.join(root, pid, "cmdline"), "rb") as source:  # type: ignore  # noqa: E501
+                    arguments = source.read().split(b"\0")  # type: ignore
+            except EnvironmentError:  # exited meanwhile
+                continue
+            # interpreter, script or "-m" and module
+            if not any(
+                os.path.basename(argument) in self.DISCOVERY_COMMANDS  # type: ignore
+                for argument in arguments[:3]
+            ):
+                continue
+            pids.append(pid)
+            try:
+                bound = [
+                    listening[inode]
+                    for inode in self._get_descriptors(pid=pid)  # type: ignore
+                    if inode in listening
+                ]
+            except EnvironmentError:
+                # other users processes descriptors readable by root only,
+                # world-readable config tells which listening socket is theirs
+                configured = self._get_configured_sockets(arguments=arguments)  # type: ignore  # noqa: E501
+                bound = [
+                    path
+                    for path in listening.values()
+                    if path in configured or re.sub(r"\.\d+$", "", path) in configured
+                ]
+                if not bound:
+                    uninspected.append(pid)
+            for socket_path in bound:
+                # supervisord binds "<path>.<pid>" and renames it to "<path>",
+                # procfs keeps bound path
+                for path in [socket_path, re.sub(r"\.\d+$", "", socket_path)]:
+                    if self._is_socket(path=path):  # type: ignore
+                        paths.add(path)
+                        break
+
+        return sorted(paths), sorted(pids), sorted(uninspected)
+
+    def _get_descriptors(self, pid):
+        """
+        Get process open descriptors targets from procfs.
+
+        :param pid: process ID
+        :type pid: str
+        :return: descriptors targets
+        :rtype: Set[str]
+        :raises EnvironmentError: not permitted or process exited
+        """
+
+        directory = os.path.join(self.options.proc_root, pid, "fd")
+        targets = set()
+        for descriptor in os.listdir(directory):
+            try:
+                targets.add(os.readlink(os.path.join(directory, descriptor)))
+            except OSError:  # closed meanwhile
+                continue
+
+        return targets
+
+    def _get_configured_sockets(self, arguments):
+        """
+        Get unix socket path from supervisord process config file.
+
+        :param arguments: supervisord process command line arguments
+        :type arguments: List[bytes]
+        :return: configured unix socket paths (empty if unknown)
+        :rtype: List[str]
+        """
+
+        configs = self.DISCOVERY_CONFIGS
+        for position, argument in enumerate(arguments):
+            if argument in [b"-c", b"--configuration"]:
+                configs = arguments[position + 1 : position + 2]  # noqa: E203
+            elif argument.startswith(b"--configuration="):
+                configs = [argument.split(b"=", 1)[1]]
+            elif argument.startswith(b"-c") and len(argument) > 2:
+                configs = [argument[2:]]
+        for argument in configs:
+            path = argument.decode("utf-8", "replace")
+            # relative to supervisord working directory, unknown
+            if not os.path.isabs(path):
+                continue
+            config = configparser.RawConfigParser()
+            try:
+                with io.open(path, encoding="utf-8") as source:
+                    if hasattr(config, "read_file"):
+                        config.read_file(source)
+                    else:
+                        config.readfp(source)  # python 2
+            except (EnvironmentError, configparser.Error):
+                continue
+            # supervisord uses first found config
+            if not config.has_option("unix_http_server", "file"):
+
+                return []
+
+            value = config.get("unix_http_server", "file").strip()
+            value = value.replace("%(here)s", os.path.dirname(path))
+
+            return [] if "%(" in value else [os.path.normpath(value)]
+
+        return []
+
+    def _discover_servers(self):
+        """
+        Discover local supervisord instances unix sockets, cached in state directory
+        until sockets directories change or discovered supervisord process exits.
+
+        :return: unix sockets URIs
+        :rtype: List[str]
+        """
+
+        patterns = [
+            os.path.join(path, self.DISCOVERY_PATTERN) if os.path.isdir(path) else path
+            for path in [
+                os.path.abspath(pattern)
+                for pattern in self.options.discover_sockets or []
+            ]
+        ]
+        name = self._get_state_name(  # type: ignore
+            kind="discovery",
+            key={
+                "patterns": patterns,
+                "proc": self.options.discover_proc,
+                "proc_root": self.options.proc_root,
+            },
+        )
+        state = self._read_state(name=name)  # type: ignore
+        if state is not None and state.get("version") == __version__:
+            # new instance with sockets in unknown directory changes nothing cached
+            fresh = not self.options.discover_proc or (
+                time.time() - state["timestamp"] < self.DISCOVERY_PROC_MAX_AGE
+            )
+            alive = all(
+                os.path.isdir(os.path.join(self.options.proc_root, pid))
+                for pid in state["pids"]
+            )
+            mtimes = self._get_mtimes(directories=state["mtimes"])  # type: ignore
+            if fresh and alive and mtimes == state["mtimes"]:
+                self.uninspected = state["uninspected"]
+
+                return state["servers"]
+
+        # taken before scan, so sockets created meanwhile invalidate cache
+        mtimes = self._get_mtimes(  # type: ignore
+            directories={
+                directory
+                for pattern in patterns
+                for directory in self._get_pattern_directories(pattern=pattern)  # type: ignore  # noqa: E501
+            }
+        )
+        paths = {
+            path
+            for pattern in patterns
+            for path in glob.glob(pattern)
+            if self._is_socket(path=path)  # type: ignore
+        }
+        pids, self.uninspected = [], []
+        if self.options.discover_proc:
+            found, pids, self.uninspected = self._scan_proc()  # type: ignore
+            paths.update(found)
+            mtimes.update(
+                self._get_mtimes(  # type: ignore
+                    directories={os.path.dirname(path) for path in found}
+                    - set(mtimes.keys())  # noqa: W503
+                )
+            )
+        servers = [
+            "{scheme}{path}".format(scheme=self.UNIX_SCHEME, path=path)
+            for path in sorted(paths)
+        ]
+        try:
+            self._write_state(  # type: ignore
+                name=name,
+                state={
+                    "version": __version__,
+                    "timestamp": time.time(),
+                    "mtimes": mtimes,
+                    "pids": pids,
+                    "uninspected": self.uninspected,
+                    "servers": servers,
+                },
+            )
+        except EnvironmentError:  # nosec: B110
+            # unwritable state directory only disables cache
+            pass
+
+        return servers
+
+    def _get_node(self, server):
+        """
+        Get monitoring node owning server using jump consistent hash,
+        so nodes count change moves only 1/N of servers.
+
+        :param server: server
+        :type server: str
+        :return: owning monitoring node ID
+        :rtype: int
+        """
+
+        # not used for security
+        key = int(
+            hashlib.md5(server.encode("utf-8")).hexdigest()[:16], 16
+        )  # nosec: B303  # noqa: E501
+        node, candidate = -1, 0
+
+        while candidate < self.options.node_count:
+            node = candidate
+            key = (key * self.JUMP_HASH_MULTIPLIER + 1) & self.JUMP_HASH_MASK
+            candidate = int((node + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+
+        return node
+
+    def _partition(self, servers):
+        """
+        Get servers owned by this monitoring node.
+
+        :param servers: servers addresses and ports by server
+        :type servers: Dict[str, Tuple[str, int]]
+        :return: this node servers addresses and ports by server
+        :rtype: Dict[str, Tuple[str, int]]
+        """
+
+        if self.options.node_count == 1:
+
+            return servers
+
+        return OrderedDict(
+            (server, address)
+            for server, address in servers.items()
+            if self._get_node(server=server) == self.options.node_id  # type: ignore
+        )
+
+    def _for_server(self, server, port):
+        """
+        Create checker for another server sharing options.
+
+        :param server: server address or unix socket
+        :type server: str
+        :param port: server port
+        :type port: int
+        :return: server checker
+        :rtype: CheckSupervisord
+        """
+
+        return self.__class__(
+            options=Namespace(
+                **dict(
+                    vars(self.options),
+                    server=server,
+                    port=port,
+                    hedge_servers="",
+                    cluster_servers="",
+                    fleet_servers="",
+                    fleet_file="",
+                    discover_sockets=None,
+                    discover_proc=False,
+                    profile=False,
+                    profile_cprofile=False,
+                )
+            )
+        )
+
+    def _adopt_state(self, checker):
+        """
+        Take over warm state of previous checker for the same server.
+
+        :param checker: previous checker
+        :type checker: CheckSupervisord
+        """
+
+        self.breaker.state = checker.breaker.state
+        self.histogram = checker.histogram
+        self.latency, self.percentiles = checker.latency, checker.percentiles
+        if self.options.dns_ttl == checker.options.dns_ttl:
+            self.resolver = checker.resolver
+
+    def _parse_size(self, value):
+        """
+        Parse human readable size command line argument.
+
+        :param value: size with optional K, M, G or T suffix
+        :type value: str
+        :return: size in bytes
+        :rtype: int
+        :raises ArgumentTypeError: invalid size value
+        """
+
+        match = self.SIZE_REGEX.match(value)
+        if not match:
+            raise ArgumentTypeError("invalid size value: '{value}'".format(value=value))
+
+        return int(match.group(1)) * self.SIZE_UNITS[match.group(2).upper()]
+
+    def _is_local_server(self, server):
+        """
+        Check is supervisord server running on the same host.
+
+        :param server: server name, IP address or unix socket path
+        :type server: str
+        :return: is server local
+        :rtype: bool
+        """
+
+        return (
+            server.startswith("/")
+            or server.startswith(self.UNIX_SCHEME)  # noqa: W503
+            or server.strip("[]") in self.LOCAL_SERVERS  # noqa: W503
+        )
+
+    def _get_connection_uri(self, tpl):
+        """
+        Creates server connection URI formatted connection string.
+
+        :param tpl: connection string template name
+        :type tpl: str
+        :return: server connection URI formatted connection string
+        :rtype: str
+        """
+
+        server = self.options.server
+        # IPv6 literals must be enclosed in brackets
+        if tpl != self.URI_TPL_SOCKET and ":" in server and not server.startswith("["):
+            server = "[{server}]".format(server=server)
+        payload = {
+            "username": self.options.username,
+            "password": self.options.password,
+            "server": server,
+            "port": self.options.port,
+        }
+
+        return self.URI_TEMPLATES[tpl].format(**payload)
+
+    def _get_connection(self):
+        """
+        Creates and return connection to supervisord.
+
+        :return: connection to supervisord
+        :rtype: ServerProxy
+        """
+
+        if self.replayer is not None:
+
+            return xmlrpclib.ServerProxy(
+                uri=self.UNIX_SOCKET_URI, transport=self.replayer
+            )
+
+        path = (
+            self.options.server[len(self.UNIX_SCHEME) :]  # noqa: E203
+            if self.options.server.startswith(self.UNIX_SCHEME)
+            else None
+        )
+        # only built-in transport supports explicit timeout
+        if self.timeout is not None and self._is_socket(path=self.options.server):  # type: ignore  # noqa: E501
+            path = self.options.server
+
+        if path is not None:
+            # communicate with server via unix socket using built-in transport
+            # (no need to check path is unix socket and to import supervisor)
+            connection = xmlrpclib.ServerProxy(
+                uri=self.UNIX_SOCKET_URI,
+                transport=UnixStreamTransport(  # type: ignore
+                    path=path,
+                    username=self.options.username,
+                    password=self.options.password,
+                    timeout=self.timeout,
+                ),
+            )
+
+        elif self.options.server.startswith("/") and stat.S_ISSOCK(
+            os.stat(self.options.server).st_mode
+        ):  # communicate with server via unix socket
+            # (check is server address is path and path is unix socket)
+            try:
+                import supervisor.xmlrpc
+            except ImportError as error:  # noqa: B014
+                if self.embedded:
+                    raise CheckSupervisordError(
+                        "Unix socket support not available, use unix socket URI or install 'supervisor'. {error}".format(  # noqa: E501
+                            error=error
+                        )
+                    )
+                sys.stdout.write(
+                    "ERROR: Couldn't load module. {error}\n".format(error=error)
+                )
+                sys.stdout.write(
+                    "ERROR: Unix socket support not available! Please install nagios-check-supervisord with unix socket support: 'nagios-check-supervisord[unix-socket-support]' or install 'supervisor' separately.\n"  # noqa: E501
+                )
+                sys.exit(3)
+
+            if all([self.options.username, self.options.password]):  # with auth
+                connection = xmlrpclib.ServerProxy(
+                    uri="https://",
+                    transport=supervisor.xmlrpc.SupervisorTransport(
+                        self.options.username,
+                        self.options.password,
+                        serverurl=self._get_connection_uri(tpl=self.URI_TPL_SOCKET),  # type: ignore  # noqa: E501
+                    ),
+                )
+            else:
+                connection = xmlrpclib.ServerProxy(
+                    uri="https://",
+                    transport=supervisor.xmlrpc.SupervisorTransport(
+                        username=None,
+                        password=None,
+                        serverurl=self._get_connection_uri(tpl=self.URI_TPL_SOCKET),  # type: ignore  # noqa: E501
+                    ),
+                )
+
+        else:  # communicate with server via http
+            if all([self.options.username, self.options.password]):  # with auth
+                connection = xmlrpclib.Server(
+                    uri=self._get_connection_uri(tpl=self.URI_TPL_HTTP_AUTH),  # type: ignore  # noqa: E501
+                    transport=DualStackTransport(  # type: ignore
+                        resolver=self.resolver, timeout=self.timeout
+                    ),
+                )
+            else:
+                connection = xmlrpclib.Server(
+                    uri=self._get_connection_uri(tpl=self.URI_TPL_HTTP),  # type: ignore  # noqa: E501
+                    transport=DualStackTransport(  # type: ignore
+                        resolver=self.resolver, timeout=self.timeout
+                    ),
+                )
+
+        if self.recorder is not None:
+            connection = self.recorder.instrument(connection=connection)  # type: ignore
+
+        return connection
+
+    def _fetch_data(self, connection):
+        """
+        Get and return data from supervisord raising communication errors.
+
+        :param connection: connection to supervisord or None to create new one
+        :type connection: Union[ServerProxy, None]
+        :return: data from supervisord
+        :rtype: List[Dict[str, Union[str, int]]]
+        :raises socket.error: circuit breaker open
+        """
+
+        if self.options.hedge_servers and connection is None:
+            started = monotonic()
+            with self.profiler.phase(name=Profiler.PHASE_RPC):  # type: ignore
+                data = Hedge(checker=self).fetch()  # type: ignore
+            if self.options.latency_stats:
+                # endpoints record own latencies, report primary one histogram
+                self.latency = monotonic() - started
+                self.percentiles = self._update_latency(update=self._get_percentiles)  # type: ignore  # noqa: E501
+
+            return data
+
+        now = time.time()
+        if self.options.breaker_failures and not self._update_breaker(  # type: ignore
+            update=lambda breaker: breaker.allow(now=now)
+        ):
+            raise socket.error(
+                "Circuit breaker open after {failures} consecutive failures, retry in {seconds}s".format(  # noqa: E501
+                    failures=self.options.breaker_failures,
+                    seconds=int(
+                        self._update_breaker(  # type: ignore
+                            update=lambda breaker: breaker.retry_in(now=now)
+                        )
+                    ),
+                )
+            )
+        started = monotonic()
+        try:
+            data = self._request_data(connection=connection)  # type: ignore
+        except Exception:
+            if self.options.breaker_failures:
+                self._update_breaker(update=lambda breaker: breaker.failure(now=now))  # type: ignore  # noqa: E501
+            raise
+        latency = monotonic() - started
+        if self.options.breaker_failures:
+            self._update_breaker(update=lambda breaker: breaker.success())  # type: ignore  # noqa: E501
+        if self.options.latency_stats:
+
+            def record(histogram):
+                """
+                Record latency and get histogram percentiles.
+
+                :param histogram: server latency histogram
+                :type histogram: LatencyHistogram
+                :return: latency percentiles by percentile
+                :rtype: Dict[int, Union[float, None]]
+                """
+
+                histogram.record(seconds=latency)
+
+                return self._get_percentiles(histogram=histogram)  # type: ignore
+
+            self.latency = latency
+            self.percentiles = self._update_latency(update=record)  # type: ignore
+
+        return data
+
+    def _request_data(self, connection):
+        """
+        Request data from supervisord.
+
+        :param connection: connection to supervisord or None to create new one
+        :type connection: Union[ServerProxy, None]
+        :return: data from supervisord
+        :rtype: List[Dict[str, Union[str, int]]]
+        """
+
+        if connection is not None:
+            with self.profiler.phase(name=Profiler.PHASE_RPC):  # type: ignore
+                return self._call(connection=connection)  # type: ignore
+
+        with self.profiler.phase(name=Profiler.PHASE_CONNECTION):  # type: ignore
+            connection = self.profiler.instrument(
+                connection=self._get_connection()  # type: ignore
+            )
+        try:
+            with self.profiler.phase(name=Profiler.PHASE_RPC):  # type: ignore
+                return self._call(connection=connection)  # type: ignore
+        finally:
+            # do not leave sockets to garbage collector
+            connection("close")()
+
+    def _call(self, connection):
+        """
+        Call supervisord holding programs logs offsets lock if logs scanned.
+
+        :param connection: connection to supervisord
+        :type connection: ServerProxy
+        :return: data from supervisord, matched log lines included
+        :rtype: List[Dict[str, Any]]
+        """
+
+        if self.log_matcher is None:
+
+            return self._multicall(connection=connection, name="", logs=None)  # type: ignore  # noqa: E501
+
+        name = self._get_logs_name()  # type: ignore
+        # concurrent same checks would scan and report the same new bytes otherwise
+        with self._lock_state(name=name):
+
+            return self._multicall(  # type: ignore
+                connection=connection, name=name, logs=self._read_state(name=name) or {}  # type: ignore  # noqa: E501
+            )
+
+    def _multicall(self, connection, name, logs):
+        """
+        Call supervisord fetching programs logs new bytes
+        and stale programs config in the same round trip.
+
+        :param connection: connection to supervisord
+        :type connection: ServerProxy
+        :param name: logs state file name
+        :type name: str
+        :param logs: logs positions by program by stream or None if logs not scanned
+        :type logs: Union[Dict[str, Dict[str, Dict[str, int]]], None]
+        :return: data from supervisord, matched log lines included
+        :rtype: List[Dict[str, Any]]
+        :raises xmlrpclib.Fault: supervisord error
+        """
+
+        tails, configs = [], None
+        if logs is not None:
+            streams, tails = self._get_log_tails(logs=logs)  # type: ignore
+        fetch = self.options.missing_programs and not self.options.programs
+        if fetch:
+            configs = self._read_state(name=self._get_configs_name())  # type: ignore
+            # "reread" without "update" changes nothing in processes info
+            age = time.time() - (configs or {}).get("timestamp", 0)
+            if age >= self.options.missing_programs_max_age:
+                configs = None
+        if self.log_matcher is None and not fetch:
+            # usual case, single cheap call
+            results = [connection.supervisor.getAllProcessInfo()]
+        else:
+            results = connection.system.multicall(
+                [{"methodName": "supervisor.getAllProcessInfo", "params": []}]
+                + [  # noqa: W503
+                    {
+                        "methodName": self.LOG_METHODS[stream],
+                        "params": [program, position["offset"], length],
+                    }
+                    for stream, program, position, length in tails
+                ]
+                + (  # noqa: W503
+                    # supervisord restart tells cached programs config is stale
+                    [{"methodName": "supervisor.getPID", "params": []}]
+                    if fetch
+                    else []
+                )
+                + (  # noqa: W503
+                    [{"methodName": "supervisor.getAllConfigInfo", "params": []}]
+                    if fetch and configs is None
+                    else []
+                )
+            )
+            # programs states and supervisord PID faults fail whole check
+            for result in [results[0]] + ([results[len(tails) + 1]] if fetch else []):
+                if isinstance(result, dict):
+                    raise xmlrpclib.Fault(result["faultCode"], result["faultString"])
+
+        data = results[0]
+        if logs is not None:
+            self._update_logs(  # type: ignore
+                connection=connection,
+                data=data,
+                name=name,
+                logs=logs,
+                streams=streams,
+                tails=tails,
+                results=results[1 : len(tails) + 1],  # noqa: E203
+            )
+        if fetch:
+            self.configured = self._update_configs(  # type: ignore
+                data=data,
+                pid=results[len(tails) + 1],
+                configs=configs,
+                result=results[-1] if configs is None else None,
+            )
+
+        return data
+
+    def _get_logs_name(self):
+        """
+        Create programs logs offsets state file name.
+
+        :return: programs logs offsets state file name
+        :rtype: str
+        """
+
+        # different checks of the same server must not consume each other new bytes
+        return self._get_state_name(  # type: ignore
+            kind="logs",
+            key={
+                "server": self.options.server,
+                "port": self.options.port,
+                "programs": self.options.programs,
+                "streams": self.options.log_streams,
+                "critical": self.options.log_critical_patterns,
+                "warning": self.options.log_warning_patterns,
+            },
+        )
+
+    def _get_log_tails(self, logs):
+        """
+        Get programs logs tails to request, about expected new bytes count each.
+
+        :param logs: logs positions by program by stream
+        :type logs: Dict[str, Dict[str, Dict[str, int]]]
+        :return: scanned streams and streams, programs, positions and lengths to tail
+        :rtype: Tuple[List[str], List[Tuple[Any, ...]]]
+        """
+
+        streams = self.options.log_streams or [self.LOG_STDERR]
+        # tail returns last bytes of log, so request about expected new bytes count
+        tails = [
+            (
+                stream,
+                program,
+                position,
+                min(
+                    max(position["growth"] * 2, self.LOG_MIN_BYTES),
+                    self.options.log_max_bytes,
+                ),
+            )
+            for stream in streams
+            for program, position in logs.get(stream, {}).items()
+        ]
+
+        return streams, tails
+
+    def _update_logs(self, connection, data, name, logs, streams, tails, results):
+        """
+        Match programs logs new bytes and save logs positions for next checks.
+
+        :param connection: connection to supervisord
+        :type connection: ServerProxy
+        :param data: data from supervisord to include matched log lines into
+        :type data: List[Dict[str, Any]]
+        :param name: logs state file name
+        :type name: str
+        :param logs: logs positions by program by stream
+        :type logs: Dict[str, Dict[str, Dict[str, int]]]
+        :param streams: scanned streams
+        :type streams: List[str]
+        :param tails: requested streams, programs, positions and lengths
+        :type tails: List[Tuple[Any, ...]]
+        :param results: requested logs tails or faults
+        :type results: List[Any]
+        """
+
+        matches = {}  # type: ignore
+        names = self._get_programs() if self.options.programs else None  # type: ignore
+        programs = OrderedDict(
+            [
+                ("{group}:{name}".format(**info), info)
+                for info in data
+                if names is None or info["name"] in names
+            ]
+        )
+        updated = {stream: {} for stream in streams}  # type: ignore
+        for (stream, program, position, _), result in zip(tails, results):
+            # gone programs forgotten, faulty logs retried
+            if program not in programs:
+                continue
+            if isinstance(result, dict):
+                updated[stream][program] = position
+                continue
+            text, size, _ = result
+            growth = size - position["offset"]
+            # rotated log read from beginning on next check
+            if growth < 0:
+                updated[stream][program] = {"offset": 0, "growth": position["growth"]}
+                continue
+            updated[stream][program] = {"offset": size, "growth": growth}
+            encoded = text.encode("utf-8")
+            matches.setdefault(program, []).extend(
+                self._match_log(  # type: ignore
+                    text=encoded[max(len(encoded) - growth, 0) :].decode(  # noqa: E203
+                        "utf-8", "replace"
+                    )
+                )
+            )
+
+        # new programs logs are scanned starting from next check
+        missing = [
+            (stream, program)
+            for stream in streams
+            for program in programs
+            if program not in updated[stream]
+        ]
+        if missing:
+            results = connection.system.multicall(
+                [
+                    {
+                        "methodName": self.LOG_METHODS[stream],
+                        "params": [program, 0, 0],
+                    }
+                    for stream, program in missing
+                ]
+            )
+            for (stream, program), result in zip(missing, results):
+                updated[stream][program] = {
+                    "offset": 0 if isinstance(result, dict) else result[1],
+                    "growth": 0,
+                }
+
+        if updated != logs:
+            try:
+                self._write_state(name=name, state=updated)  # type: ignore
+            except EnvironmentError:  # nosec: B110
+                # unusable state directory only disables logs scanning
+                pass
+        for program, info in programs.items():
+            info["logs"] = matches.get(program, [])
+
+    def _get_configs_name(self):
+        """
+        Create programs config state file name.
+
+        :return: programs config state file name
+        :rtype: str
+        """
+
+        return self._get_state_name(  # type: ignore
+            kind="configs",
+            key={"server": self.options.server, "port": self.options.port},
+        )
+
+    def _update_configs(self, data, pid, configs, result):
+        """
+        Get configured programs, invalidating cached supervisord programs config
+        once supervisord restarted or running programs changed (reloaded or updated).
+
+        :param data: data from supervisord
+        :type data: List[Dict[str, Any]]
+        :param pid: supervisord process ID
+        :type pid: int
+        :param configs: cached programs config state or None if stale
+        :type configs: Union[Dict[str, Any], None]
+        :param result: programs config requested with data or None if not requested
+        :type result: Union[List[Dict[str, Any]], Dict[str, Any], None]
+        :return: configured programs names or None if unknown until next check
+        :rtype: Union[List[str], None]
+        :raises xmlrpclib.Fault: supervisord error
+        """
+
+        running = sorted({info["name"] for info in data})
+        if result is None:
+            if configs.get("pid") == pid and configs.get("running") == running:
+
+                return configs["configured"]
+
+            # requested with next check data instead of another round trip
+            configs = {}
+        elif isinstance(result, dict):
+            raise xmlrpclib.Fault(result["faultCode"], result["faultString"])
+        else:
+            configs = {
+                "pid": pid,
+                "running": running,
+                "configured": sorted({info["name"] for info in result}),
+                "timestamp": time.time(),
+            }
+        try:
+            self._write_state(name=self._get_configs_name(), state=configs)  # type: ignore  # noqa: E501
+        except EnvironmentError:  # nosec: B110
+            # unusable state directory only disables programs config caching
+            pass
+
+        return configs.get("configured")
+
+    def _get_absent(self, data):
+        """
+        Get programs configured in supervisord but absent from its response.
+
+        :param data: data from supervisord
+        :type data: List[Dict[str, Any]]
+        :return: absent programs names
+        :rtype: List[str]
+        """
+
+        if self.configured is None or self.options.programs:
+
+            return []
+
+        names = {info["name"] for info in data}
+
+        return [name for name in self.configured if name not in names]
+
+    def _get_programs(self):
+        """
+        Get programs names supplied in options.
+
+        :return: programs names
+        :rtype: List[str]
+        """
+
+        return [program.strip() for program in self.options.programs.split(",")]
+
+    def _match_log(self, text):
+        """
+        Find log lines matching patterns in one pass.
+
+        :param text: log new bytes
+        :type text: str
+        :return: matched lines statuses and lines
+        :rtype: List[Tuple[str, str]]
+        """
+
+        lines = OrderedDict()  # type: ignore
+        for match in self.log_matcher.finditer(text):
+            start = text.rfind("\n", 0, match.start()) + 1
+            end = text.find("\n", match.end())
+            line = text[start : len(text) if end == -1 else end].strip()  # noqa: E203
+            # worst status per line
+            if lines.get(start, (self.STATUS_WARNING, ""))[0] != self.STATUS_CRITICAL:
+                lines[start] = (match.lastgroup, line)
+
+        return list(lines.values())
+
+    def _update_server_state(self, kind, memory, load, update):
+        """
+        Query or update server state saving it between checks.
+
+        :param kind: state kind
+        :type kind: str
+        :param memory: state kept in memory by long running exporter
+        :type memory: Union[CircuitBreaker, LatencyHistogram]
+        :param load: state loader
+        :type load: Callable[[Union[Dict[str, Any], None]], Any]
+        :param update: state query or update
+        :type update: Callable[[Any], Any]
+        :return: state query result
+        :rtype: Any
+        """
+
+        if self.options.exporter:
+            with memory.lock:
+                return update(memory)
+
+        name = self._get_state_name(  # type: ignore
+            kind=kind, key={"server": self.options.server, "port": self.options.port}
+        )
+        target = None
+        try:
+            with self._lock_state(name=name):
+                target = load(self._read_state(name=name))  # type: ignore
+                state = copy.deepcopy(target.state)
+                result = update(target)
+                # do not write unchanged state on every check
+                if target.state != state:
+                    self._write_state(name=name, state=target.state)  # type: ignore
+        except EnvironmentError:
+            # unusable state directory only disables keeping state between checks
+            if target is None:
+                result = update(load(None))
+
+        return result
+
+    def _update_breaker(self, update):
+        """
+        Query or update server circuit breaker saving its state between checks.
+
+        :param update: circuit breaker query or update
+        :type update: Callable[[CircuitBreaker], Any]
+        :return: circuit breaker query result
+        :rtype: Any
+        """
+
+        return self._update_server_state(  # type: ignore
+            kind="breaker",
+            memory=self.breaker,
+            load=lambda state: CircuitBreaker(  # type: ignore
+                failures=self.options.breaker_failures,
+                cooldown=self.options.breaker_cooldown,
+                state=state,
+            ),
+            update=update,
+        )
+
+    def _update_latency(self, update):
+        """
+        Query or update server latency histogram saving it between checks.
+
+        :param update: latency histogram query or update
+        :type update: Callable[[LatencyHistogram], Any]
+        :return: latency histogram query result
+        :rtype: Any
+        """
+
+        return self._update_server_state(  # type: ignore
+            kind="latency",
+            memory=self.histogram,
+            load=lambda state: LatencyHistogram(state=state),  # type: ignore
+            update=update,
+        )
+
+    def _get_percentiles(self, histogram):
+        """
+        Get reported latency percentiles.
+
+        :param histogram: server latency histogram
+        :type histogram: LatencyHistogram
+        :return: latency percentiles by percentile
+        :rtype: Dict[int, Union[float, None]]
+        """
+
+        return OrderedDict(
+            [
+                (percent, histogram.percentile(percent=percent))
+                for percent in self.LATENCY_PERCENTILES
+            ]
+        )
+
+    def _get_process_resources(self, pid, clock_ticks, page_size):
+        """
+        Read process resources usage from procfs.
+
+        :param pid: process ID
+        :type pid: int
+        :param clock_ticks: system clock ticks per second
+        :type clock_ticks: int
+        :param page_size: system memory page size
+        :type page_size: int
+        :return: process resources usage or None if process gone
+        :rtype: Union[Dict[str, Union[int, float]], None]
+        """
+
+        path = os.path.join(self.options.proc_root, str(pid))
+        try:
+            with io.open(os.path.join(path, "stat"), "rb") as stat_file:
+                stats = stat_file.read()
+            with io.open(os.path.join(path, "statm"), "rb") as statm_file:
+                statm = statm_file.read()
+        except EnvironmentError:  # process gone
+            return None
+
+        # process name can contain spaces and parentheses,
+        # so fields counted after the last closing parenthesis
+        fields = stats[stats.rfind(b")") + 2 :].split()  # noqa: E203
+        try:
+            fds = len(os.listdir(os.path.join(path, "fd")))
+        except EnvironmentError:  # not enough permissions
+            fds = None  # type: ignore
+
+        # utime and stime fields measured in clock ticks
+        cpu_time = float(int(fields[11]) + int(fields[12])) / clock_ticks
+
+        return {
+            self.RESOURCE_RSS: int(statm.split()[1]) * page_size,
+            self.RESOURCE_CPU_TIME: cpu_time,
+            self.RESOURCE_FDS: fds,
+            self.RESOURCE_THREADS: int(fields[17]),
+        }
+
+    def _get_resources(self, data):
+        """
+        Get supervised processes resources usage.
+
+        :param data: supervisord XML-RPC call result
+        :type data: List[Dict[str, Union[str, int]]]
+        :return: processes resources usage by program group and name
+        :rtype: Dict[str, Dict[str, Union[int, float]]]
+        """
+
+        resources = OrderedDict()  # type: ignore
+        if not getattr(self.options, "proc_stats", False):
+            return resources
+
+        clock_ticks = os.sysconf(str("SC_CLK_TCK"))
+        page_size = os.sysconf(str("SC_PAGE_SIZE"))
+
+        for info in data:
+            if not info.get("pid"):  # process not running
+                continue
+            usage = self._get_process_resources(  # type: ignore
+                pid=info["pid"], clock_ticks=clock_ticks, page_size=page_size
+            )
+            if usage is not None:
+                # programs of different groups may share name
+                resources[
+                    "{group}:{name}".format(group=info["group"], name=info["name"])
+                ] = usage
+
+        return resources
+
+    def _get_resources_template(self, usage):
+        """
+        Compare process resources usage with thresholds.
+
+        :param usage: process resources usage
+        :type usage: Dict[str, Union[int, float]]
+        :return: output template name and exceeded thresholds descriptions
+        :rtype: Tuple[str, List[str]]
+        """
+
+        template, problems = self.STATUS_OK, []
+
+        for resource, (warning, critical) in self.RESOURCES_THRESHOLDS.items():
+            value = usage.get(resource)
+            if value is None:
+                continue
+            for status, threshold in [
+                (self.STATUS_CRITICAL, getattr(self.options, critical)),
+                (self.STATUS_WARNING, getattr(self.options, warning)),
+            ]:
+                if threshold is not None and value > threshold:
+                    problems.append(
+                        "{resource} {value}{uom} > {threshold}{uom}".format(
+                            resource=resource,
+                            value=value,
+                            threshold=threshold,
+                            uom=self.RESOURCES_UOM[resource],
+                        )
+                    )
+                    if (
+                        self.STATUS_TO_PRIORITY[status]
+                        < self.STATUS_TO_PRIORITY[template]  # noqa: W503
+                    ):
+                        template = status
+                    break
+
+        return template, problems
+
+    def _get_latency_template(self):
+        """
+        Compare supervisord response latency with thresholds.
+
+        :return: output template name and exceeded threshold description
+        :rtype: Tuple[str, List[str]]
+        """
+
+        if self.latency is None:
+            return self.STATUS_OK, []
+
+        for status, threshold in [
+            (self.STATUS_CRITICAL, self.options.latency_critical),
+            (self.STATUS_WARNING, self.options.latency_warning),
+        ]:
+            if threshold is not None and self.latency > threshold:
+                return status, [
+                    "slow response {latency}s > {threshold}s".format(
+                        latency=round(self.latency, 3), threshold=threshold
+                    )
+                ]
+
+        return self.STATUS_OK, []
+
+    def _get_log_template(self, info):
+        """
+        Classify program matched log lines.
+
+        :param info: supervisord program info
+        :type info: Dict[str, Any]
+        :return: output template name and matched lines descriptions
+        :rtype: Tuple[str, List[str]]
+        """
+
+        matches = info.get("logs")
+        if not matches:
+            return self.STATUS_OK, []
+
+        template = (
+            self.STATUS_CRITICAL
+            if any(status == self.STATUS_CRITICAL for status, _ in matches)
+            else self.STATUS_WARNING
+        )
+        lines = [line for status, line in matches if status == template]
+
+        return template, [
+            "log: {count} matched, last '{line}'".format(
+                count=len(lines), line=lines[-1]
+            )
+        ]
+
+    def _get_perfdata(self, resources):
+        """
+        Create Nagios performance data from processes resources usage
+        and supervisord response latency.
+
+        :param resources: processes resources usage by program group and name
+        :type resources: Dict[str, Dict[str, Union[int, float]]]
+        :return: performance data
+        :rtype: str
+        """
+
+        perfdata = []
+
+        if self.latency is not None:
+            # empty value for not supplied thresholds
+            warning, critical = [
+                "" if threshold is None else threshold
+                for threshold in [
+                    self.options.latency_warning,
+                    self.options.latency_critical,
+                ]
+            ]
+            perfdata.append(
+                "latency={value}s;{warning};{critical};0;".format(
+                    value=round(self.latency, 6), warning=warning, critical=critical
+                )
+            )
+        for percent, value in self.percentiles.items():
+            if value is not None:
+                perfdata.append(
+                    "latency_p{percent}={value}s;;;0;".format(
+                        percent=percent, value=round(value, 6)
+                    )
+                )
+
+        for program, usage in resources.items():
+            for resource, thresholds in self.RESOURCES_THRESHOLDS.items():
+                if usage.get(resource) is None:
+                    continue
+                # empty value for not supplied thresholds
+                warning, critical = [
+                    ""
+                    if getattr(self.options, threshold) is None
+                    else getattr(self.options, threshold)
+                    for threshold in thresholds
+                ]
+                perfdata.append(
+                    "'{program}_{resource}'={value}{uom};{warning};{critical};0;".format(  # noqa: E501
+                        program=program,
+                        resource=resource,
+                        value=usage[resource],
+                        uom=self.RESOURCES_UOM[resource],
+                        warning=warning,
+                        critical=critical,
+                    )
+                )
+
+        return " ".join(perfdata)
+
+    def _get_template(self, info):
+        """
+        Classify supervisord program state.
+
+        :param info: supervisord program info
+        :type info: Dict[str, Union[str, int]]
+        :return: output template name
+        :rtype: str
+        """
+
+        return self.policy.resolve(info=info)
+
+    def _get_status(self, data, resources=None):
+        """
+        Create main status.
+
+        :param data: devices states info
+        :type data: List[Dict[str, Union[str, int]]]
+        :param resources: processes resources usage by program group and name
+        :type resources: Union[Dict[str, Dict[str, Union[int, float]]], None]
+        :return: main check status
+        :rtype: str
+        """
+
+        # for multiple check need to get main status by priority
+        priority = (
+            min(  # type: ignore  # noqa: C407
+                [
+                    self.OUTPUT_TEMPLATES[self._get_template(info=info)]["priority"]  # type: ignore  # noqa: E501
+                    for info in data
+                ]
+                + [  # noqa: W503
+                    self.OUTPUT_TEMPLATES[self._get_resources_template(usage=usage)[0]][  # type: ignore  # noqa: E501
+                        "priority"
+                    ]
+                    for usage in (resources or {}).values()
+                ]
+                + [  # noqa: W503
+                    self.OUTPUT_TEMPLATES[self._get_log_template(info=info)[0]][  # type: ignore  # noqa: E501
+                        "priority"
+                    ]
+                    for info in data
+                ]
+                + [  # noqa: W503
+                    self.OUTPUT_TEMPLATES[self._get_latency_template()[0]]["priority"]  # type: ignore  # noqa: E501
+                ]
+                + [  # noqa: W503
+                    self.OUTPUT_TEMPLATES[self.STATUS_UNKNOWN]["priority"]
+                    for _ in self._get_absent(data=data)  # type: ignore
+                ]
+            )
+            if data
+            else self.STATUS_TO_PRIORITY[self.options.no_programs_defined_exit_code]
+        )
+        status = self.PRIORITY_TO_STATUS.get(priority, self.PRIORITY_CRITICAL)  # type: ignore  # noqa: E501
+
+        return status
+
+    def _get_code(self, status):
+        """
+        Create exit code.
+
+        :param status: main check status
+        :type status: str
+        :return: exit code
+        :rtype: int
+        """
+
+        # create exit code (unknown if something happened wrong)
+        return self.EXIT_CODES.get(status, self.STATUS_UNKNOWN)
+
+    def _get_states(self, data, resources):
+        """
+        Create programs states.
+
+        :param data: supervisord XML-RPC call result
+        :type data: List[Dict[str, Union[str, int]]]
+        :param resources: processes resources usage by program group and name
+        :type resources: Dict[str, Dict[str, Union[int, float]]]
+        :return: programs states by program name
+        :rtype: Dict[str, Dict[str, str]]
+        """
+
+        states = OrderedDict()
+        index = OrderedDict()  # type: ignore
+        for info in data:
+            index.setdefault(info["name"], info)
+        programs = (
+            self._get_programs()  # type: ignore
+            if self.options.programs
+            else list(index.keys()) + self._get_absent(data=data)  # type: ignore  # noqa: W503, E501
+        )
+
+        for program in programs:
+            info = index.get(program)
+            if info is None:
+                states.update(
+                    {
+                        program: dict(
+                            self._get_fields(info={}),  # type: ignore
+                            name=program,
+                            template="unknown",
+                            status="",
+                        )
+                    }
+                )
+                continue
+
+            states.update(
+                {
+                    program: dict(
+                        self._get_fields(info=info),  # type: ignore
+                        name=program,
+                        template=self._get_template(info=info),  # type: ignore
+                        status=info["spawnerr"]
+                        if info["spawnerr"]
+                        else info["statename"],
+                    )
+                }
+            )
+
+            usage = resources.get(
+                "{group}:{name}".format(group=info["group"], name=info["name"])
+            )
+            for template, problems in [
+                self._get_resources_template(usage=usage)  # type: ignore
+                if usage is not None
+                else (self.STATUS_OK, []),
+                self._get_log_template(info=info),  # type: ignore
+            ]:
+                if problems:
+                    states[program]["status"] = ", ".join(
+                        [states[program]["status"]] + problems
+                    )
+                if (
+                    self.OUTPUT_TEMPLATES[template]["priority"]  # type: ignore
+                    < self.OUTPUT_TEMPLATES[states[program]["template"]][  # noqa: W503
+                        "priority"
+                    ]
+                ):
+                    states[program]["template"] = template
+
+        return states
+
+    def _get_summary(self, states):
+        """
+        Create programs states summary: counts by status
+        and first non-OK programs only.
+
+        :param states: programs states by program name
+        :type states: Dict[str, Dict[str, str]]
+        :return: programs states summary
+        :rtype: str
+        """
+
+        counts = OrderedDict(
+            (status, 0)
+            for status in sorted(
+                self.STATUS_TO_PRIORITY.keys(),
+                key=lambda item: self.STATUS_TO_PRIORITY[item],
+            )
+        )
+        for state in states.values():
+            counts[state["template"]] += 1
+
+        # partial selection instead of sorting all programs
+        problems = heapq.nsmallest(
+            self.options.summary_limit,
+            (
+                (self.OUTPUT_TEMPLATES[state["template"]]["priority"], position, name)
+                for position, (name, state) in enumerate(states.items())
+                if state["template"] != self.STATUS_OK
+            ),
+        )
+        hidden = len(states) - counts[self.STATUS_OK] - len(problems)
+        output = "{total} programs: {counts}".format(
+            total=len(states),
+            counts=", ".join(
+                [
+                    "{count} {status}".format(count=count, status=status)
+                    for status, count in counts.items()
+                    if count
+                ]
+            ),
+        )
+        if problems:
+            output = "{output}; {problems}{hidden}".format(
+                output=output,
+                problems=", ".join(
+                    [self._format(state=states[name]) for _, _, name in problems]  # type: ignore  # noqa: E501
+                ),
+                hidden=" and {hidden} more".format(hidden=hidden) if hidden else "",
+            )
+
+        return output
+
+    def _truncate(self, output, limit):
+        """
+        Truncate output to bytes limit.
+
+        :param output: output
+        :type output: str
+        :param limit: output bytes limit
+        :type limit: int
+        :return: truncated output
+        :rtype: str
+        """
+
+        encoded = output.encode("utf-8")
+        if len(encoded) <= limit:
+            return output
+
+        ellipsis = "..."
+
+        # cut multibyte characters tails
+        return (
+            encoded[: max(limit - len(ellipsis), 0)].decode("utf-8", "ignore")
+            + ellipsis  # noqa: W503
+        )
+
+    def _get_output(self, data, status, resources=None):
+        """
+        Create Nagios and human readable supervisord statuses.
+
+        :param data: supervisord XML-RPC call result
+        :type data: List[Dict[str, Union[str, int]]]
+        :param status: main check status
+        :type status: str
+        :param resources: processes resources usage by program group and name
+        :type resources: Union[Dict[str, Dict[str, Union[int, float]]], None]
+        :return: human readable supervisord statuses
+        :rtype: str
+        """
+
+        resources = resources or OrderedDict()
+        states = self._get_states(data=data, resources=resources)  # type: ignore
+
+        if not len(states):
+            output = "No program configured/found"
+        elif self.options.summary:
+            output = self._get_summary(states=states)  # type: ignore
+        else:
+            output = ", ".join(
+                [
+                    self._format(state=states[program])  # type: ignore
+                    for program in sorted(
+                        states.keys(),
+                        key=lambda item: self.OUTPUT_TEMPLATES[  # type: ignore
+                            states[item]["template"]
+                        ]["priority"],
+                    )
+                ]
+            )
+
+        _, problems = self._get_latency_template()  # type: ignore
+        if problems:
+            output = "{output}; {problems}".format(
+                output=output, problems=", ".join(problems)
+            )
+        perfdata = self._get_perfdata(resources=resources)  # type: ignore
+        perfdata = " | {perfdata}".format(perfdata=perfdata) if perfdata else ""
+        output = "{status}: {output}".format(status=status.upper(), output=output)
+
+        if self.options.output_limit:
+            # drop performance data first if it does not leave place for statuses
+            if len(perfdata.encode("utf-8")) > self.options.output_limit // 2:
+                perfdata = ""
+            output = self._truncate(  # type: ignore
+                output=output,
+                limit=self.options.output_limit - len(perfdata.encode("utf-8")),
+            )
+
+        # return full status string with main status
+        # for multiple programs and all programs states
+        return "{output}{perfdata}\n".format(**{"output": output, "perfdata": perfdata})
+
+    def check(self):
+        """
+        Get data from server (or cluster or fleet servers) and create plugin output.
+
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        if self.options.cluster_servers:
+
+            return Cluster(checker=self).check()  # type: ignore
+
+        if self._is_fleet(options=self.options):  # type: ignore
+
+            return Fleet(checker=self).check()  # type: ignore
+
+        with self.profiler.phase(name=Profiler.PHASE_CHECK):  # type: ignore
+            if self.options.stale_max_age:
+
+                return self._check_stale()  # type: ignore
+
+            return self.profiler.run(func=self._check)  # type: ignore
+
+    def _check(self):
+        """
+        Get data from server and create plugin output (profiled).
+
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        try:
+            data = self._fetch_data(connection=None)  # type: ignore
+        except CheckSupervisordError:
+            raise
+        except Exception as error:
+
+            return self._get_error_result(error=error)  # type: ignore
+
+        return self._get_result(data=data)  # type: ignore
+
+    def _get_result(self, data):
+        """
+        Create plugin output from supervisord data.
+
+        :param data: supervisord XML-RPC call result
+        :type data: List[Dict[str, Union[str, int]]]
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        with self.profiler.phase(name=Profiler.PHASE_RESOURCES):  # type: ignore
+            resources = self._get_resources(data=data)  # type: ignore
+        with self.profiler.phase(name=Profiler.PHASE_STATUS):  # type: ignore
+            status = self._get_status(data=data, resources=resources)  # type: ignore
+            code = self._get_code(status=status)  # type: ignore
+        with self.profiler.phase(name=Profiler.PHASE_OUTPUT):  # type: ignore
+            output = self._get_output(
+                data=data, status=status, resources=resources
+            )  # type: ignore
+
+        return CheckResult(output=output, code=code)
+
+    def _get_state_name(self, kind, key=None):
+        """
+        Create state file name unique for key (server and check options by default).
+
+        :param kind: state kind
+        :type kind: str
+        :param key: state key
+        :type key: Union[Dict[str, Any], None]
+        :return: state file name
+        :rtype: str
+        """
+
+        key = vars(self.options) if key is None else key
+        if self.options.replay:
+            # replays must not touch recorded servers state
+            key = {"replay": os.path.abspath(self.options.replay), "key": key}
+        # not used for security
+        digest = hashlib.md5(  # nosec: B303
+            json.dumps(key, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+        return "{kind}-{digest}".format(kind=kind, digest=digest)
+
+    def _read_state(self, name):
+        """
+        Read state saved by previous checks.
+
+        :param name: state file name
+        :type name: str
+        :return: state or None if not saved or unreadable
+        :rtype: Union[Dict[str, Any], None]
+        """
+
+        try:
+            with io.open(self._get_state_path(name=name), encoding="utf-8") as source:  # type: ignore  # noqa: E501
+
+                return json.load(source)
+        except (EnvironmentError, ValueError):
+
+            return None
+
+    def _get_state_path(self, name, extension="json"):
+        """
+        Get state file path, creating state directory if not exists.
+
+        :param name: state file name
+        :type name: str
+        :param extension: state file extension
+        :type extension: str
+        :return: state file path
+        :rtype: str
+        :raises OSError: state directory is not private to plugin user
+        """
+
+        if not os.path.isdir(self.options.state_dir):
+            try:
+                os.makedirs(self.options.state_dir, 0o700)
+            except OSError:  # created concurrently
+                pass
+        # other users must not forge state nor plant symlinks followed by plugin
+        info = os.stat(self.options.state_dir)
+        if hasattr(os, "getuid") and (
+            info.st_uid != os.getuid() or info.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+        ):
+            raise OSError(
+                errno.EACCES,
+                "State directory is not private to plugin user",
+                self.options.state_dir,
+            )
+
+        return os.path.join(
+            self.options.state_dir,
+            "{name}.{extension}".format(name=name, extension=extension),
+        )
+
+    @contextlib.contextmanager
+    def _lock_state(self, name, blocking=True):
+        """
+        Lock state between processes.
+
+        :param name: state file name
+        :type name: str
+        :param blocking: wait for lock
+        :type blocking: bool
+        :return: is lock acquired
+        :rtype: Iterator[bool]
+        """
+
+        try:
+            lock = io.open(self._get_state_path(name=name, extension="lock"), "a")  # type: ignore  # noqa: E501
+        except EnvironmentError:
+            # unusable state directory, nothing to lock
+            yield False
+
+            return
+        with lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(
+                        lock.fileno(),
+                        fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB,
+                    )
+                except EnvironmentError:  # locked by somebody else
+                    yield False
+
+                    return
+            # unlocked on close
+            yield True
+
+    def _write_state(self, name, state):
+        """
+        Atomically save state for next checks.
+
+        :param name: state file name
+        :type name: str
+        :param state: state
+        :type state: Dict[str, Any]
+        """
+
+        path = self._get_state_path(name=name)  # type: ignore
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.options.state_dir, suffix=".tmp"
+        )
+        try:
+            with io.open(descriptor, "w", encoding="utf-8") as destination:
+                destination.write(
+                    "{state}".format(state=json.dumps(state, sort_keys=True))
+                )
+            # readers see either previous or new state, never partial one
+            os.rename(temporary, path)
+        except Exception:
+            os.unlink(temporary)
+            raise
+
+    def _revalidate(self, name):
+        """
+        Get fresh result and save it for next checks.
+
+        :param name: result state file name
+        :type name: str
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        result = self._get_result(data=self._fetch_data(connection=None))  # type: ignore  # noqa: E501
+        try:
+            self._write_state(  # type: ignore
+                name=name,
+                state={
+                    "output": result.output,
+                    "code": result.code,
+                    "timestamp": time.time(),
+                },  # noqa: E501
+            )
+        except EnvironmentError:  # nosec: B110
+            # unusable state directory only disables serving stale results
+            pass
+
+        return result
+
+    def _refresh(self, name):
+        """
+        Refresh saved result if nobody else doing it (runs in background).
+
+        :param name: result state file name
+        :type name: str
+        """
+
+        try:
+            with self._lock_state(name=name, blocking=False) as locked:
+                # somebody else already refreshing
+                if locked:
+                    self._revalidate(name=name)  # type: ignore
+        except Exception:  # nosec: B110
+            # keep previous result until it gets too old
+            pass
+
+    def _refresh_background(self, name):
+        """
+        Refresh saved result in background thread or detached process.
+
+        :param name: result state file name
+        :type name: str
+        """
+
+        if self.embedded or not hasattr(os, "fork"):
+            thread = threading.Thread(target=self._refresh, kwargs={"name": name})
+            thread.daemon = True
+            thread.start()
+
+            return
+
+        with self._lock_state(name=name, blocking=False) as locked:
+            # somebody else already refreshing, do not fork on every check
+            if not locked:
+
+                return
+            # plugin process exits right after output, so refresh in child
+            # process inheriting lock (released when both processes close it)
+            if os.fork():
+
+                return
+
+            try:
+                os.setsid()
+                # Nagios waits for plugin output pipe closing
+                devnull = os.open(os.devnull, os.O_RDWR)
+                for descriptor in [0, 1, 2]:
+                    os.dup2(devnull, descriptor)
+                # do not hold refresh lock forever if server hangs
+                self.timeout = self.options.stale_max_age
+                self._revalidate(name=name)  # type: ignore
+            finally:
+                os._exit(0)
+
+    def _check_stale(self):
+        """
+        Get saved result immediately if it young enough and refresh it
+        in background, otherwise get fresh result.
+
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        name = self._get_state_name(kind="result")  # type: ignore
+        state = self._read_state(name=name)  # type: ignore
+        age = time.time() - state["timestamp"] if state else None
+
+        if age is None or not 0 <= age <= self.options.stale_max_age:
+            try:
+
+                return self._revalidate(name=name)  # type: ignore
+            except CheckSupervisordError:
+                raise
+            except Exception as error:
+
+                return self._get_error_result(error=error)  # type: ignore
+
+        self._refresh_background(name=name)  # type: ignore
+
+        return self._get_stale_result(state=state, age=age)  # type: ignore
+
+    def _get_stale_result(self, state, age):
+        """
+        Create stale result marked with its age.
+
+        :param state: saved result
+        :type state: Dict[str, Any]
+        :param age: saved result age in seconds
+        :type age: float
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        output, separator, perfdata = state["output"].rstrip("\n").partition(" | ")
+        output = "{output} (stale result, {age}s old)".format(
+            output=output, age=int(age)
+        )
+        code = state["code"]
+        if (
+            self.options.stale_warning_age
+            and age >= self.options.stale_warning_age  # noqa: W503
+            and code == self.EXIT_CODES[self.STATUS_OK]  # noqa: W503
+        ):
+            code = self.EXIT_CODES[self.STATUS_WARNING]
+            output = "{status}:{output}".format(
+                status=self.STATUS_WARNING.upper(), output=output.partition(":")[2]
+            )
+
+        return CheckResult(
+            output="{output}{separator}{perfdata}\n".format(
+                output=output, separator=separator, perfdata=perfdata
+            ),
+            code=code,
+        )
+
+    def _get_error_result(self, error):
+        """
+        Create supervisord communication error result.
+
+        :param error: supervisord communication error
+        :type error: Exception
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        return CheckResult(
+            output=""
+            if self.options.quiet
+            else "ERROR: Server communication problem. {error}\n".format(error=error),
+            code=self.EXIT_CODES.get(
+                self.options.network_errors_exit_code, self.STATUS_UNKNOWN
+            ),
+        )
+
+
+class CheckSupervisordError(Exception):
+    """
+    Check configuration error.
+    """
+
+
+class CheckResult(namedtuple("CheckResult", ["output", "code"])):
+    """
+    Check result: plugin output and exit code.
+    """
+
+    __slots__ = ()
+
+    @property
+    def status(self):
+        """
+        Get check status.
+
+        :return: check status
+        :rtype: str
+        """
+
+        for status, code in CheckSupervisord.EXIT_CODES.items():
+            if code == self.code:
+                return status
+
+        return CheckSupervisord.STATUS_UNKNOWN
+
+
+Snapshot = namedtuple(
+    "Snapshot", ["data", "status", "error", "duration", "timestamp", "fetched"]
+)
+
+
+class Exporter(object):
+    """
+    Prometheus exporter serving supervisord programs states.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    STATUS_CONTENT_TYPE = "application/json"
+    # status document fields changing without servers and programs state changes
+    VOLATILE_FIELDS = ["duration", "timestamp", "uptime"]
+    METRICS_PATH, STATUS_PATH = "/metrics", "/status"
+    LABELS_ESCAPES = [("\\", "\\\\"), ("\n", "\\n"), ('"', '\\"')]
+
+    def __init__(self, checker, labels=None):
+        """
+        Init exporter.
+
+        :param checker: configured checker
+        :type checker: CheckSupervisord
+        :param labels: labels added to all server metrics
+        :type labels: Union[Dict[str, str], None]
+        """
+
+        self.checker = checker
+        self.labels = labels or {}
+        self.interval = checker.options.exporter_interval
+        # snapshots refreshed by scheduler, scrapes do not request supervisord
+        self.scheduled = False
+        self.lock = threading.Lock()
+        self.connection = None
+        self.snapshot = None
+        self.metrics = None
+        self.status = None
+
+    def _fetch(self):
+        """
+        Get data from supervisord reusing connection.
+
+        :return: supervisord data snapshot
+        :rtype: Snapshot
+        """
+
+        started = monotonic()
+        try:
+            if self.connection is None:
+                self.connection = self.checker._get_connection()
+            data = self.checker._fetch_data(connection=self.connection)
+            status, error = self.checker._get_status(data=data), ""
+        except Exception as exception:
+            # reconnect on next fetch
+            self.connection = None
+            data, status = [], None
+            error = str(exception) or exception.__class__.__name__
+
+        return Snapshot(
+            data=data,
+            status=status,
+            error=error,
+            duration=monotonic() - started,
+            timestamp=time.time(),
+            fetched=monotonic(),
+        )
+
+    def get_snapshot(self):
+        """
+        Get supervisord data snapshot not older than interval.
+
+        :return: supervisord data snapshot
+        :rtype: Snapshot
+        """
+
+        # concurrent scrapes wait for single in-flight request
+        with self.lock:
+            if self.is_stale():  # type: ignore
+                self.snapshot = self._fetch()  # type: ignore
+
+            return self.snapshot
+
+    def is_stale(self):
+        """
+        Check is snapshot missing or older than interval, so it would be requested.
+
+        :return: is snapshot stale
+        :rtype: bool
+        """
+
+        snapshot = self.snapshot
+
+        return snapshot is None or (
+            not self.scheduled
+            and monotonic() - snapshot.fetched >= self.interval  # noqa: W503
+        )
+
+    def refresh(self):
+        """
+        Get new supervisord data snapshot regardless of interval.
+
+        :return: supervisord data snapshot
+        :rtype: Snapshot
+        """
+
+        with self.lock:
+            self.snapshot = self._fetch()  # type: ignore
+
+            return self.snapshot
+
+    def close(self):
+        """
+        Close supervisord connection.
+        """
+
+        with self.lock:
+            if self.connection is not None:
+                try:
+                    self.connection("close")()
+                except Exception:  # nosec: B110
+                    pass
+                self.connection = None
+
+    @classmethod
+    def _escape(cls, value):
+        """
+        Escape metric label value.
+
+        :param value: label value
+        :type value: str
+        :return: escaped label value
+        :rtype: str
+        """
+
+        for char, escaped in cls.LABELS_ESCAPES:
+            value = value.replace(char, escaped)
+
+        return value
+
+    @classmethod
+    def _get_metric(cls, name, kind, description, samples):
+        """
+        Create metric in Prometheus text exposition format.
+
+        :param name: metric name
+        :type name: str
+        :param kind: metric type
+        :type kind: str
+        :param description: metric help
+        :type description: str
+        :param samples: metric labels and values
+        :type samples: List[Tuple[Dict[str, str], Union[int, float]]]
+        :return: metric lines
+        :rtype: List[str]
+        """
+
+        lines = [
+            "# HELP {name} {description}".format(name=name, description=description),
+            "# TYPE {name} {kind}".format(name=name, kind=kind),
+        ]
+        for labels, value in samples:
+            lines.append(
+                "{name}{labels} {value}".format(
+                    name=name,
+                    labels="{{{labels}}}".format(
+                        labels=",".join(
+                            [
+                                '{label}="{value}"'.format(
+                                    label=label, value=cls._escape(value=labels[label])  # type: ignore  # noqa: E501
+                                )
+                                for label in sorted(labels.keys())
+                            ]
+                        )
+                    )
+                    if labels
+                    else "",
+                    value=value,
+                )
+            )
+
+        return lines
+
+    def get_families(self, snapshot):
+        """
+        Get supervisord data snapshot metrics families.
+
+        :param snapshot: supervisord data snapshot
+        :type snapshot: Snapshot
+        :return: metrics names, types, helps and samples
+        :rtype: List[Dict[str, Any]]
+        """
+
+        programs = [
+            (
+                dict(self.labels, name=info["name"], group=info["group"]),
+                info,
+            )
+            for info in snapshot.data
+        ]
+        families = [
+            {
+                "name": "supervisord_up",
+                "kind": "gauge",
+                "description": "Was the last supervisord XML-RPC call successful.",
+                "samples": [(self.labels, 0 if snapshot.error else 1)],
+            },
+            {
+                "name": "supervisord_scrape_duration_seconds",
+                "kind": "gauge",
+                "description": "Duration of the last supervisord XML-RPC call.",
+                "samples": [(self.labels, snapshot.duration)],
+            },
+            {
+                "name": "supervisord_scrape_timestamp_seconds",
+                "kind": "gauge",
+                "description": "Time of the last supervisord XML-RPC call.",
+                "samples": [(self.labels, snapshot.timestamp)],
+            },
+        ]
+        if snapshot.status is not None:
+            families.append(
+                {
+                    "name": "supervisord_check_status",
+                    "kind": "gauge",
+                    "description": "Nagios check exit code (0 ok, 1 warning, 2 critical, 3 unknown).",  # noqa: E501
+                    "samples": [
+                        (self.labels, self.checker._get_code(status=snapshot.status))
+                    ],
+                }
+            )
+        families += [
+            {
+                "name": "supervisord_process_state",
+                "kind": "gauge",
+                "description": "Supervisord program state.",
+                "samples": [
+                    (
+                        dict(labels, state=state),
+                        1 if info["statename"] == state else 0,
+                    )
+                    for labels, info in programs
+                    for state in self.checker.STATES
+                ],
+            },
+            {
+                "name": "supervisord_process_status",
+                "kind": "gauge",
+                "description": "Supervisord program Nagios status (0 ok, 1 warning, 2 critical, 3 unknown).",  # noqa: E501
+                "samples": [
+                    (
+                        labels,
+                        self.checker._get_code(
+                            status=self.checker._get_template(info=info)
+                        ),
+                    )
+                    for labels, info in programs
+                ],
+            },
+            {
+                "name": "supervisord_process_uptime_seconds",
+                "kind": "gauge",
+                "description": "Supervisord program uptime.",
+                "samples": [
+                    (
+                        labels,
+                        max(info["now"] - info["start"], 0)
+                        if info["statename"] == self.checker.STATE_RUNNING
+                        else 0,
+                    )
+                    for labels, info in programs
+                ],
+            },
+            {
+                "name": "supervisord_process_exit_status",
+                "kind": "gauge",
+                "description": "Supervisord program last exit status.",
+                "samples": [(labels, info["exitstatus"]) for labels, info in programs],
+            },
+        ]
+
+        return families
+
+    @classmethod
+    def render_families(cls, families):
+        """
+        Render metrics families.
+
+        :param families: metrics names, types, helps and samples
+        :type families: List[Dict[str, Any]]
+        :return: metrics in Prometheus text exposition format
+        :rtype: bytes
+        """
+
+        lines = []
+        for family in families:
+            lines += cls._get_metric(**family)  # type: ignore
+
+        return "{metrics}\n".format(metrics="\n".join(lines)).encode("utf-8")
+
+    def render(self, snapshot):
+        """
+        Render supervisord data snapshot as Prometheus metrics.
+
+        :param snapshot: supervisord data snapshot
+        :type snapshot: Snapshot
+        :return: metrics in Prometheus text exposition format
+        :rtype: bytes
+        """
+
+        return self.render_families(families=self.get_families(snapshot=snapshot))  # type: ignore  # noqa: E501
+
+    def get_metrics(self):
+        """
+        Get rendered metrics, rendered once per snapshot.
+
+        :return: metrics in Prometheus text exposition format
+        :rtype: bytes
+        """
+
+        snapshot = self.get_snapshot()  # type: ignore
+        metrics = self.metrics
+        if metrics is None or metrics[0] is not snapshot:
+            metrics = self.metrics = (snapshot, self.render(snapshot=snapshot))  # type: ignore  # noqa: E501
+
+        return metrics[1]
+
+    def get_document(self, snapshot):
+        """
+        Get supervisord data snapshot status document.
+
+        :param snapshot: supervisord data snapshot
+        :type snapshot: Snapshot
+        :return: server and programs statuses
+        :rtype: Dict[str, Any]
+        """
+
+        return {
+            "server": self.labels.get("server", self.checker.options.server),
+            "up": not snapshot.error,
+            "error": snapshot.error,
+            "status": snapshot.status,
+            "code": self.checker._get_code(status=snapshot.status)
+            if snapshot.status is not None
+            else None,
+            "duration": snapshot.duration,
+            "timestamp": snapshot.timestamp,
+            "programs": [
+                {
+                    "name": info["name"],
+                    "group": info["group"],
+                    "statename": info["statename"],
+                    "status": self.checker._get_template(info=info),
+                    "uptime": max(info["now"] - info["start"], 0)
+                    if info["statename"] == self.checker.STATE_RUNNING
+                    else 0,
+                    "exitstatus": info["exitstatus"],
+                }
+                for info in snapshot.data
+            ],
+        }
+
+    @classmethod
+    def render_status(cls, documents):
+        """
+        Serialize servers status documents.
+
+        :param documents: servers status documents
+        :type documents: List[Dict[str, Any]]
+        :return: ETag and status in JSON format
+        :rtype: Tuple[str, bytes]
+        """
+
+        body = json.dumps({"servers": documents}, sort_keys=True).encode("utf-8")
+        state = [
+            dict(
+                cls._get_state(document=document),  # type: ignore
+                programs=[
+                    cls._get_state(document=program)  # type: ignore
+                    for program in document["programs"]
+                ],
+            )
+            for document in documents
+        ]
+        # weak ETag: bodies with the same state are equivalent, not identical
+        # (not used for security)
+        etag = 'W/"{digest}"'.format(
+            digest=hashlib.md5(  # nosec: B303
+                json.dumps(state, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+        )
+
+        return etag, body
+
+    @classmethod
+    def _get_state(cls, document):
+        """
+        Get status document state-bearing fields.
+
+        :param document: server or program status document
+        :type document: Dict[str, Any]
+        :return: status document without volatile fields
+        :rtype: Dict[str, Any]
+        """
+
+        return {
+            name: value
+            for name, value in document.items()
+            if name not in cls.VOLATILE_FIELDS
+        }
+
+    def get_status(self):
+        """
+        Get serialized status, serialized once per snapshot.
+
+        :return: ETag and status in JSON format
+        :rtype: Tuple[str, bytes]
+        """
+
+        snapshot = self.get_snapshot()  # type: ignore
+        status = self.status
+        if status is None or status[0] is not snapshot:
+            status = self.status = (
+                snapshot,
+                self.render_status(documents=[self.get_document(snapshot=snapshot)]),  # type: ignore  # noqa: E501
+            )
+
+        return status[1]
+
+
+class Scheduler(object):
+    """
+    Adaptive exporter servers requests schedule: requests spread over intervals
+    with jitter, in-flight requests capped globally and per host, intervals reset
+    after changes and problems and backed off while servers are stable.
+    """
+
+    def __init__(self, daemon):
+        """
+        Init scheduler.
+
+        :param daemon: exporter daemon to refresh servers snapshots of
+        :type daemon: ExporterDaemon
+        """
+
+        self.daemon = daemon
+        self.condition = threading.Condition()
+        # next request monotonic time and current interval by server
+        self.due, self.intervals = {}, {}
+        # configured intervals parsed once, not on every request
+        self.bases = self._get_bases()  # type: ignore
+        # in-flight requests servers and counts by host
+        self.polling, self.hosts = set(), {}
+        self.threads = []
+        self.stopped = False
+
+    def _get_host(self, exporter):
+        """
+        Get host in-flight requests capped for.
+
+        :param exporter: server exporter
+        :type exporter: Exporter
+        :return: host
+        :rtype: str
+        """
+
+        server = exporter.checker.options.server
+
+        return (
+            "localhost" if exporter.checker._is_local_server(server=server) else server
+        )
+
+    def _get_bases(self):
+        """
+        Parse configured servers intervals used after changes and problems.
+
+        :return: intervals in seconds by server (empty for global)
+        :rtype: Dict[str, float]
+        """
+
+        options = self.daemon.checker.options
+        bases = self.daemon.checker._parse_intervals(values=options.schedule_intervals)
+        bases.setdefault("", options.exporter_interval)
+
+        return bases
+
+    def _get_base(self, server):
+        """
+        Get server interval used after changes and problems.
+
+        :param server: server
+        :type server: str
+        :return: interval in seconds
+        :rtype: float
+        """
+
+        bases = self.bases
+
+        return bases.get(server, bases[""])
+
+    def sync(self):
+        """
+        Schedule added servers spread over their intervals, forget removed ones
+        and start requesting if enabled.
+        """
+
+        options = self.daemon.checker.options
+        # reloaded options may change intervals
+        bases = self._get_bases()  # type: ignore
+        with self.condition:
+            self.bases = bases
+            targets = self.daemon.targets
+            for server in list(self.due.keys()):
+                if server not in targets or not options.schedule:
+                    del self.due[server]
+            for server in list(self.intervals.keys()):
+                if server not in targets:
+                    del self.intervals[server]
+            for server, exporter in targets.items():
+                exporter.scheduled = options.schedule
+                base = self._get_base(server=server)  # type: ignore
+                self.intervals[server] = min(
+                    max(self.intervals.get(server, base), base),
+                    max(options.schedule_max_interval, base),
+                )
+                # in-flight ones scheduled on completion
+                if (
+                    options.schedule
+                    and server not in self.due  # noqa: W503
+                    and server not in self.polling  # noqa: W503
+                ):
+                    # random phase avoids requests bursts
+                    self.due[server] = monotonic() + random.uniform(  # nosec: B311
+                        0, base
+                    )
+            # worker threads count fixed at start
+            while options.schedule and len(self.threads) < options.schedule_concurrency:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+            self.condition.notify_all()
+
+    def _take(self):
+        """
+        Wait for due server with host in-flight requests below limit.
+
+        :return: server, its exporter and host or None if stopped
+        :rtype: Union[Tuple[str, Exporter, str], None]
+        """
+
+        with self.condition:
+            while not self.stopped:
+                now, wait = monotonic(), None
+                limit = self.daemon.checker.options.schedule_host_concurrency
+                for server, due in sorted(self.due.items(), key=lambda item: item[1]):
+                    exporter = self.daemon.targets.get(server)
+                    # removed by reload, forgotten on sync
+                    if exporter is None:
+                        continue
+                    host = self._get_host(exporter=exporter)  # type: ignore
+                    if self.hosts.get(host, 0) >= limit:
+                        continue
+                    if due > now:
+                        wait = due - now
+                        break
+                    del self.due[server]
+                    self.polling.add(server)
+                    self.hosts[host] = self.hosts.get(host, 0) + 1
+
+                    return server, exporter, host
+
+                # woken up by completed requests and reloads
+                self.condition.wait(wait)
+
+        return None
+
+    def _get_states(self, snapshot):
+        """
+        Get programs states from snapshot.
+
+        :param snapshot: supervisord data snapshot
+        :type snapshot: Snapshot
+        :return: programs groups, names and states
+        :rtype: List[Tuple[str, str, str]]
+        """
+
+        return sorted(
+            (info["group"], info["name"], info["statename"]) for info in snapshot.data
         )
-        parser.add_argument(
-            "-u",
-            "--username",
-            action="store",
-            dest="username",
-            type=str,
-            default="",
-            metavar="USERNAME",
-            help="supervisord user",
+
+    def _get_interval(self, server, previous, snapshot):
+        """
+        Get server next request interval: base one after changes and problems,
+        backed off while unchanged and OK.
+
+        :param server: server
+        :type server: str
+        :param previous: previous supervisord data snapshot
+        :type previous: Union[Snapshot, None]
+        :param snapshot: supervisord data snapshot
+        :type snapshot: Snapshot
+        :return: interval in seconds
+        :rtype: float
+        """
+
+        options = self.daemon.checker.options
+        base = self._get_base(server=server)  # type: ignore
+        if (
+            previous is None
+            or snapshot.error  # noqa: W503
+            or snapshot.status != self.daemon.checker.STATUS_OK  # noqa: W503
+            or self._get_states(snapshot=previous)  # type: ignore  # noqa: W503
+            != self._get_states(snapshot=snapshot)  # type: ignore  # noqa: W503
+        ):
+
+            return base
+
+        return min(
+            self.intervals.get(server, base) * options.schedule_backoff,
+            max(options.schedule_max_interval, base),
         )
-        parser.add_argument(
-            "-S",
-            "--password",
-            action="store",
-            dest="password",
-            type=str,
-            default="",
-            metavar="PASSWORD",
-            help="supervisord user password",
+
+    def _work(self):
+        """
+        Request due servers until stopped (runs in thread).
+        """
+
+        while True:
+            task = self._take()  # type: ignore
+            if task is None:
+                return
+            server, exporter, host = task
+            previous = exporter.snapshot
+            snapshot = exporter.refresh()
+            with self.condition:
+                self.polling.discard(server)
+                self.hosts[host] -= 1
+                # removed meanwhile or scheduling disabled
+                if server in self.daemon.targets and exporter.scheduled:
+                    interval = self._get_interval(  # type: ignore
+                        server=server, previous=previous, snapshot=snapshot
+                    )
+                    self.intervals[server] = interval
+                    jitter = self.daemon.checker.options.schedule_jitter
+                    self.due[
+                        server
+                    ] = monotonic() + interval * random.uniform(  # nosec: B311  # noqa: E501
+                        1 - jitter, 1 + jitter
+                    )
+                self.condition.notify_all()
+
+    def stop(self):
+        """
+        Stop requesting servers.
+        """
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+
+class ExporterDaemon(object):
+    """
+    Long running exporter serving one or many (fleet) supervisord servers,
+    reloading options on SIGHUP.
+    """
+
+    CONNECTION_OPTIONS = [
+        "server",
+        "port",
+        "username",
+        "password",
+        "record",
+        "replay",
+        "replay_speed",
+        "dns_ttl",
+    ]
+
+    def __init__(self, checker):
+        """
+        Init exporter daemon.
+
+        :param checker: configured checker
+        :type checker: CheckSupervisord
+        """
+
+        self.checker = checker
+        self.lock = threading.Lock()
+        self.targets = self._get_targets(checker=checker, previous=OrderedDict())  # type: ignore  # noqa: E501
+        # rendered outputs by kind with targets and snapshots they rendered from
+        self.rendered = {}
+        self.scheduler = Scheduler(daemon=self)  # type: ignore
+        self.scheduler.sync()  # type: ignore
+
+    def _get_connection_key(self, checker):
+        """
+        Get everything checker connection built from.
+
+        :param checker: configured checker
+        :type checker: CheckSupervisord
+        :return: connection options values and timeout
+        :rtype: List[Any]
+        """
+
+        return [getattr(checker.options, name) for name in self.CONNECTION_OPTIONS] + [
+            checker.timeout
+        ]
+
+    def _get_targets(self, checker, previous):
+        """
+        Get servers exporters, reusing previous ones for unchanged servers.
+
+        :param checker: configured checker
+        :type checker: CheckSupervisord
+        :param previous: previous exporters by server
+        :type previous: Dict[str, Exporter]
+        :return: exporters by server
+        :rtype: Dict[str, Exporter]
+        """
+
+        options = checker.options
+        fleet = checker._is_fleet(options=options)
+        servers = (
+            checker._partition(servers=checker._get_fleet_servers(options=options))
+            if fleet
+            else {options.server: (options.server, options.port)}
         )
-        parser.add_argument(
-            "--stopped-state-exit-code",
-            action="store",
-            dest="stopped_state_exit_code",
-            type=str,
-            choices=self.EXIT_CODES.keys(),
-            default=self.STATUS_OK,
-            metavar="STOPPED_STATE_EXIT_CODE",
-            help="stopped state exit code. {statuses}".format(
-                statuses=self.HELP_STATUSES
-            ),
+        targets = OrderedDict()
+        for server, (address, port) in servers.items():
+            target = (
+                checker._for_server(server=address, port=port) if fleet else checker
+            )
+            labels = {"server": server} if fleet else {}
+            exporter = previous.get(server)
+            if exporter is not None and self._get_connection_key(  # type: ignore
+                checker=exporter.checker
+            ) == self._get_connection_key(  # type: ignore
+                checker=target
+            ):
+                # unchanged server keeps connection, snapshot and warm state
+                target._adopt_state(checker=exporter.checker)
+                with exporter.lock:
+                    exporter.checker, exporter.labels = target, labels
+                    exporter.interval = options.exporter_interval
+                    exporter.metrics = exporter.status = None
+            else:
+                exporter = Exporter(checker=target, labels=labels)  # type: ignore
+            targets[server] = exporter
+
+        return targets
+
+    def reload(self):
+        """
+        Reload options, connecting only added servers and disconnecting removed ones.
+
+        :raises CheckSupervisordError: invalid options
+        """
+
+        with self.lock:
+            checker = self.checker._reload_config()
+            previous = self.targets
+            self.targets = self._get_targets(checker=checker, previous=previous)  # type: ignore  # noqa: E501
+            self.checker = checker
+            for server, exporter in previous.items():
+                if self.targets.get(server) is not exporter:
+                    exporter.close()
+            self.scheduler.sync()  # type: ignore
+
+    def _reload(self, *args):
+        """
+        Reload options keeping previous ones on errors (runs in background).
+
+        :param args: signal handler arguments
+        :type args: Any
+        """
+
+        try:
+            self.reload()  # type: ignore
+        except CheckSupervisordError as error:
+            sys.stderr.write(
+                "Reload failed, previous options kept: {error}\n".format(error=error)
+            )
+
+    def _on_hangup(self, *args):
+        """
+        Reload options on SIGHUP.
+
+        :param args: signal handler arguments
+        :type args: Any
+        """
+
+        # serving continues with previous targets while reloading
+        thread = threading.Thread(target=self._reload)
+        thread.daemon = True
+        thread.start()
+
+    def _render(self, kind, render):
+        """
+        Get all servers output, rendered once per servers snapshots.
+
+        :param kind: output kind
+        :type kind: str
+        :param render: output renderer from exporters and snapshots
+        :type render: Callable[[List[Tuple[Exporter, Snapshot]]], Any]
+        :return: rendered output
+        :rtype: Any
+        """
+
+        targets = self.targets
+        snapshots = list(
+            zip(
+                targets.values(),
+                self._get_snapshots(exporters=list(targets.values())),  # type: ignore
+            )
         )
-        parser.add_argument(
-            "--starting-state-exit-code",
-            action="store",
-            dest="starting_state_exit_code",
-            type=str,
-            choices=self.EXIT_CODES.keys(),
-            default=self.STATUS_WARNING,
-            metavar="STARTING_STATE_EXIT_CODE",
-            help="starting state exit code. {statuses}".format(
-                statuses=self.HELP_STATUSES
-            ),
+        rendered = self.rendered.get(kind)
+        if (
+            rendered is None
+            or rendered[0] is not targets  # noqa: W503
+            or any(  # noqa: W503
+                cached is not snapshot
+                for cached, (_, snapshot) in zip(rendered[1], snapshots)
+            )
+        ):
+            rendered = self.rendered[kind] = (
+                targets,
+                [snapshot for _, snapshot in snapshots],
+                render(snapshots),
+            )
+
+        return rendered[2]
+
+    def _get_snapshots(self, exporters):
+        """
+        Get servers snapshots, requesting stale ones concurrently.
+
+        :param exporters: servers exporters
+        :type exporters: List[Exporter]
+        :return: servers snapshots in exporters order
+        :rtype: List[Snapshot]
+        """
+
+        # scrape latency must not grow with fleet size
+        count = min(
+            self.checker.options.fleet_concurrency,
+            sum(1 for exporter in exporters if exporter.is_stale()),
         )
-        parser.add_argument(
-            "--network-errors-exit-code",
-            action="store",
-            dest="network_errors_exit_code",
-            type=str,
-            choices=self.EXIT_CODES.keys(),
-            default=self.STATUS_UNKNOWN,
-            metavar="NETWORK_ERRORS_EXIT_CODE",
-            help="network errors exit code. {statuses}".format(
-                statuses=self.HELP_STATUSES
-            ),
+        if count < 2:
+
+            return [exporter.get_snapshot() for exporter in exporters]
+
+        tasks, snapshots = queue.Queue(), [None] * len(exporters)  # type: ignore
+        for task in enumerate(exporters):
+            tasks.put(task)
+        threads = [
+            threading.Thread(target=self._work, args=(tasks, snapshots))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return snapshots
+
+    def _work(self, tasks, snapshots):
+        """
+        Get snapshots from tasks queue until it empty (runs in thread).
+
+        :param tasks: exporters positions and exporters queue
+        :type tasks: Queue
+        :param snapshots: servers snapshots by exporter position
+        :type snapshots: List[Union[Snapshot, None]]
+        """
+
+        while True:
+            try:
+                position, exporter = tasks.get_nowait()
+            except queue.Empty:
+
+                return
+
+            snapshots[position] = exporter.get_snapshot()
+
+    def _render_metrics(self, snapshots):
+        """
+        Render all servers metrics.
+
+        :param snapshots: exporters and their snapshots
+        :type snapshots: List[Tuple[Exporter, Snapshot]]
+        :return: metrics in Prometheus text exposition format
+        :rtype: bytes
+        """
+
+        # servers samples merged into single family per metric
+        families = OrderedDict()  # type: ignore
+        for exporter, snapshot in snapshots:
+            for family in exporter.get_families(snapshot=snapshot):
+                families.setdefault(family["name"], dict(family, samples=[]))[
+                    "samples"
+                ].extend(family["samples"])
+
+        return Exporter.render_families(families=list(families.values()))  # type: ignore  # noqa: E501
+
+    def _render_status(self, snapshots):
+        """
+        Serialize all servers status.
+
+        :param snapshots: exporters and their snapshots
+        :type snapshots: List[Tuple[Exporter, Snapshot]]
+        :return: ETag and status in JSON format
+        :rtype: Tuple[str, bytes]
+        """
+
+        return Exporter.render_status(  # type: ignore
+            documents=[
+                exporter.get_document(snapshot=snapshot)
+                for exporter, snapshot in snapshots
+            ]
         )
-        parser.add_argument(
-            "--no-programs-defined-exit-code",
-            action="store",
-            dest="no_programs_defined_exit_code",
-            type=str,
-            choices=self.EXIT_CODES.keys(),
-            default=self.STATUS_UNKNOWN,
-            metavar="NO_PROGRAMS_DEFINED_EXIT_CODE",
-            help="no programs defined exit code. {statuses}".format(
-                statuses=self.HELP_STATUSES
+
+    def get_metrics(self):
+        """
+        Get all servers metrics, rendered once per servers snapshots.
+
+        :return: metrics in Prometheus text exposition format
+        :rtype: bytes
+        """
+
+        targets = self.targets
+        if len(targets) == 1:
+
+            return list(targets.values())[0].get_metrics()
+
+        return self._render(kind="metrics", render=self._render_metrics)  # type: ignore
+
+    def get_status(self):
+        """
+        Get all servers serialized status, serialized once per servers snapshots.
+
+        :return: ETag and status in JSON format
+        :rtype: Tuple[str, bytes]
+        """
+
+        return self._render(kind="status", render=self._render_status)  # type: ignore
+
+    def serve_forever(self):
+        """
+        Serve metrics over HTTP.
+        """
+
+        server = ExporterServer(
+            (
+                self.checker.options.exporter_address,
+                self.checker.options.exporter_port,
             ),
+            ExporterHandler,
         )
-        parser.add_argument(
-            "-q",
-            "--quiet",
-            action="store_true",
-            default=False,
-            dest="quiet",
-            help="be quiet",
-        )
-        parser.add_argument(
-            "-v",
-            "--version",
-            action="version",
-            version="{version}".format(version=__version__),
+        server.exporter = self  # type: ignore
+        if hasattr(signal, "SIGHUP"):  # not available on Windows
+            signal.signal(signal.SIGHUP, self._on_hangup)
+        try:
+            server.serve_forever()
+        finally:
+            self.scheduler.stop()  # type: ignore
+            server.server_close()
+
+
+class ExporterServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded Prometheus exporter HTTP server.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+    exporter = None
+
+
+class ExporterHandler(BaseHTTPRequestHandler):
+    """
+    Prometheus exporter and status HTTP requests handler.
+    """
+
+    def do_GET(self):  # noqa: N802
+        """
+        Serve metrics and status.
+        """
+
+        path = self.path.split("?")[0]
+        if path == Exporter.STATUS_PATH:
+            self._send_status()  # type: ignore
+
+            return
+        if path != Exporter.METRICS_PATH:
+            self.send_error(404)
+
+            return
+
+        metrics = self.server.exporter.get_metrics()  # type: ignore
+        self.send_response(200)
+        self.send_header("Content-Type", Exporter.CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(metrics)))
+        self.end_headers()
+        self.wfile.write(metrics)
+
+    def _send_status(self):
+        """
+        Serve status, or not modified response for matching ETag.
+        """
+
+        etag, status = self.server.exporter.get_status()  # type: ignore
+        # weak comparison
+        matches = [
+            tag.strip().replace("W/", "", 1)
+            for tag in self.headers.get("If-None-Match", "").split(",")
+        ]
+        if etag.replace("W/", "", 1) in matches or "*" in matches:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", Exporter.STATUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(status)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(status)
+
+    def log_message(self, *args):
+        """
+        Log requests unless quiet.
+
+        :param args: log message format and arguments
+        :type args: Any
+        """
+
+        if not self.server.exporter.checker.options.quiet:  # type: ignore
+            BaseHTTPRequestHandler.log_message(self, *args)
+
+
+class Cancellable(object):
+    """
+    Concurrent requests cancellation support.
+    """
+
+    def _guard(self, connection, cancelled):
+        """
+        Make connection refuse to (re)connect once request cancelled.
+
+        :param connection: connection to server
+        :type connection: ServerProxy
+        :param cancelled: request cancellation event
+        :type cancelled: Event
+        :return: connection to server
+        :rtype: ServerProxy
+        """
+
+        def refuse():
+            """
+            Fail cancelled request.
+
+            :raises socket.error: request cancelled
+            """
+
+            raise socket.error("Request cancelled")
+
+        def guard_connect(http):
+            """
+            Check cancellation after HTTP connection connected.
+
+            :param http: HTTP connection
+            :type http: HTTPConnection
+            :return: HTTP connection
+            :rtype: HTTPConnection
+            """
+
+            connect = http.connect
+
+            def guarded_connect():
+                """
+                Connect and check cancellation.
+                """
+
+                connect()
+                # cancellation may be missed while connecting
+                if cancelled.is_set():
+                    http.close()
+                    refuse()  # type: ignore
+
+            http.connect = guarded_connect
+
+            return http
+
+        def guard_factory(factory):
+            """
+            Check cancellation before HTTP connection creation.
+
+            :param factory: HTTP connection factory
+            :type factory: Callable[..., HTTPConnection]
+            :return: guarded HTTP connection factory
+            :rtype: Callable[..., HTTPConnection]
+            """
+
+            created = []  # type: ignore
+
+            def guarded_factory(*args):
+                """
+                Create or reuse guarded HTTP connection.
+
+                :param args: HTTP connection factory arguments
+                :type args: Any
+                :return: HTTP connection
+                :rtype: HTTPConnection
+                """
+
+                if cancelled.is_set():
+                    refuse()  # type: ignore
+                http = factory(*args)
+                # transports reuse connections
+                if http not in created:
+                    created[:] = [guard_connect(http=http)]  # type: ignore
+
+                return http
+
+            return guarded_factory
+
+        transport = connection("transport")
+        # built-in transports and supervisor unix socket transport factories
+        for name in ["make_connection", "_get_connection"]:
+            if hasattr(transport, name):
+                setattr(transport, name, guard_factory(getattr(transport, name)))  # type: ignore  # noqa: E501
+
+        return connection
+
+    def _cancel(self, connection, cancelled):
+        """
+        Abort outstanding request unblocking thread waiting for response.
+
+        :param connection: connection to server or None if not created yet
+        :type connection: Union[ServerProxy, None]
+        :param cancelled: request cancellation event
+        :type cancelled: Event
+        """
+
+        cancelled.set()
+        if connection is None:
+
+            return
+
+        transport = connection("transport")
+        # built-in transports and supervisor unix socket transport
+        http = getattr(transport, "_connection", (None, None))[1] or getattr(
+            transport, "connection", None
         )
+        sock = getattr(http, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except (socket.error, ValueError):
+                pass
 
-        options = parser.parse_args()
-        # update stopped state value from command line argument
-        self.STATE_TO_TEMPLATE[self.STATE_STOPPED] = options.stopped_state_exit_code
-        # update starting state value from command line argument
-        self.STATE_TO_TEMPLATE[self.STATE_STARTING] = options.starting_state_exit_code
 
-        # check mandatory command line options supplied
-        if not options.server:
-            parser.error(message="Required server address option missing")
-        if options.username and not options.password:
-            parser.error(message="Required supervisord user password missing")
+class Hedge(Cancellable):
+    """
+    Hedged requests: race redundant endpoints of the same supervisord
+    firing request to next endpoint if no reply arrives within delay.
+    """
 
-        return options
+    def __init__(self, checker):
+        """
+        Init hedged requests.
 
-    def _get_connection_uri(self, tpl):
+        :param checker: configured checker
+        :type checker: CheckSupervisord
         """
-        Creates server connection URI formatted connection string.
 
-        :param tpl: connection string template name
-        :type tpl: str
-        :return: server connection URI formatted connection string
-        :rtype: str
+        self.checker = checker
+        self.endpoints = OrderedDict(
+            [(checker.options.server, (checker.options.server, checker.options.port))]
+        )
+        self.endpoints.update(
+            checker._parse_servers(
+                value=checker.options.hedge_servers, port=checker.options.port
+            )
+        )
+        self.delay = checker.options.hedge_delay
+        if checker.options.hedge_percentile:
+            # primary endpoint latency percentile, fixed delay until measured
+            delay = checker._update_latency(
+                update=lambda histogram: histogram.percentile(
+                    percent=checker.options.hedge_percentile
+                )
+            )
+            self.delay = self.delay if delay is None else delay
+
+    def _query(self, endpoint, connections, cancelled, results):
         """
+        Get data from endpoint and put it to results queue (runs in thread).
 
-        payload = {
-            "username": self.options.username,
-            "password": self.options.password,
-            "server": self.options.server,
-            "port": self.options.port,
-        }
+        :param endpoint: server endpoint
+        :type endpoint: str
+        :param connections: connections to endpoints by endpoint
+        :type connections: Dict[str, ServerProxy]
+        :param cancelled: request cancellation event
+        :type cancelled: Event
+        :param results: endpoints data or errors queue
+        :type results: Queue
+        """
 
-        return self.URI_TEMPLATES[tpl].format(**payload)
+        checker = self.checker._for_server(*self.endpoints[endpoint])
+        connection, data, error = None, None, None
+        try:
+            connection = self._guard(  # type: ignore
+                connection=checker._get_connection(), cancelled=cancelled
+            )
+            connections[endpoint] = connection
+            data = checker._fetch_data(connection=connection)
+        except Exception as exception:
+            error = exception
+        finally:
+            # do not leave sockets to garbage collector
+            if connection is not None:
+                connection("close")()
+        results.put((endpoint, data, error))
 
-    def _get_connection(self):
+    def fetch(self):
         """
-        Creates and return connection to supervisord.
+        Get data from first endpoint replied successfully cancelling the rest.
 
-        :return: connection to supervisord
-        :rtype: ServerProxy
+        :return: data from supervisord
+        :rtype: List[Dict[str, Union[str, int]]]
+        :raises Exception: all endpoints failed
         """
 
-        if self.options.server.startswith("/") and stat.S_ISSOCK(
-            os.stat(self.options.server).st_mode
-        ):  # communicate with server via unix socket
-            # (check is server address is path and path is unix socket)
-            try:
-                import supervisor.xmlrpc
-            except ImportError as error:  # noqa: B014
-                sys.stdout.write(
-                    "ERROR: Couldn't load module. {error}\n".format(error=error)
+        pending, started, connections = list(self.endpoints), [], {}  # type: ignore
+        cancels = {endpoint: threading.Event() for endpoint in self.endpoints}
+        results, error = queue.Queue(), None  # type: ignore
+        while pending or started:
+            if pending:
+                endpoint = pending.pop(0)
+                thread = threading.Thread(
+                    target=self._query,
+                    kwargs={
+                        "endpoint": endpoint,
+                        "connections": connections,
+                        "cancelled": cancels[endpoint],
+                        "results": results,
+                    },
                 )
-                sys.stdout.write(
-                    "ERROR: Unix socket support not available! Please install nagios-check-supervisord with unix socket support: 'nagios-check-supervisord[unix-socket-support]' or install 'supervisor' separately.\n"  # noqa: E501
+                # do not wait for abandoned requests on exit
+                thread.daemon = True
+                thread.start()
+                started.append(endpoint)
+            try:
+                endpoint, data, error = results.get(
+                    timeout=self.delay if pending else None
                 )
-                sys.exit(3)
+            except queue.Empty:  # no reply within delay, hedge
+                continue
+            started.remove(endpoint)
+            if error is None:
+                for endpoint in started:
+                    self._cancel(  # type: ignore
+                        connection=connections.get(endpoint),
+                        cancelled=cancels[endpoint],
+                    )
 
-            if all([self.options.username, self.options.password]):  # with auth
-                connection = xmlrpclib.ServerProxy(
-                    uri="https://",
-                    transport=supervisor.xmlrpc.SupervisorTransport(
-                        self.options.username,
-                        self.options.password,
-                        serverurl=self._get_connection_uri(tpl=self.URI_TPL_SOCKET),  # type: ignore  # noqa: E501
-                    ),
-                )
-            else:
-                connection = xmlrpclib.ServerProxy(
-                    uri="https://",
-                    transport=supervisor.xmlrpc.SupervisorTransport(
-                        username=None,
-                        password=None,
-                        serverurl=self._get_connection_uri(tpl=self.URI_TPL_SOCKET),  # type: ignore  # noqa: E501
-                    ),
-                )
+                return data
 
-        else:  # communicate with server via http
-            if all([self.options.username, self.options.password]):  # with auth
-                connection = xmlrpclib.Server(
-                    uri=self._get_connection_uri(tpl=self.URI_TPL_HTTP_AUTH)  # type: ignore  # noqa: E501
-                )
-            else:
-                connection = xmlrpclib.Server(
-                    uri=self._get_connection_uri(tpl=self.URI_TPL_HTTP)  # type: ignore  # noqa: E501
-                )
+        raise error  # type: ignore
 
-        return connection
 
-    def _get_data(self):
+class Cluster(Cancellable):
+    """
+    Cluster-level check: quorum of servers must run programs.
+    """
+
+    OUTPUT_TEMPLATE = "{status}: quorum {outcome}, {running} of {total} servers running programs (quorum {quorum}){problems} | running={running};;{quorum}:;0;{total}\n"  # noqa: E501
+    CANCELLED, TIMED_OUT = "cancelled", "timed out"
+
+    def __init__(self, checker):
         """
-        Get and return data from supervisord.
+        Init cluster check.
 
-        :return: data from supervisord
-        :rtype: List[Dict[str, Union[str, int]]]
+        :param checker: configured checker
+        :type checker: CheckSupervisord
         """
 
-        try:
-            connection = self._get_connection()  # type: ignore  # noqa: E501
+        self.checker = checker
+        self.servers = checker._parse_servers(
+            value=checker.options.cluster_servers, port=checker.options.port
+        )
+        self.quorum = checker.options.quorum or len(self.servers) // 2 + 1
+        self.timeout = checker.options.cluster_timeout
 
-            return connection.supervisor.getAllProcessInfo()
+    def _query(self, server, checker, connections, cancelled, results):
+        """
+        Get data from server and put it to results queue (runs in thread).
 
-        except Exception as error:
-            if not self.options.quiet:
-                sys.stdout.write(
-                    "ERROR: Server communication problem. {error}\n".format(error=error)
-                )
-            sys.exit(
-                self.EXIT_CODES.get(
-                    self.options.network_errors_exit_code, self.STATUS_UNKNOWN
-                )
+        :param server: cluster server
+        :type server: str
+        :param checker: server checker
+        :type checker: CheckSupervisord
+        :param connections: connections to servers by server
+        :type connections: Dict[str, ServerProxy]
+        :param cancelled: request cancellation event
+        :type cancelled: Event
+        :param results: servers problems queue
+        :type results: Queue
+        """
+
+        connection = None
+        try:
+            connection = self._guard(  # type: ignore
+                connection=checker._get_connection(), cancelled=cancelled
+            )
+            connections[server] = connection
+            data = checker._fetch_data(connection=connection)
+            problem = self._get_problem(checker=checker, data=data)  # type: ignore
+        except Exception as exception:
+            problem = "ERROR: {error}".format(
+                error=str(exception) or exception.__class__.__name__
             )
+        finally:
+            # do not leave sockets to garbage collector
+            if connection is not None:
+                connection("close")()
+        results.put((server, problem))
 
-    def _get_status(self, data):
+    def _get_problem(self, checker, data):
         """
-        Create main status.
+        Find out why server does not run programs.
 
-        :param data: devices states info
+        :param checker: server checker
+        :type checker: CheckSupervisord
+        :param data: supervisord XML-RPC call result
         :type data: List[Dict[str, Union[str, int]]]
-        :return: main check status
+        :return: problem description, empty if server runs all programs
         :rtype: str
         """
 
-        # for multiple check need to get main status by priority
-        priority = (
-            min(  # type: ignore  # noqa: C407
-                [
-                    self.OUTPUT_TEMPLATES[self.STATE_TO_TEMPLATE[info["statename"]]][
-                        "priority"
-                    ]
-                    for info in data
-                ]
+        states = checker._get_states(data=data, resources={})
+        if not states:
+
+            return "No program configured/found"
+
+        index = {}  # type: ignore
+        for info in data:
+            index.setdefault(info["name"], info)
+
+        return ", ".join(
+            [
+                "'{name}' ({status})".format(
+                    name=name, status=state["status"] or "not found"
+                )
+                for name, state in states.items()
+                if index.get(name, {}).get("statename") != checker.STATE_RUNNING
+            ]
+        )
+
+    def check(self):
+        """
+        Query cluster servers concurrently until quorum outcome decided.
+
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        pending, connections, results = list(self.servers), {}, queue.Queue()  # type: ignore  # noqa: E501
+        cancels = {server: threading.Event() for server in self.servers}
+        for server in self.servers:
+            thread = threading.Thread(
+                target=self._query,
+                kwargs={
+                    "server": server,
+                    "checker": self.checker._for_server(*self.servers[server]),
+                    "connections": connections,
+                    "cancelled": cancels[server],
+                    "results": results,
+                },
             )
-            if data
-            else self.STATUS_TO_PRIORITY[self.options.no_programs_defined_exit_code]
+            # do not wait for abandoned requests on exit
+            thread.daemon = True
+            thread.start()
+
+        running, problems = [], OrderedDict()  # type: ignore
+        deadline = monotonic() + self.timeout
+        reason = self.CANCELLED
+        # stop waiting as soon as quorum reached or can't be reached anymore
+        while len(running) < self.quorum <= len(running) + len(pending):
+            try:
+                server, problem = results.get(timeout=max(deadline - monotonic(), 0))
+            except queue.Empty:
+                reason = self.TIMED_OUT
+
+                break
+            pending.remove(server)
+            if problem:
+                problems[server] = problem
+            else:
+                running.append(server)
+
+        for server in pending:
+            self._cancel(connection=connections.get(server), cancelled=cancels[server])  # type: ignore  # noqa: E501
+            problems[server] = reason
+
+        return self._get_result(running=running, problems=problems)  # type: ignore
+
+    def _get_result(self, running, problems):
+        """
+        Create cluster check result.
+
+        :param running: servers running programs
+        :type running: List[str]
+        :param problems: servers problems by server
+        :type problems: Dict[str, str]
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        status = (
+            self.checker.STATUS_OK
+            if len(running) >= self.quorum
+            else self.checker.options.quorum_exit_code
         )
-        status = self.PRIORITY_TO_STATUS.get(priority, self.PRIORITY_CRITICAL)  # type: ignore  # noqa: E501
 
-        return status
+        return CheckResult(
+            output=self.OUTPUT_TEMPLATE.format(
+                status=status.upper(),
+                outcome="reached" if status == self.checker.STATUS_OK else "lost",
+                running=len(running),
+                total=len(self.servers),
+                quorum=self.quorum,
+                problems=". {problems}".format(
+                    problems=", ".join(
+                        [
+                            "'{server}': {problem}".format(
+                                server=server, problem=problem
+                            )
+                            for server, problem in problems.items()
+                        ]
+                    )
+                )
+                if problems
+                else "",
+            ),
+            code=self.checker._get_code(status=status),
+        )
 
-    def _get_code(self, status):
+
+class Fleet(object):
+    """
+    Fleet check: servers sharded across worker processes,
+    each checking its shard concurrently.
+    """
+
+    def __init__(self, checker):
         """
-        Create exit code.
+        Init fleet check.
 
-        :param status: main check status
-        :type status: str
-        :return: exit code
-        :rtype: int
+        :param checker: configured checker
+        :type checker: CheckSupervisord
         """
 
-        # create exit code (unknown if something happened wrong)
-        return self.EXIT_CODES.get(status, self.STATUS_UNKNOWN)
+        self.checker = checker
 
-    def _get_output(self, data, status):
+    def _check_server(self, position, server, address, port):
         """
-        Create Nagios and human readable supervisord statuses.
+        Check fleet server.
 
-        :param data: supervisord XML-RPC call result
-        :type data: List[Dict[str, Union[str, int]]]
-        :param status: main check status
-        :type status: str
-        :return: human readable supervisord statuses
-        :rtype: str
+        :param position: server position in fleet
+        :type position: int
+        :param server: fleet server
+        :type server: str
+        :param address: server address or unix socket
+        :type address: str
+        :param port: server port
+        :type port: int
+        :return: server status, position, name and problems
+        :rtype: Tuple[str, int, str, str]
         """
 
-        states = OrderedDict()
-        programs = (
-            map(
-                lambda program: program.strip(),
-                self.options.programs.strip().split(","),
+        checker = self.checker._for_server(server=address, port=port)
+        checker.timeout = self.checker.options.fleet_timeout
+        try:
+            data = checker._fetch_data(connection=None)
+        except Exception as exception:
+
+            return (
+                checker.options.network_errors_exit_code,
+                position,
+                server,
+                "ERROR: {error}".format(
+                    error=str(exception) or exception.__class__.__name__
+                ),
             )
-            if self.options.programs
-            else map(lambda x: x["name"], data)
-        )
 
-        for program in programs:
-            try:
-                info = min(filter(lambda x: x["name"] == program, data))
-                states.update(
-                    {
-                        program: {
-                            "name": program,
-                            "template": self.STATE_TO_TEMPLATE[info["statename"]],
-                            "status": info["spawnerr"]
-                            if info["spawnerr"]
-                            else info["statename"],
-                        }
-                    }
-                )
-            except ValueError:
-                states.update(
-                    {program: {"name": program, "template": "unknown", "status": ""}}
-                )
+        status = checker._get_status(data=data)
+        if status == checker.STATUS_OK:
+
+            return status, position, server, ""
+
+        states = checker._get_states(data=data, resources={})
 
-        output = (
+        return (
+            status,
+            position,
+            server,
             ", ".join(
                 [
-                    str(
-                        self.OUTPUT_TEMPLATES[states[program]["template"]]["text"]
-                    ).format(**states[program])
-                    for program in sorted(
-                        states.keys(),
-                        key=lambda item: self.OUTPUT_TEMPLATES[  # type: ignore
-                            states[item]["template"]
-                        ]["priority"],
+                    checker._format(state=state)
+                    for state in sorted(
+                        states.values(),
+                        key=lambda item: checker.OUTPUT_TEMPLATES[item["template"]][
+                            "priority"
+                        ],
                     )
+                    if state["template"] != checker.STATUS_OK
                 ]
             )
-            if len(states)
-            else "No program configured/found"
+            or "No program configured/found",  # noqa: W503
         )
 
-        # return full status string with main status
-        # for multiple programs and all programs states
-        return "{status}: {output}\n".format(
-            **{"status": status.upper(), "output": output}
+    def _work(self, tasks, results):
+        """
+        Check servers from tasks queue until it empty (runs in thread).
+
+        :param tasks: servers to check queue
+        :type tasks: Queue
+        :param results: servers checks results
+        :type results: List[Tuple[str, int, str, str]]
+        """
+
+        while True:
+            try:
+                task = tasks.get_nowait()
+            except queue.Empty:
+
+                return
+
+            results.append(self._check_server(*task))  # type: ignore
+
+    def check_shard(self, servers):
+        """
+        Check shard servers concurrently.
+
+        :param servers: shard servers positions, names, addresses and ports
+        :type servers: List[Tuple[int, str, str, int]]
+        :return: shard statuses counts and first problems
+        :rtype: Tuple[Dict[str, int], List[Tuple[int, int, str, str]]]
+        """
+
+        tasks, results = queue.Queue(), []  # type: ignore
+        for server in servers:
+            tasks.put(server)
+        threads = [
+            threading.Thread(target=self._work, args=(tasks, results))
+            for _ in range(min(self.checker.options.fleet_concurrency, len(servers)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        counts = {}  # type: ignore
+        for status, _, _, _ in results:
+            counts[status] = counts.get(status, 0) + 1
+
+        # send back only what parent can output
+        return counts, heapq.nsmallest(
+            self.checker.options.summary_limit,
+            (
+                (self.checker.STATUS_TO_PRIORITY[status], position, server, problem)
+                for status, position, server, problem in results
+                if status != self.checker.STATUS_OK
+            ),
+        )
+
+    def _run_shards(self, servers):
+        """
+        Check servers sharded across worker processes (single shard in place).
+
+        :param servers: servers positions, names, addresses and ports
+        :type servers: List[Tuple[int, str, str, int]]
+        :return: shards statuses counts and first problems
+        :rtype: List[Tuple[Dict[str, int], List[Tuple[int, int, str, str]]]]
+        """
+
+        workers = min(
+            self.checker.options.fleet_workers or multiprocessing.cpu_count(),
+            len(servers),
         )
+        if workers == 1:
+            # worker process start is slower than checking single shard in place
+
+            return [self.check_shard(servers=servers)]  # type: ignore
+
+        pool = multiprocessing.Pool(processes=workers)
+        try:
+
+            return pool.map(
+                _check_fleet_shard,
+                [
+                    (self.checker.options, servers[shard::workers])
+                    for shard in range(workers)
+                ],
+            )
+        finally:
+            pool.terminate()
+            pool.join()
 
     def check(self):
         """
-        Get data from server and create plugin output.
+        Check fleet servers sharded across worker processes.
+
+        :return: plugin output and exit code
+        :rtype: CheckResult
+        """
+
+        fleet = self.checker._get_fleet_servers(options=self.checker.options)
+        if not fleet and not self.checker.uninspected:
+
+            return CheckResult(
+                output="{status}: No supervisord instances discovered\n".format(
+                    status=self.checker.STATUS_UNKNOWN.upper()
+                ),
+                code=self.checker._get_code(status=self.checker.STATUS_UNKNOWN),
+            )
+
+        servers = [
+            (position, server, address, port)
+            for position, (server, (address, port)) in enumerate(
+                self.checker._partition(servers=fleet).items()
+            )
+        ]
+        # fleet may be smaller than monitoring nodes count
+        shards = self._run_shards(servers=servers) if servers else []  # type: ignore
+
+        counts = OrderedDict(
+            (status, 0)
+            for status in sorted(
+                self.checker.STATUS_TO_PRIORITY.keys(),
+                key=lambda item: self.checker.STATUS_TO_PRIORITY[item],
+            )
+        )
+        for shard_counts, _ in shards:
+            for status, count in shard_counts.items():
+                counts[status] += count
+        # discovered supervisord processes with unknown sockets are not checked
+        uninspected = [
+            (
+                self.checker.STATUS_TO_PRIORITY[self.checker.STATUS_UNKNOWN],
+                len(servers) + position,
+                "pid {pid}".format(pid=pid),
+                "supervisord sockets unknown, not permitted to inspect process",
+            )
+            for position, pid in enumerate(self.checker.uninspected)
+        ]
+        counts[self.checker.STATUS_UNKNOWN] += len(uninspected)
+
+        return self._get_result(  # type: ignore
+            counts=counts,
+            problems=heapq.nsmallest(
+                self.checker.options.summary_limit,
+                [problem for _, problems in shards for problem in problems]
+                + uninspected,  # noqa: W503
+            ),
+            total=len(servers) + len(uninspected),
+        )
+
+    def _get_result(self, counts, problems, total):
+        """
+        Create fleet check result.
 
+        :param counts: servers counts by status
+        :type counts: Dict[str, int]
+        :param problems: first problems (priority, position, server, problem)
+        :type problems: List[Tuple[int, int, str, str]]
+        :param total: servers count
+        :type total: int
         :return: plugin output and exit code
-        :rtype: Tuple[str, int]
+        :rtype: CheckResult
         """
 
-        data = self._get_data()  # type: ignore
-        status = self._get_status(data=data)  # type: ignore
-        code = self._get_code(status=status)  # type: ignore
+        status = next(
+            (status for status, count in counts.items() if count),
+            self.checker.STATUS_OK,
+        )
+        hidden = total - counts[self.checker.STATUS_OK] - len(problems)
+        output = "{status}: {total} servers{node}{counts}".format(
+            status=status.upper(),
+            total=total,
+            node=" (node {node} of {count})".format(
+                node=self.checker.options.node_id,
+                count=self.checker.options.node_count,
+            )
+            if self.checker.options.node_count > 1
+            else "",
+            counts=": {counts}".format(
+                counts=", ".join(
+                    [
+                        "{count} {name}".format(count=count, name=name)
+                        for name, count in counts.items()
+                        if count
+                    ]
+                )
+            )
+            if total
+            else "",
+        )
+        if problems:
+            output = "{output}; {problems}{hidden}".format(
+                output=output,
+                problems=", ".join(
+                    [
+                        "'{server}': {problem}".format(server=server, problem=problem)
+                        for _, _, server, problem in problems
+                    ]
+                ),
+                hidden=" and {hidden} more".format(hidden=hidden) if hidden else "",
+            )
+        perfdata = " | {perfdata}".format(
+            perfdata=" ".join(
+                [
+                    "{name}={count};;;0;{total}".format(
+                        name=name, count=count, total=total
+                    )
+                    # not "status", python 2 list comprehensions leak variables
+                    for name, count in counts.items()
+                ]
+            )
+        )
+        if self.checker.options.output_limit:
+            # drop performance data first if it does not leave place for statuses
+            if len(perfdata.encode("utf-8")) > self.checker.options.output_limit // 2:
+                perfdata = ""
+            output = self.checker._truncate(
+                output=output,
+                limit=self.checker.options.output_limit
+                - len(perfdata.encode("utf-8")),  # noqa: W503
+            )
+
+        return CheckResult(
+            output="{output}{perfdata}\n".format(output=output, perfdata=perfdata),
+            code=self.checker._get_code(status=status),
+        )
+
 
-        return self._get_output(data=data, status=status), code  # type: ignore
+def _check_fleet_shard(payload):
+    """
+    Check fleet shard servers (runs in worker process).
+
+    :param payload: options and shard servers positions, names, addresses and ports
+    :type payload: Tuple[Namespace, List[Tuple[int, str, str, int]]]
+    :return: shard statuses counts and first problems
+    :rtype: Tuple[Dict[str, int], List[Tuple[int, int, str, str]]]
+    """
+
+    options, servers = payload
+
+    return Fleet(checker=CheckSupervisord(options=options)).check_shard(  # type: ignore
+        servers=servers
+    )
 
 
 def main():
@@ -501,9 +6811,17 @@ def main():
     """
 
     checker = CheckSupervisord()  # type: ignore
-    output, code = checker.check()  # type: ignore
-    sys.stdout.write(output)
-    sys.exit(code)
+    if checker.options.exporter:
+        ExporterDaemon(checker=checker).serve_forever()  # type: ignore
+
+        return
+
+    try:
+        result = checker.check()  # type: ignore
+    finally:
+        checker.profiler.dump()  # type: ignore
+    sys.stdout.write(result.output)
+    sys.exit(result.code)
 
 
 if __name__ == "__main__":
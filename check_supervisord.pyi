@@ -3,14 +3,37 @@
 # nagios-check-supervisord
 # check_supervisord.pyi
 
-from typing import List, Tuple, Dict, Union  # pylint: disable=W0611
+from typing import (  # pylint: disable=W0611
+    Any,
+    Dict,
+    Set,
+    List,
+    Tuple,
+    Union,
+    Pattern,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    NamedTuple,
+    ContextManager,
+)
 
-from argparse import Namespace
+import socket
+from queue import Queue
+from threading import Lock, Event, Thread, Condition
+from cProfile import Profile
+from argparse import Action, Namespace, ArgumentParser
+from collections import namedtuple
+from http.client import HTTPConnection
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from xml.parsers.expat import XMLParserType
 
 try:
-    from xmlrpc.client import ServerProxy
+    from xmlrpc.client import Transport, ServerProxy
 except ImportError:
-    from xmlrpclib import ServerProxy # type: ignore
+    from xmlrpclib import Transport, ServerProxy # type: ignore
 
 
 __all__: List[str] = ...
@@ -18,6 +41,247 @@ __all__: List[str] = ...
 
 VERSION: Tuple[int, int, int] = ...
 __version__: str = ...
+IMPORTED_AT: float = ...
+
+
+def _formatter_field_name_split(
+    field: str,
+) -> Tuple[str, Iterator[Tuple[bool, Union[str, int]]]]: ...
+
+
+class NullPhase(object):
+    def __enter__(self) -> NullPhase: ...
+    def __exit__(self, *args: Any) -> bool: ...
+
+
+class Phase(object):
+
+    profiler: Profiler = ...
+    name: str = ...
+    started: float = ...
+
+    def __init__(self, profiler: Profiler, name: str) -> None: ...
+    def __enter__(self) -> Phase: ...
+    def __exit__(self, *args: Any) -> bool: ...
+
+
+class ParserProxy(object):
+
+    parser: XMLParserType = ...
+    profiler: Profiler = ...
+
+    def __init__(self, parser: XMLParserType, profiler: Profiler) -> None: ...
+    def feed(self, data: bytes) -> None: ...
+    def close(self) -> None: ...
+
+
+class Profiler(object):
+
+    PHASE_STARTUP: str = ...
+    PHASE_OPTIONS: str = ...
+    PHASE_CONNECTION: str = ...
+    PHASE_RPC: str = ...
+    PHASE_UNMARSHAL: str = ...
+    PHASE_RESOURCES: str = ...
+    PHASE_STATUS: str = ...
+    PHASE_OUTPUT: str = ...
+    PHASE_CHECK: str = ...
+    NULL_PHASE: NullPhase = ...
+    CPROFILE_LIMIT: int = ...
+
+    enabled: bool = ...
+    output: str = ...
+    timings: Dict[str, float] = ...
+    profile: Optional[Profile] = ...
+
+    def __init__(
+        self, enabled: bool = ..., output: str = ..., cprofile: bool = ...
+    ) -> None: ...
+    def phase(self, name: str) -> Union[Phase, NullPhase]: ...
+    def add(self, name: str, duration: float) -> None: ...
+    def instrument(self, connection: ServerProxy) -> ServerProxy: ...
+    def run(self, func: Callable[[], Any]) -> Any: ...
+    def _get_startup(self) -> Optional[float]: ...
+    def _get_cprofile(self) -> List[Dict[str, Union[str, int, float]]]: ...
+    def report(self) -> Dict[str, Any]: ...
+    def dump(self) -> None: ...
+
+
+class OutputFormatter(object):
+
+    FIELDS: List[str] = ...
+    DEFAULTS: Dict[str, Union[str, int]] = ...
+    CONVERSIONS: Dict[str, Callable[[Any], str]] = ...
+
+    fields: Set[str] = ...
+    template: str = ...
+    render: Optional[Callable[[Dict[str, Any]], str]] = ...
+
+    def __init__(self, template: str) -> None: ...
+    def _validate(self, template: str) -> None: ...
+    def __call__(self, state: Dict[str, Any]) -> str: ...
+
+
+class StatePolicy(object):
+
+    default: Dict[str, str] = ...
+    groups: Dict[str, Dict[str, str]] = ...
+    programs: Dict[str, Dict[str, str]] = ...
+    unknown: str = ...
+    cache: Dict[Tuple[str, str, str], str] = ...
+
+    def __init__(
+        self,
+        default: Dict[str, str],
+        groups: Optional[Dict[str, Dict[str, str]]] = ...,
+        programs: Optional[Dict[str, Dict[str, str]]] = ...,
+        unknown: str = ...,
+    ) -> None: ...
+    def __setattr__(self, name: str, value: Any) -> None: ...
+    def _resolve(self, group: str, name: str, state: str) -> str: ...
+    def resolve(self, info: Dict[str, Union[str, int]]) -> str: ...
+
+
+class CircuitBreaker(object):
+
+    failures: int = ...
+    cooldown: float = ...
+    state: Dict[str, Union[int, float]] = ...
+    lock: Lock = ...
+
+    def __init__(
+        self,
+        failures: int,
+        cooldown: float,
+        state: Optional[Dict[str, Union[int, float]]] = ...,
+    ) -> None: ...
+    def allow(self, now: float) -> bool: ...
+    def retry_in(self, now: float) -> float: ...
+    def success(self) -> None: ...
+    def failure(self, now: float) -> None: ...
+
+
+class LatencyHistogram(object):
+
+    SUB_BUCKETS: int = ...
+    MAX_EXPONENT: int = ...
+    MAX_COUNT: int = ...
+
+    state: Dict[str, List[int]] = ...
+    lock: Lock = ...
+
+    def __init__(self, state: Optional[Dict[str, List[int]]] = ...) -> None: ...
+    def _get_bucket(self, milliseconds: float) -> int: ...
+    def _get_bound(self, bucket: int) -> float: ...
+    def record(self, seconds: float) -> None: ...
+    def percentile(self, percent: float) -> Optional[float]: ...
+
+
+class UnixStreamHTTPConnection(HTTPConnection):
+
+    socket_path: str = ...
+    socket_timeout: Optional[float] = ...
+
+    def __init__(self, path: str, timeout: Optional[float] = ...) -> None: ...
+    def connect(self) -> None: ...
+
+
+class UnixStreamTransport(Transport):
+
+    socket_path: str = ...
+    timeout: Optional[float] = ...
+    authorization: str = ...
+
+    def __init__(
+        self,
+        path: str,
+        username: str = ...,
+        password: str = ...,
+        timeout: Optional[float] = ...,
+    ) -> None: ...
+    def get_host(
+        self, host: str
+    ) -> Tuple[str, List[Tuple[str, str]], Dict[str, str]]: ...
+    def make_connection(self, host: str) -> UnixStreamHTTPConnection: ...  # type: ignore  # noqa: E501
+
+
+class Resolver(object):
+
+    ttl: float = ...
+    cache: Dict[Tuple[str, int], Tuple[float, List[Tuple[int, Tuple[Any, ...]]]]] = ...
+    lock: Lock = ...
+
+    def __init__(self, ttl: float) -> None: ...
+    def _interleave(
+        self, infos: List[Tuple[int, int, int, str, Tuple[Any, ...]]]
+    ) -> List[Tuple[int, Tuple[Any, ...]]]: ...
+    def resolve(self, host: str, port: int) -> List[Tuple[int, Tuple[Any, ...]]]: ...
+
+
+class DualStackHTTPConnection(HTTPConnection):
+
+    ATTEMPT_DELAY: float = ...
+    IN_PROGRESS: List[int] = ...
+
+    resolver: Resolver = ...
+
+    def __init__(
+        self, host: str, resolver: Resolver, timeout: Optional[float] = ...
+    ) -> None: ...
+    def _get_timeout(self) -> Optional[float]: ...
+    def _attempt(
+        self, family: int, address: Tuple[Any, ...]
+    ) -> Tuple[socket.socket, int]: ...
+    def connect(self) -> None: ...
+
+
+class DualStackTransport(Transport):
+
+    resolver: Resolver = ...
+    timeout: Optional[float] = ...
+
+    def __init__(self, resolver: Resolver, timeout: Optional[float] = ...) -> None: ...
+    def make_connection(self, host: str) -> DualStackHTTPConnection: ...  # type: ignore  # noqa: E501
+
+
+class RecordingParser(object):
+
+    parser: XMLParserType = ...
+    chunks: List[bytes] = ...
+
+    def __init__(self, parser: XMLParserType, chunks: List[bytes]) -> None: ...
+    def feed(self, data: bytes) -> None: ...
+    def close(self) -> None: ...
+
+
+class Recorder(object):
+
+    path: str = ...
+    server: str = ...
+    lock: Lock = ...
+
+    def __init__(self, path: str, server: str) -> None: ...
+    def write(self, exchange: Dict[str, Any]) -> None: ...
+    def instrument(self, connection: ServerProxy) -> ServerProxy: ...
+
+
+class ReplayTransport(Transport):
+
+    RECORDINGS: Dict[str, Dict[str, List[Dict[str, Any]]]] = ...
+    LOCK: Lock = ...
+
+    exchanges: List[Dict[str, Any]] = ...
+    speed: float = ...
+    position: int = ...
+
+    def __init__(self, path: str, server: str, speed: float) -> None: ...
+    @classmethod
+    def load(cls, path: str) -> Dict[str, List[Dict[str, Any]]]: ...
+    @staticmethod
+    def _parse_request(request_body: bytes) -> Tuple[str, Tuple[Any, ...]]: ...
+    def request(  # type: ignore
+        self, host: str, handler: str, request_body: bytes, verbose: bool = ...
+    ) -> Tuple[Any, ...]: ...
 
 
 class CheckSupervisord(object):
@@ -36,26 +300,439 @@ class CheckSupervisord(object):
     STATE_EXITED: str = ...
     STATE_FATAL: str = ...
     STATE_UNKNOWN: str = ...
+    STATES: List[str] = ...
     STATE_TO_TEMPLATE: Dict[str, str] = ...
     URI_TPL_HTTP: str = ...
     URI_TPL_HTTP_AUTH: str = ...
     URI_TPL_SOCKET: str = ...
     URI_TEMPLATES: Dict[str, str] = ...
+    POLICY_REGEX: Pattern[str] = ...
+    UNIX_SCHEME: str = ...
+    UNIX_SOCKET_URI: str = ...
     PRIORITY_CRITICAL: int = ...
     PRIORITY_WARNING: int = ...
     PRIORITY_UNKNOWN: int = ...
     PRIORITY_OK: int = ...
     PRIORITY_TO_STATUS: Dict[int, str] = ...
+    STATUS_TO_PRIORITY: Dict[str, int] = ...
+    HELP_STATUSES: str = ...
+    LOCAL_SERVERS: List[str] = ...
+    RESOURCE_RSS: str = ...
+    RESOURCE_CPU_TIME: str = ...
+    RESOURCE_FDS: str = ...
+    RESOURCE_THREADS: str = ...
+    RESOURCES_UOM: Dict[str, str] = ...
+    RESOURCES_THRESHOLDS: Dict[str, Tuple[str, str]] = ...
+    SIZE_UNITS: Dict[str, int] = ...
+    SIZE_REGEX: Pattern[str] = ...
+
+    LATENCY_PERCENTILES: List[int] = ...
+    LOG_STDERR: str = ...
+    LOG_STDOUT: str = ...
+    LOG_MIN_BYTES: int = ...
+    LOG_METHODS: Dict[str, str] = ...
+    CONFIG_SECTION: str = ...
+    CONFIG_EXCLUDED: List[str] = ...
+    JUMP_HASH_MULTIPLIER: int = ...
+    JUMP_HASH_MASK: int = ...
+    DISCOVERY_PATTERN: str = ...
+    DISCOVERY_COMMANDS: List[bytes] = ...
+    DISCOVERY_CONFIGS: List[bytes] = ...
+    UNIX_SOCKET_LISTENING: int = ...
+    DISCOVERY_PROC_MAX_AGE: float = ...
+
+    DEFAULTS: Optional[Dict[str, Any]] = ...
+    PARSER: Optional[ArgumentParser] = ...
+    CONFIG_CACHE_SCHEMA: int = ...
+
+    embedded: bool = ...
+    options: Namespace = ...
+    policy: StatePolicy = ...
+    formatters: Dict[str, OutputFormatter] = ...
+    fields: List[str] = ...
+    log_matcher: Optional[Pattern] = ...
+    breaker: CircuitBreaker = ...
+    histogram: LatencyHistogram = ...
+    latency: Optional[float] = ...
+    percentiles: Dict[int, Optional[float]] = ...
+    configured: Optional[List[str]] = ...
+    overrides: Dict[str, Any] = ...
+    timeout: Optional[float] = ...
+    uninspected: List[str] = ...
+    resolver: Resolver = ...
+    recorder: Optional[Recorder] = ...
+    replayer: Optional[ReplayTransport] = ...
+    profiler: Profiler = ...
 
-    def __init__(self) -> None: ...
+    def __init__(self, options: Optional[Namespace] = ...) -> None: ...
+    @classmethod
+    def from_options(cls, **kwargs: Any) -> CheckSupervisord: ...
     def _get_options(self) -> Namespace: ...
-    def _get_connection_string(self, tpl: str) -> str: ...
+    def _get_overrides(self, parser: ArgumentParser) -> Dict[str, Any]: ...
+    def _reload_config(self) -> CheckSupervisord: ...
+    def _parse_options(self, parser: ArgumentParser) -> Namespace: ...
+    def _get_parser(self) -> ArgumentParser: ...
+    def _validate_options(self, options: Namespace) -> None: ...
+    def _load_config(
+        self, options: Namespace, parser: ArgumentParser
+    ) -> Dict[str, Any]: ...
+    def _parse_config(self, path: str, parser: ArgumentParser) -> Dict[str, Any]: ...
+    def _convert_config_value(self, action: Action, value: str) -> Any: ...
+    def _parse_policy(
+        self, values: Optional[List[str]], target: bool
+    ) -> Dict[str, Dict[str, str]]: ...
+    def _parse_intervals(self, values: Optional[List[str]]) -> Dict[str, float]: ...
+    def _get_policy(self) -> StatePolicy: ...
+    def _get_formatters(self, options: Namespace) -> Dict[str, OutputFormatter]: ...
+    def _get_log_matcher(self) -> Optional[Pattern]: ...
+    def _parse_servers(self, value: str, port: int) -> Dict[str, Tuple[str, int]]: ...
+    def _is_fleet(self, options: Namespace) -> bool: ...
+    def _get_fleet_servers(
+        self, options: Namespace, discover: bool = True
+    ) -> Dict[str, Tuple[str, int]]: ...
+    def _is_socket(self, path: str) -> bool: ...
+    def _get_pattern_directories(self, pattern: str) -> List[str]: ...
+    def _get_mtimes(
+        self, directories: Iterable[str]
+    ) -> Dict[str, Union[float, None]]: ...
+    def _scan_proc(self) -> Tuple[List[str], List[str], List[str]]: ...
+    def _get_descriptors(self, pid: str) -> Set[str]: ...
+    def _get_configured_sockets(self, arguments: List[bytes]) -> List[str]: ...
+    def _discover_servers(self) -> List[str]: ...
+    def _get_node(self, server: str) -> int: ...
+    def _partition(
+        self, servers: Dict[str, Tuple[str, int]]
+    ) -> Dict[str, Tuple[str, int]]: ...
+    def _for_server(self, server: str, port: int) -> CheckSupervisord: ...
+    def _adopt_state(self, checker: CheckSupervisord) -> None: ...
+    def _parse_size(self, value: str) -> int: ...
+    def _is_local_server(self, server: str) -> bool: ...
+    def _get_connection_uri(self, tpl: str) -> str: ...
     def _get_connection(self) -> ServerProxy: ...
-    def _get_data(self) -> List[Dict[str, Union[str, int]]]: ...
-    def _get_status(self, data: List[Dict[str, Union[str, int]]]) -> str: ...
+    def _fetch_data(
+        self, connection: Optional[ServerProxy]
+    ) -> List[Dict[str, Union[str, int]]]: ...
+    def _request_data(
+        self, connection: Optional[ServerProxy]
+    ) -> List[Dict[str, Union[str, int]]]: ...
+    def _call(self, connection: ServerProxy) -> List[Dict[str, Any]]: ...
+    def _multicall(
+        self,
+        connection: ServerProxy,
+        name: str,
+        logs: Optional[Dict[str, Dict[str, Dict[str, int]]]],
+    ) -> List[Dict[str, Any]]: ...
+    def _get_logs_name(self) -> str: ...
+    def _get_log_tails(
+        self, logs: Dict[str, Dict[str, Dict[str, int]]]
+    ) -> Tuple[List[str], List[Tuple[Any, ...]]]: ...
+    def _update_logs(
+        self,
+        connection: ServerProxy,
+        data: List[Dict[str, Any]],
+        name: str,
+        logs: Dict[str, Any],
+        streams: List[str],
+        tails: List[Tuple[Any, ...]],
+        results: List[Any],
+    ) -> None: ...
+    def _get_configs_name(self) -> str: ...
+    def _update_configs(
+        self,
+        data: List[Dict[str, Any]],
+        pid: int,
+        configs: Optional[Dict[str, Any]],
+        result: Union[List[Dict[str, Any]], Dict[str, Any], None],
+    ) -> Optional[List[str]]: ...
+    def _get_absent(self, data: List[Dict[str, Any]]) -> List[str]: ...
+    def _get_programs(self) -> List[str]: ...
+    def _match_log(self, text: str) -> List[Tuple[str, str]]: ...
+    def _update_server_state(
+        self,
+        kind: str,
+        memory: Union[CircuitBreaker, LatencyHistogram],
+        load: Callable[[Optional[Dict[str, Any]]], Any],
+        update: Callable[[Any], Any],
+    ) -> Any: ...
+    def _update_breaker(self, update: Callable[[CircuitBreaker], Any]) -> Any: ...
+    def _update_latency(self, update: Callable[[LatencyHistogram], Any]) -> Any: ...
+    def _get_percentiles(
+        self, histogram: LatencyHistogram
+    ) -> Dict[int, Optional[float]]: ...
+    def _get_process_resources(
+        self, pid: int, clock_ticks: int, page_size: int
+    ) -> Optional[Dict[str, Optional[Union[int, float]]]]: ...
+    def _get_resources(
+        self, data: List[Dict[str, Union[str, int]]]
+    ) -> Dict[str, Dict[str, Optional[Union[int, float]]]]: ...
+    def _get_resources_template(
+        self, usage: Dict[str, Optional[Union[int, float]]]
+    ) -> Tuple[str, List[str]]: ...
+    def _get_log_template(self, info: Dict[str, Any]) -> Tuple[str, List[str]]: ...
+    def _get_fields(self, info: Dict[str, Any]) -> Dict[str, Any]: ...
+    def _format(self, state: Dict[str, Any]) -> str: ...
+    def _get_latency_template(self) -> Tuple[str, List[str]]: ...
+    def _get_perfdata(
+        self, resources: Dict[str, Dict[str, Optional[Union[int, float]]]]
+    ) -> str: ...
+    def _get_template(self, info: Dict[str, Union[str, int]]) -> str: ...
+    def _get_status(
+        self,
+        data: List[Dict[str, Union[str, int]]],
+        resources: Optional[Dict[str, Dict[str, Optional[Union[int, float]]]]] = ...,
+    ) -> str: ...
     def _get_code(self, status: str) -> int: ...
-    def _get_output(self, data: List[Dict[str, Union[str, int]]], status: str) -> str: ...
-    def check(self) -> Tuple[str, int]: ...
+    def _get_states(
+        self,
+        data: List[Dict[str, Union[str, int]]],
+        resources: Dict[str, Dict[str, Optional[Union[int, float]]]],
+    ) -> Dict[str, Dict[str, str]]: ...
+    def _get_summary(self, states: Dict[str, Dict[str, str]]) -> str: ...
+    def _truncate(self, output: str, limit: int) -> str: ...
+    def _get_output(
+        self,
+        data: List[Dict[str, Union[str, int]]],
+        status: str,
+        resources: Optional[Dict[str, Dict[str, Optional[Union[int, float]]]]] = ...,
+    ) -> str: ...
+    def check(self) -> CheckResult: ...
+    def _check(self) -> CheckResult: ...
+    def _get_result(self, data: List[Dict[str, Union[str, int]]]) -> CheckResult: ...
+    def _get_state_name(
+        self, kind: str, key: Optional[Dict[str, Any]] = ...
+    ) -> str: ...
+    def _read_state(self, name: str) -> Optional[Dict[str, Any]]: ...
+    def _get_state_path(self, name: str, extension: str = ...) -> str: ...
+    def _lock_state(self, name: str, blocking: bool = ...) -> ContextManager[bool]: ...
+    def _write_state(self, name: str, state: Dict[str, Any]) -> None: ...
+    def _revalidate(self, name: str) -> CheckResult: ...
+    def _refresh(self, name: str) -> None: ...
+    def _refresh_background(self, name: str) -> None: ...
+    def _check_stale(self) -> CheckResult: ...
+    def _get_stale_result(self, state: Dict[str, Any], age: float) -> CheckResult: ...
+    def _get_error_result(self, error: Exception) -> CheckResult: ...
+
+
+class CheckSupervisordError(Exception): ...
+
+
+class CheckResult(NamedTuple("CheckResult", [("output", str), ("code", int)])):
+    @property
+    def status(self) -> str: ...
+
+
+Snapshot = namedtuple(
+    "Snapshot", ["data", "status", "error", "duration", "timestamp", "fetched"]
+)
+
+
+class Exporter(object):
+
+    CONTENT_TYPE: str = ...
+    STATUS_CONTENT_TYPE: str = ...
+    METRICS_PATH: str = ...
+    STATUS_PATH: str = ...
+    LABELS_ESCAPES: List[Tuple[str, str]] = ...
+    VOLATILE_FIELDS: List[str] = ...
+
+    checker: CheckSupervisord = ...
+    labels: Dict[str, str] = ...
+    interval: float = ...
+    scheduled: bool = ...
+    lock: Lock = ...
+    connection: Optional[ServerProxy] = ...
+    snapshot: Optional[Snapshot] = ...
+    metrics: Optional[Tuple[Snapshot, bytes]] = ...
+    status: Optional[Tuple[Snapshot, Tuple[str, bytes]]] = ...
+
+    def __init__(
+        self, checker: CheckSupervisord, labels: Optional[Dict[str, str]] = ...
+    ) -> None: ...
+    def _fetch(self) -> Snapshot: ...
+    def get_snapshot(self) -> Snapshot: ...
+    def is_stale(self) -> bool: ...
+    def refresh(self) -> Snapshot: ...
+    def close(self) -> None: ...
+    @classmethod
+    def _escape(cls, value: str) -> str: ...
+    @classmethod
+    def _get_metric(
+        cls,
+        name: str,
+        kind: str,
+        description: str,
+        samples: List[Tuple[Dict[str, str], Union[int, float]]],
+    ) -> List[str]: ...
+    def get_families(self, snapshot: Snapshot) -> List[Dict[str, Any]]: ...
+    @classmethod
+    def render_families(cls, families: List[Dict[str, Any]]) -> bytes: ...
+    def render(self, snapshot: Snapshot) -> bytes: ...
+    def get_metrics(self) -> bytes: ...
+    def get_document(self, snapshot: Snapshot) -> Dict[str, Any]: ...
+    @classmethod
+    def render_status(cls, documents: List[Dict[str, Any]]) -> Tuple[str, bytes]: ...
+    @classmethod
+    def _get_state(cls, document: Dict[str, Any]) -> Dict[str, Any]: ...
+    def get_status(self) -> Tuple[str, bytes]: ...
+
+
+class Scheduler(object):
+
+    daemon: ExporterDaemon = ...
+    condition: Condition = ...
+    due: Dict[str, float] = ...
+    intervals: Dict[str, float] = ...
+    bases: Dict[str, float] = ...
+    polling: Set[str] = ...
+    hosts: Dict[str, int] = ...
+    threads: List[Thread] = ...
+    stopped: bool = ...
+
+    def __init__(self, daemon: ExporterDaemon) -> None: ...
+    def _get_host(self, exporter: Exporter) -> str: ...
+    def _get_bases(self) -> Dict[str, float]: ...
+    def _get_base(self, server: str) -> float: ...
+    def sync(self) -> None: ...
+    def _take(self) -> Optional[Tuple[str, Exporter, str]]: ...
+    def _get_states(self, snapshot: Snapshot) -> List[Tuple[str, str, str]]: ...
+    def _get_interval(
+        self, server: str, previous: Optional[Snapshot], snapshot: Snapshot
+    ) -> float: ...
+    def _work(self) -> None: ...
+    def stop(self) -> None: ...
+
+
+class ExporterDaemon(object):
+
+    CONNECTION_OPTIONS: List[str] = ...
+
+    checker: CheckSupervisord = ...
+    lock: Lock = ...
+    targets: Dict[str, Exporter] = ...
+    rendered: Dict[str, Tuple[Dict[str, Exporter], List[Snapshot], Any]] = ...
+    scheduler: Scheduler = ...
+
+    def __init__(self, checker: CheckSupervisord) -> None: ...
+    def _get_connection_key(self, checker: CheckSupervisord) -> List[Any]: ...
+    def _get_targets(
+        self, checker: CheckSupervisord, previous: Dict[str, Exporter]
+    ) -> Dict[str, Exporter]: ...
+    def reload(self) -> None: ...
+    def _reload(self, *args: Any) -> None: ...
+    def _on_hangup(self, *args: Any) -> None: ...
+    def _render(
+        self, kind: str, render: Callable[[List[Tuple[Exporter, Snapshot]]], Any]
+    ) -> Any: ...
+    def _get_snapshots(self, exporters: List[Exporter]) -> List[Snapshot]: ...
+    def _work(
+        self,
+        tasks: Queue[Tuple[int, Exporter]],
+        snapshots: List[Optional[Snapshot]],
+    ) -> None: ...
+    def _render_metrics(self, snapshots: List[Tuple[Exporter, Snapshot]]) -> bytes: ...
+    def _render_status(
+        self, snapshots: List[Tuple[Exporter, Snapshot]]
+    ) -> Tuple[str, bytes]: ...
+    def get_metrics(self) -> bytes: ...
+    def get_status(self) -> Tuple[str, bytes]: ...
+    def serve_forever(self) -> None: ...
+
+
+class ExporterServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads: bool = ...
+    allow_reuse_address: bool = ...
+    exporter: Optional[Union[Exporter, ExporterDaemon]] = ...
+
+
+class ExporterHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None: ...  # noqa: N802
+    def _send_status(self) -> None: ...
+    def log_message(self, *args: Any) -> None: ...
+
+
+class Cancellable(object):
+    def _guard(self, connection: ServerProxy, cancelled: Event) -> ServerProxy: ...
+    def _cancel(self, connection: Optional[ServerProxy], cancelled: Event) -> None: ...
+
+
+class Hedge(Cancellable):
+
+    checker: CheckSupervisord = ...
+    endpoints: Dict[str, Tuple[str, int]] = ...
+    delay: float = ...
+
+    def __init__(self, checker: CheckSupervisord) -> None: ...
+    def _query(
+        self,
+        endpoint: str,
+        connections: Dict[str, ServerProxy],
+        cancelled: Event,
+        results: Queue[
+            Tuple[str, Optional[List[Dict[str, Union[str, int]]]], Optional[Exception]]
+        ],
+    ) -> None: ...
+    def fetch(self) -> List[Dict[str, Union[str, int]]]: ...
+
+
+class Cluster(Cancellable):
+
+    OUTPUT_TEMPLATE: str = ...
+    CANCELLED: str = ...
+    TIMED_OUT: str = ...
+
+    checker: CheckSupervisord = ...
+    servers: Dict[str, Tuple[str, int]] = ...
+    quorum: int = ...
+    timeout: float = ...
+
+    def __init__(self, checker: CheckSupervisord) -> None: ...
+    def _query(
+        self,
+        server: str,
+        checker: CheckSupervisord,
+        connections: Dict[str, ServerProxy],
+        cancelled: Event,
+        results: Queue[Tuple[str, str]],
+    ) -> None: ...
+    def _get_problem(
+        self, checker: CheckSupervisord, data: List[Dict[str, Union[str, int]]]
+    ) -> str: ...
+    def check(self) -> CheckResult: ...
+    def _get_result(self, running: List[str], problems: Dict[str, str]) -> CheckResult: ...
+
+
+class Fleet(object):
+
+    checker: CheckSupervisord = ...
+
+    def __init__(self, checker: CheckSupervisord) -> None: ...
+    def _check_server(
+        self, position: int, server: str, address: str, port: int
+    ) -> Tuple[str, int, str, str]: ...
+    def _work(
+        self,
+        tasks: Queue[Tuple[int, str, str, int]],
+        results: List[Tuple[str, int, str, str]],
+    ) -> None: ...
+    def check_shard(
+        self, servers: List[Tuple[int, str, str, int]]
+    ) -> Tuple[Dict[str, int], List[Tuple[int, int, str, str]]]: ...
+    def _run_shards(
+        self, servers: List[Tuple[int, str, str, int]]
+    ) -> List[Tuple[Dict[str, int], List[Tuple[int, int, str, str]]]]: ...
+    def check(self) -> CheckResult: ...
+    def _get_result(
+        self,
+        counts: Dict[str, int],
+        problems: List[Tuple[int, int, str, str]],
+        total: int,
+    ) -> CheckResult: ...
+
+
+def _check_fleet_shard(
+    payload: Tuple[Namespace, List[Tuple[int, str, str, int]]]
+) -> Tuple[Dict[str, int], List[Tuple[int, int, str, str]]]: ...
 
 
 def main() -> None: ...
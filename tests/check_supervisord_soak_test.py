@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+# nagios-check-supervisord
+# tests/check_supervisord_soak_test.py
+
+# Long running checks memory, file descriptors and threads leaks tests,
+# run only if checks count supplied: CHECK_SUPERVISORD_SOAK_CHECKS=200000 make test
+
+
+from __future__ import unicode_literals
+
+import gc
+import os
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+
+try:
+    from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+except ImportError:
+    from SimpleXMLRPCServer import (  # type: ignore
+        SimpleXMLRPCServer,
+        SimpleXMLRPCRequestHandler,
+    )
+
+import pytest
+
+from check_supervisord import Exporter, CheckSupervisord
+from tests.check_supervisord_test import UnixXMLRPCServer
+
+
+__all__ = [
+    "test_soak__check",
+    "test_soak__exporter",
+]
+
+
+SOAK_CHECKS = int(os.environ.get("CHECK_SUPERVISORD_SOAK_CHECKS", "0"))
+SOAK_SAMPLES = 20
+# samples taken before caches, pools and allocator arenas warmed up ignored
+SOAK_WARM_UP_SAMPLES = 5
+# maximum growth per check
+SOAK_SLOPES = OrderedDict(
+    [
+        ("rss", 4.0),  # bytes
+        ("fds", 0.0001),
+        ("threads", 0.0001),
+        ("objects", 0.001),
+    ]
+)
+DATA = [
+    {
+        "description": "pid 666, uptime 0 days, 0:00:01",
+        "pid": 666,
+        "stderr_logfile": "",
+        "stop": 0,
+        "logfile": "/var/log/example.log",
+        "exitstatus": 0,
+        "spawnerr": "",
+        "now": 1,
+        "group": "example-{number}".format(number=number),
+        "name": "example-{number}".format(number=number),
+        "statename": "RUNNING" if number else "BACKOFF",
+        "start": 0,
+        "state": 20 if number else 30,
+        "stdout_logfile": "/var/log/example.log",
+    }
+    for number in range(8)
+]
+
+pytestmark = pytest.mark.skipif(
+    not SOAK_CHECKS, reason="CHECK_SUPERVISORD_SOAK_CHECKS not supplied"
+)
+
+
+class KeepAliveXMLRPCRequestHandler(SimpleXMLRPCRequestHandler):
+    """
+    Supervisord stand-in XML-RPC request handler keeping connections alive.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # headers and body sent separately, so delayed ACK would stall each response
+    disable_nagle_algorithm = True
+
+
+def _serve(path, ports):
+    """
+    Serve supervisord stand-in over unix socket and HTTP (runs in child process,
+    so stand-in allocations are not counted as checks leaks).
+
+    :param path: unix socket path
+    :type path: str
+    :param ports: queue to send HTTP server port to
+    :type ports: multiprocessing.Queue
+    """
+
+    server = SimpleXMLRPCServer(
+        ("127.0.0.1", 0),
+        requestHandler=KeepAliveXMLRPCRequestHandler,
+        logRequests=False,
+        allow_none=True,
+    )
+    server.register_function(lambda: DATA, "supervisor.getAllProcessInfo")
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    ports.put(server.server_address[1])
+    UnixXMLRPCServer(path=path, data=DATA).serve_forever()
+
+
+def _sample():
+    """
+    Measure this process resources usage.
+
+    :return: RSS in bytes, open file descriptors, threads and objects counts
+    :rtype: Tuple[int, int, int, int]
+    """
+
+    # previous samples (tuples of ints) untracked by collection, so not counted
+    gc.collect()
+    with open("/proc/self/statm") as statm:
+        rss = int(statm.read().split()[1]) * os.sysconf(str("SC_PAGE_SIZE"))
+
+    return (
+        rss,
+        len(os.listdir("/proc/self/fd")),
+        threading.active_count(),
+        len(gc.get_objects()),
+    )
+
+
+def _get_slope(points):
+    """
+    Get least squares line slope.
+
+    :param points: checks counts and measured values
+    :type points: List[Tuple[int, int]]
+    :return: slope
+    :rtype: float
+    """
+
+    mean_x = sum(x for x, _ in points) / float(len(points))
+    mean_y = sum(y for _, y in points) / float(len(points))
+
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / sum(
+        (x - mean_x) ** 2 for x, _ in points
+    )
+
+
+def _soak(check):
+    """
+    Run check many times measuring resources usage growth.
+
+    :param check: check to run
+    :type check: Callable[[], Any]
+    :return: resources with growth per check above limit
+    :rtype: Dict[str, float]
+    """
+
+    step = max(SOAK_CHECKS // SOAK_SAMPLES, 1)
+    samples = []
+    for number in range(SOAK_CHECKS):
+        if not number % step:
+            samples.append((number,) + _sample())
+        check()
+    samples = samples[SOAK_WARM_UP_SAMPLES:]
+    slopes = {
+        resource: _get_slope(
+            points=[(sample[0], sample[position]) for sample in samples]
+        )
+        for position, resource in enumerate(SOAK_SLOPES.keys(), 1)
+    }
+
+    return {
+        resource: slope
+        for resource, slope in slopes.items()
+        if slope > SOAK_SLOPES[resource]
+    }
+
+
+@pytest.fixture()
+def server(tmpdir):
+    """
+    Run supervisord stand-in in child process.
+
+    :param tmpdir: temporary directory
+    :type tmpdir: py.path.local
+    :return: unix socket path and HTTP server port
+    :rtype: Iterator[Tuple[str, int]]
+    """
+
+    path = str(tmpdir.join("supervisord.sock"))
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(path, ports))
+    process.daemon = True
+    process.start()
+    try:
+        yield path, ports.get(timeout=10)
+    finally:
+        process.terminate()
+        process.join()
+
+
+def test_soak__check(server, tmpdir):
+    """
+    Test "check" method must not leak connecting to server on each check.
+
+    :param server: unix socket path and HTTP server port
+    :type server: Tuple[str, int]
+    :param tmpdir: temporary directory
+    :type tmpdir: py.path.local
+    """
+
+    path, _ = server
+    checker = CheckSupervisord.from_options(
+        server="unix://{path}".format(path=path),
+        latency_stats=True,
+        breaker_failures=3,
+        summary=True,
+        output_templates=["warning={group}:{name} pid {pid} up {uptime}s"],
+        state_dir=str(tmpdir.join("state")),
+    )
+
+    assert checker.check().code == 1  # nosec: B101
+    assert _soak(check=checker.check) == {}  # nosec: B101
+
+
+def test_soak__exporter(server):
+    """
+    Test exporter must not leak reusing connection for each snapshot.
+
+    :param server: unix socket path and HTTP server port
+    :type server: Tuple[str, int]
+    """
+
+    _, port = server
+    exporter = Exporter(
+        checker=CheckSupervisord.from_options(
+            server="127.0.0.1",
+            port=port,
+            exporter=True,
+            exporter_interval=0.0,
+            latency_stats=True,
+        )
+    )
+
+    def scrape():
+        """
+        Fetch new snapshot and render it both as metrics and status.
+        """
+
+        exporter.get_metrics()
+        exporter.get_status()
+
+    scrape()
+
+    assert exporter.snapshot.error == ""  # nosec: B101
+    assert _soak(check=scrape) == {}  # nosec: B101
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+# nagios-check-supervisord
+# tests/check_supervisord_soak_test.pyi
+
+from typing import (  # pylint: disable=W0611
+    Any,
+    Dict,
+    List,
+    Tuple,
+    Callable,
+    ClassVar,
+    Iterator,
+)
+from multiprocessing import Queue
+from xmlrpc.server import SimpleXMLRPCRequestHandler
+
+from py.path import local
+
+__all__: List[str] = ...
+
+SOAK_CHECKS: int = ...
+SOAK_SAMPLES: int = ...
+SOAK_WARM_UP_SAMPLES: int = ...
+SOAK_SLOPES: Dict[str, float] = ...
+DATA: List[Dict[str, Any]] = ...
+
+class KeepAliveXMLRPCRequestHandler(SimpleXMLRPCRequestHandler):
+
+    protocol_version: str = ...
+    disable_nagle_algorithm: ClassVar[bool] = ...
+
+def _serve(path: str, ports: Queue) -> None: ...  # type: ignore
+def _sample() -> Tuple[int, int, int, int]: ...
+def _get_slope(points: List[Tuple[int, int]]) -> float: ...
+def _soak(check: Callable[[], Any]) -> Dict[str, float]: ...
+def server(tmpdir: local) -> Iterator[Tuple[str, int]]: ...
+def test_soak__check(server: Tuple[str, int], tmpdir: local) -> None: ...
+def test_soak__exporter(server: Tuple[str, int]) -> None: ...
@@ -3,8 +3,18 @@
 # nagios-check-supervisord
 # tests/check_supervisord_test.pyi
 
-from typing import List  # pylint: disable=W0611
+from typing import (  # pylint: disable=W0611
+    Dict,
+    List,
+    Union,
+    ClassVar,
+    Optional,
+    ContextManager,
+)
+from socketserver import UnixStreamServer
+from xmlrpc.server import SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler
 
+from py.path import local
 from _pytest.capture import CaptureFixture
 
 try:
@@ -16,9 +26,27 @@ except ImportError:
 
 __all__: List[str] = ...
 
+class UnixXMLRPCRequestHandler(SimpleXMLRPCRequestHandler):
+
+    disable_nagle_algorithm: ClassVar[bool] = ...
+
+    def do_POST(self) -> None: ...  # noqa: N802
+    def address_string(self) -> str: ...
+
+class UnixXMLRPCServer(UnixStreamServer, SimpleXMLRPCDispatcher):
+
+    logRequests: bool = ...
+    authorizations: List[Optional[str]] = ...
+
+    def __init__(self, path: str, data: List[Dict[str, Union[str, int]]]) -> None: ...
+    def serving(self) -> ContextManager[UnixXMLRPCServer]: ...
+
 def test__get_options(mocker: MockerFixture) -> None: ...
 def test__get_options__missing_server_option(mocker: MockerFixture) -> None: ...
 def test__get_options__missing_password_option(mocker: MockerFixture) -> None: ...
+def test__get_options__proc_stats__remote_server(mocker: MockerFixture) -> None: ...
+def test__parse_size(mocker: MockerFixture) -> None: ...
+def test__parse_size__invalid(mocker: MockerFixture) -> None: ...
 def test__get_connection_uri__socket(mocker: MockerFixture) -> None: ...
 def test__get_connection_uri__http(mocker: MockerFixture) -> None: ...
 def test__get_connection_uri__http_auth(mocker: MockerFixture) -> None: ...
@@ -33,8 +61,8 @@ def test__get_code(mocker: MockerFixture) -> None: ...
 def test__get_code__warning(mocker: MockerFixture) -> None: ...
 def test__get_code__critical(mocker: MockerFixture) -> None: ...
 def test__get_code__unknown(mocker: MockerFixture) -> None: ...
-def test__get_data(mocker: MockerFixture) -> None: ...
-def test__get_data__network_error(mocker: MockerFixture) -> None: ...
+def test__fetch_data(mocker: MockerFixture) -> None: ...
+def test__fetch_data__network_error(mocker: MockerFixture) -> None: ...
 def test__get_status(mocker: MockerFixture) -> None: ...
 def test__get_status__stopped(mocker: MockerFixture) -> None: ...
 def test__get_status__critical(mocker: MockerFixture) -> None: ...
@@ -61,3 +89,110 @@ def test_check__warning__exited(mocker: MockerFixture) -> None: ...
 def test_check__unknown(mocker: MockerFixture) -> None: ...
 def test_check__unknown__unknown_program(mocker: MockerFixture) -> None: ...
 def test_check__unknown__no_data(mocker: MockerFixture) -> None: ...
+def _create_proc_root(tmpdir: local) -> str: ...
+def test__get_resources(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test__get_resources__disabled(mocker: MockerFixture) -> None: ...
+def test_check__resources__warning(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_check__resources__critical(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_check__profile(
+    mocker: MockerFixture, capsys: CaptureFixture  # type: ignore
+) -> None: ...
+def test_check__profile__cprofile(
+    mocker: MockerFixture, capsys: CaptureFixture  # type: ignore
+) -> None: ...
+def test_main__profile_output(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_profiler__disabled() -> None: ...
+def test_exporter__get_metrics(mocker: MockerFixture) -> None: ...
+def test_exporter__get_snapshot__cached(mocker: MockerFixture) -> None: ...
+def test_exporter__get_metrics__network_error(mocker: MockerFixture) -> None: ...
+def test_exporter__serve(mocker: MockerFixture) -> None: ...
+def test__get_output__summary(mocker: MockerFixture) -> None: ...
+def test__get_output__summary__ok(mocker: MockerFixture) -> None: ...
+def test__get_output__output_limit(mocker: MockerFixture) -> None: ...
+def test__truncate(mocker: MockerFixture) -> None: ...
+def test__get_connection__unix_uri(mocker: MockerFixture) -> None: ...
+def test__get_connection__unix_uri__auth(mocker: MockerFixture) -> None: ...
+def test_check__unix_uri(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_unix_stream_http_connection__connect__timeout(tmpdir: local) -> None: ...
+def test_from_options(mocker: MockerFixture) -> None: ...
+def test_from_options__unknown_option() -> None: ...
+def test_from_options__missing_server_option() -> None: ...
+def test_from_options__invalid_exit_code() -> None: ...
+def test_check__embedded__network_error(mocker: MockerFixture) -> None: ...
+def test_check__embedded__isolated_states(mocker: MockerFixture) -> None: ...
+def test_check__embedded__unix_support_not_available(mocker: MockerFixture) -> None: ...
+def test_check_result__status() -> None: ...
+def test_check__program_state_exit_code(mocker: MockerFixture) -> None: ...
+def test_check__group_state_exit_code(mocker: MockerFixture) -> None: ...
+def test_check__state_exit_code(mocker: MockerFixture) -> None: ...
+def test_from_options__invalid_state_exit_code() -> None: ...
+def test_state_policy__resolve() -> None: ...
+def test_state_policy__immutable() -> None: ...
+def test__parse_servers() -> None: ...
+def test_from_options__invalid_quorum() -> None: ...
+def test_cluster__check__quorum_reached(tmpdir: local) -> None: ...
+def test_cluster__check__quorum_lost(tmpdir: local) -> None: ...
+def test_cluster__check__timed_out(tmpdir: local) -> None: ...
+def test_check__embedded__cluster(tmpdir: local) -> None: ...
+def test__get_fleet_servers(tmpdir: local) -> None: ...
+def test_from_options__fleet_and_cluster() -> None: ...
+def test_fleet__check_shard(tmpdir: local) -> None: ...
+def test_fleet__check(tmpdir: local) -> None: ...
+def test_fleet__get_result() -> None: ...
+def test_fleet__check__single_server(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test__get_node() -> None: ...
+def test_fleet__check__node(tmpdir: local) -> None: ...
+def test_fleet__check__discover_sockets(
+    mocker: MockerFixture, tmpdir: local
+) -> None: ...
+def test__scan_proc(tmpdir: local) -> None: ...
+def test_fleet__check__uninspected_proc(mocker: MockerFixture) -> None: ...
+def test_from_options__invalid_node_id() -> None: ...
+def test__write_state(tmpdir: local) -> None: ...
+def test_check__stale(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_check__stale__warning(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_from_options__invalid_stale_warning_age() -> None: ...
+def test_check__stale__expired(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_check__not_private_state_dir(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test__refresh(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test__refresh_background(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_circuit_breaker() -> None: ...
+def test_check__circuit_breaker(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_check__circuit_breaker__exporter(
+    mocker: MockerFixture, tmpdir: local
+) -> None: ...
+def test_hedge__fetch(tmpdir: local) -> None: ...
+def test_hedge__fetch__failed(tmpdir: local) -> None: ...
+def test_from_options__hedge_and_cluster() -> None: ...
+def test__parse_servers__ipv6() -> None: ...
+def test__get_connection_uri__ipv6() -> None: ...
+def test_resolver__resolve(mocker: MockerFixture) -> None: ...
+def test_dual_stack_http_connection__connect(mocker: MockerFixture) -> None: ...
+def test_latency_histogram() -> None: ...
+def test_check__latency_stats(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test__get_result__latency_threshold() -> None: ...
+def test__match_log() -> None: ...
+def test_check__log_patterns(tmpdir: local) -> None: ...
+def test_check__log_patterns__programs(tmpdir: local) -> None: ...
+def test_from_options__invalid_log_pattern() -> None: ...
+def test_check__missing_programs(tmpdir: local) -> None: ...
+def test_output_formatter() -> None: ...
+def test_check__output_template(mocker: MockerFixture) -> None: ...
+def test_check__output_template__absent_program(mocker: MockerFixture) -> None: ...
+def test_from_options__config(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_from_options__invalid_config(tmpdir: local) -> None: ...
+def test_exporter_daemon__get_metrics(mocker: MockerFixture) -> None: ...
+def test_exporter_daemon__get_snapshots(mocker: MockerFixture) -> None: ...
+def test_exporter_daemon__reload(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_exporter_daemon__reload__embedded(
+    mocker: MockerFixture, tmpdir: local
+) -> None: ...
+def test_scheduler__get_interval(mocker: MockerFixture) -> None: ...
+def test_scheduler__work(tmpdir: local) -> None: ...
+def test_from_options__invalid_schedule() -> None: ...
+def test_exporter_handler__status(mocker: MockerFixture) -> None: ...
+def test_exporter__render_status() -> None: ...
+def test_check__record_replay(mocker: MockerFixture, tmpdir: local) -> None: ...
+def test_replay_transport__request(tmpdir: local) -> None: ...
+def test_check__replay__state(tmpdir: local) -> None: ...
+def test_from_options__invalid_replay(tmpdir: local) -> None: ...